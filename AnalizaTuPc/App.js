@@ -21,24 +21,38 @@ const { width: screenWidth } = Dimensions.get('window');
 const API_BASE = 'https://analizatupc-backend.onrender.com';
 
 const analysisService = {
+  // Idempotency-Key del análisis en curso: se reutiliza al reintentar tras un error de red
+  // para que el backend no cree un análisis nuevo por cada intento
+  pendingRequest: null,
+
   async analyzeSystem(data) {
     try {
       console.log('🔍 Enviando análisis al servidor...');
-      const headers = {
-        'Content-Type': 'application/json',
-      };
       
       // SIEMPRE enviar como invitado para forzar Dropbox
       const requestData = {
         ...data,
         is_guest: true // Forzar modo invitado para que siempre genere Dropbox
       };
+      const body = JSON.stringify(requestData);
+      if (!this.pendingRequest || this.pendingRequest.body !== body) {
+        this.pendingRequest = {
+          body,
+          key: `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`
+        };
+      }
+
+      const headers = {
+        'Content-Type': 'application/json',
+        'Idempotency-Key': this.pendingRequest.key,
+      };
 
       const response = await fetch(`${API_BASE}/api/analyze`, {
         method: 'POST',
         headers,
-        body: JSON.stringify(requestData),
+        body,
       });
+      this.pendingRequest = null;
 
       console.log('📡 Respuesta del servidor:', response.status);
 
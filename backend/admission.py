@@ -0,0 +1,165 @@
+# backend/admission.py
+import asyncio
+import math
+import os
+import re
+import time
+from fastapi.responses import JSONResponse
+from shared_metrics import shared_metrics
+
+# Endpoints caros (renderizado y subida): peticiones a la vez, en espera y segundos de espera
+ADMISSION_HEAVY_CONCURRENCY = int(os.getenv("ADMISSION_HEAVY_CONCURRENCY", "4"))
+ADMISSION_HEAVY_QUEUE = int(os.getenv("ADMISSION_HEAVY_QUEUE", "16"))
+ADMISSION_HEAVY_TIMEOUT = float(os.getenv("ADMISSION_HEAVY_TIMEOUT", "10"))
+# Lecturas (dashboard, listados, estadísticas): límite propio para que sigan respondiendo
+ADMISSION_READ_CONCURRENCY = int(os.getenv("ADMISSION_READ_CONCURRENCY", "16"))
+ADMISSION_READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", "64"))
+ADMISSION_READ_TIMEOUT = float(os.getenv("ADMISSION_READ_TIMEOUT", "5"))
+
+HEAVY_ROUTES = [
+    ("POST", re.compile(r"^/api/analyze/?$")),
+    ("GET", re.compile(r"^/api/analyses/\d+/report\.pdf$")),
+]
+# Siempre admitidos: así se puede observar el servidor en plena tormenta.
+# El stream SSE del dashboard ocuparía un hueco de lectura mientras siga abierto: tiene su propio límite
+EXEMPT_PATHS = {"/api/admission", "/api/dashboard/events"}
+
+# Peticiones HTTP recibidas por la instancia (todas, admitidas o no)
+http_requests = shared_metrics.counter("http.requests")
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class AdmissionLimiter:
+    """
+    Semáforo con cola de espera acotada. Con la cola llena se rechaza al instante (429);
+    si el turno no llega en queue_timeout segundos, 503. La espera ocurre en el event
+    loop, sin ocupar hilos del threadpool donde corren los endpoints síncronos.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # La cola es de este worker; los contadores se suman entre todos los de la instancia
+        self.active = 0
+        self.waiting = 0
+        self._active = shared_metrics.gauge(f"admission.{name}.active")
+        self._waiting = shared_metrics.gauge(f"admission.{name}.waiting")
+        self.admitted = shared_metrics.counter(f"admission.{name}.admitted")
+        self.rejected = shared_metrics.counter(f"admission.{name}.rejected")
+        self.timed_out = shared_metrics.counter(f"admission.{name}.timed_out")
+        self._service_time = None  # media móvil exponencial de la duración, en segundos
+
+    def retry_after(self):
+        """Segundos estimados hasta que se libere un hueco para la cola actual"""
+        service = self._service_time or 1.0
+        return max(1, math.ceil(service * (self.waiting + 1) / self.concurrency))
+
+    async def acquire(self):
+        if self._semaphore.locked():
+            if self.waiting >= self.queue_size:
+                self.rejected.add()
+                raise AdmissionRejected(f"Servidor ocupado ({self.name}): cola llena", 429, self.retry_after())
+            self.waiting += 1
+            self._waiting.set(self.waiting)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out.add()
+                raise AdmissionRejected(f"Servidor ocupado ({self.name}): tiempo de espera agotado", 503, self.retry_after())
+            finally:
+                self.waiting -= 1
+                self._waiting.set(self.waiting)
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        self._active.set(self.active)
+        self.admitted.add()
+
+    def release(self, elapsed: float):
+        self.active -= 1
+        self._active.set(self.active)
+        self._service_time = elapsed if self._service_time is None else 0.8 * self._service_time + 0.2 * elapsed
+        self._semaphore.release()
+
+    def snapshot(self):
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "active": int(self._active.total()),
+            "waiting": int(self._waiting.total()),
+            "admitted": int(self.admitted.total()),
+            "rejected": int(self.rejected.total()),
+            "timed_out": int(self.timed_out.total()),
+            "avg_service_ms": round(self._service_time * 1000, 1) if self._service_time is not None else None,
+        }
+
+def _limiter(name, concurrency, queue_size, queue_timeout):
+    return AdmissionLimiter(name, concurrency, queue_size, queue_timeout) if concurrency > 0 else None
+
+class AdmissionControl:
+    """Clasifica cada petición en su limitador: heavy para los endpoints caros, read para las lecturas"""
+
+    def __init__(self):
+        self.limiters = {
+            name: limiter for name, limiter in (
+                ("heavy", _limiter("heavy", ADMISSION_HEAVY_CONCURRENCY, ADMISSION_HEAVY_QUEUE, ADMISSION_HEAVY_TIMEOUT)),
+                ("read", _limiter("read", ADMISSION_READ_CONCURRENCY, ADMISSION_READ_QUEUE, ADMISSION_READ_TIMEOUT)),
+            ) if limiter is not None
+        }
+
+    def classify(self, method: str, path: str):
+        if path in EXEMPT_PATHS:
+            return None
+        if any(method == m and pattern.match(path) for m, pattern in HEAVY_ROUTES):
+            return self.limiters.get("heavy")
+        if method in ("GET", "HEAD"):
+            return self.limiters.get("read")
+        return None
+
+    def snapshot(self):
+        return {name: limiter.snapshot() for name, limiter in self.limiters.items()}
+
+class AdmissionMiddleware:
+    """Middleware ASGI: admite, encola o rechaza antes de que la petición llegue a FastAPI"""
+
+    def __init__(self, app, control: AdmissionControl):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        http_requests.add()
+
+        limiter = self.control.classify(scope["method"], scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"status": "error", "message": str(e)},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - start)
+
+# Instancia global del proceso
+admission_control = AdmissionControl()
@@ -0,0 +1,456 @@
+# backend/analytics.py
+"""
+Consultas analíticas ad hoc sobre una instantánea columnar de los análisis.
+
+La instantánea es un directorio de segmentos Parquet de solo anexado, numerados por orden
+de escritura (segment_<n>_<n>.parquet): cada refresco añade un segmento con los análisis
+nuevos (analysis_id mayor que el último vigente en la instantánea) leídos de la réplica si
+existe, o de la primaria. Los borrados se anotan como ficheros deleted_*.parquet con
+(analysis_id, created_at) y se descuentan al consultar; created_at distingue un id borrado
+del análisis nuevo que lo reutiliza. Con demasiados ficheros se compacta todo en un segmento.
+
+Las consultas (GET /api/analytics) las resuelve DuckDB leyendo solo esos ficheros: nunca
+tocan la base de datos. La primera instantánea incluye los meses archivados (archive.py).
+"""
+import datetime
+import glob
+import itertools
+import os
+import re
+import threading
+import time
+from database import SessionLocal, ReplicaSessionLocal, SystemAnalysis
+from archive import analysis_archive, arrow_schema, conform_batch, ARCHIVE_BATCH_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializa dentro del proceso
+    fcntl = None
+
+# Directorio de la instantánea columnar
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "analytics")
+# Segundos entre refrescos incrementales (0 = sin refresco en segundo plano)
+ANALYTICS_REFRESH = float(os.getenv("ANALYTICS_REFRESH", "30"))
+# Antigüedad mínima (segundos) de un análisis para volcarlo: da tiempo a que se confirmen
+# las transacciones con ids anteriores y a que la réplica las reciba
+ANALYTICS_SETTLE = float(os.getenv("ANALYTICS_SETTLE", "5"))
+# Segmentos + ficheros de borrados a partir de los que se compacta
+ANALYTICS_MAX_FILES = int(os.getenv("ANALYTICS_MAX_FILES", "16"))
+# Memoria máxima del motor de consultas en cada worker
+ANALYTICS_MEMORY_LIMIT = os.getenv("ANALYTICS_MEMORY_LIMIT", "512MB")
+# Filas máximas por respuesta
+ANALYTICS_MAX_ROWS = 5000
+
+SEGMENT_RE = re.compile(r"segment_(\d+)_(\d+)\.parquet$")
+
+# Dimensiones por las que se puede agrupar: nombre público -> expresión SQL
+GPU_TIER = """CASE
+    WHEN gpu_vram_gb IS NULL OR gpu_vram_gb <= 0 THEN 'none'
+    WHEN gpu_vram_gb < 4 THEN 'entry'
+    WHEN gpu_vram_gb < 8 THEN 'mainstream'
+    WHEN gpu_vram_gb < 12 THEN 'high'
+    ELSE 'enthusiast' END"""
+DIMENSIONS = {
+    "main_profile": "main_profile",
+    "disk_type": "disk_type",
+    "cpu_model": "cpu_model",
+    "gpu_model": "gpu_model",
+    "cpu_model_id": "cpu_model_id",
+    "gpu_model_id": "gpu_model_id",
+    "cores": "cores",
+    "ram_gb": "ram_gb",
+    "scoring_version": "scoring_version",
+    "gpu_tier": GPU_TIER,
+    "hour": "date_trunc('hour', created_at)",
+    "day": "date_trunc('day', created_at)",
+    "week": "date_trunc('week', created_at)",
+    "month": "date_trunc('month', created_at)",
+    "year": "date_trunc('year', created_at)",
+}
+# Columnas numéricas sobre las que se calculan métricas
+MEASURES = ("main_score", "ram_gb", "cores", "cpu_speed_ghz", "gpu_vram_gb")
+AGGREGATES = {
+    "avg": "avg({})",
+    "min": "min({})",
+    "max": "max({})",
+    "sum": "sum({})",
+    "p50": "quantile_cont({}, 0.5)",
+    "p90": "quantile_cont({}, 0.9)",
+    "p99": "quantile_cont({}, 0.99)",
+}
+
+class AnalyticsUnavailable(Exception):
+    pass
+
+class AnalyticsQueryError(ValueError):
+    pass
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise AnalyticsUnavailable("La instantánea analítica necesita pyarrow (pip install pyarrow)")
+
+def _sql_path(path: str):
+    return "'" + path.replace("'", "''") + "'"
+
+def _sql_list(paths):
+    return "[" + ", ".join(_sql_path(p) for p in paths) + "]"
+
+def parse_query(group_by: str, metrics: str):
+    """Valida group_by y metrics contra las listas permitidas: [(nombre, SQL)] y [(nombre, SQL, parámetros)]"""
+    dimensions = []
+    for name in filter(None, (part.strip() for part in (group_by or "").split(","))):
+        if name not in DIMENSIONS:
+            raise AnalyticsQueryError(f"group_by desconocido: {name} (válidos: {', '.join(DIMENSIONS)})")
+        if name not in dict(dimensions):
+            dimensions.append((name, DIMENSIONS[name]))
+
+    measures = []
+    for spec in filter(None, (part.strip() for part in (metrics or "count").split(","))):
+        if spec == "count":
+            measures.append((spec, "count(*)", []))
+            continue
+        kind, _, argument = spec.partition(":")
+        if kind == "share":
+            # share:disk_type=NVMe -> % de filas del grupo con ese valor
+            dimension, _, value = argument.partition("=")
+            if dimension not in DIMENSIONS or not value:
+                raise AnalyticsQueryError(f"Métrica inválida: {spec} (formato share:<dimensión>=<valor>)")
+            measures.append((spec, f"100.0 * avg(CASE WHEN CAST({DIMENSIONS[dimension]} AS VARCHAR) = ? THEN 1 ELSE 0 END)", [value]))
+        elif kind in AGGREGATES and argument in MEASURES:
+            measures.append((spec, AGGREGATES[kind].format(argument), []))
+        else:
+            raise AnalyticsQueryError(
+                f"Métrica inválida: {spec} (count, share:<dimensión>=<valor> o "
+                f"{'|'.join(AGGREGATES)}:<{'|'.join(MEASURES)}>)"
+            )
+    if len(measures) > 20:
+        raise AnalyticsQueryError("Demasiadas métricas (máximo 20)")
+    return dimensions, measures
+
+class ColumnarSnapshot:
+    """Instantánea Parquet de solo anexado de system_analyses y motor DuckDB embebido para consultarla"""
+
+    def __init__(self, directory: str, refresh_interval: float, settle: float, max_files: int):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self.settle = settle
+        self.max_files = max_files
+        self.last_error = None
+        self._lock = threading.Lock()  # refrescos de este proceso
+        self._engine_lock = threading.Lock()
+        self._connection = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- ficheros ----
+    def segments(self):
+        """
+        [(primer n, último n, ruta)] vigentes. Durante una compactación conviven el segmento
+        nuevo y los que sustituye: se descartan los que quedan contenidos en otro más amplio.
+        """
+        found = []
+        for path in glob.glob(os.path.join(self.directory, "segment_*.parquet")):
+            match = SEGMENT_RE.search(path)
+            if match:
+                found.append((int(match.group(1)), int(match.group(2)), path))
+        return sorted(
+            (lo, hi, path) for lo, hi, path in found
+            if not any(o_lo <= lo and hi <= o_hi and (o_lo, o_hi) != (lo, hi) for o_lo, o_hi, _ in found)
+        )
+
+    def tombstones(self):
+        return sorted(glob.glob(os.path.join(self.directory, "deleted_*.parquet")))
+
+    def watermark(self):
+        """Mayor analysis_id vigente en la instantánea (0 si está vacía)"""
+        value = self._fetch("SELECT max(analysis_id) FROM {source}")
+        return (value[0][0] or 0) if value else 0
+
+    def refreshed_at(self):
+        marker = os.path.join(self.directory, ".refreshed")
+        return os.path.getmtime(marker) if os.path.exists(marker) else None
+
+    def _file_lock(self):
+        """Candado entre procesos: un solo worker escribe segmentos a la vez"""
+        os.makedirs(self.directory, exist_ok=True)
+        handle = open(os.path.join(self.directory, ".lock"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return None
+        return handle
+
+    def _write_segment(self, batches, pa):
+        """Escribe los lotes en un segmento nuevo; devuelve las filas escritas"""
+        schema = arrow_schema(pa)
+        sequence = max((hi for _, hi, _ in self.segments()), default=0) + 1
+        tmp = os.path.join(self.directory, f".segment.{os.getpid()}.tmp")
+        writer = pa.parquet.ParquetWriter(tmp, schema, compression="zstd")
+        rows = 0
+        try:
+            for batch in batches:
+                if batch.num_rows:
+                    writer.write_table(pa.Table.from_batches([conform_batch(batch, schema, pa)]),
+                                       row_group_size=ARCHIVE_BATCH_SIZE)
+                    rows += batch.num_rows
+        finally:
+            writer.close()
+        if not rows:
+            os.remove(tmp)
+            return 0
+        os.replace(tmp, os.path.join(self.directory, f"segment_{sequence}_{sequence}.parquet"))
+        return rows
+
+    def _write_tombstones(self, keys, pa):
+        name = f"deleted_{time.time_ns()}_{os.getpid()}.parquet"
+        tmp = os.path.join(self.directory, f".{name}.tmp")
+        analysis_ids, created = zip(*keys)
+        pa.parquet.write_table(pa.table({
+            "analysis_id": pa.array(analysis_ids, pa.int64()),
+            "created_at": pa.array(created, pa.timestamp("us")),
+        }), tmp)
+        os.replace(tmp, os.path.join(self.directory, name))
+
+    def _deleted_keys(self, pa):
+        keys = set()
+        for path in self.tombstones():
+            data = pa.parquet.read_table(path, columns=["analysis_id", "created_at"]).to_pydict()
+            keys.update(zip(data["analysis_id"], data["created_at"]))
+        return keys
+
+    # ---- refresco ----
+    def _source(self):
+        """Los volcados leen de la réplica si está configurada, para no cargar la primaria"""
+        return (ReplicaSessionLocal or SessionLocal)()
+
+    def _live_batches(self, db, after_id: int, cutoff: datetime.datetime, deleted, pa):
+        """
+        Lotes Arrow de los análisis con analysis_id > after_id, hasta el primero aún sin asentar.
+        Se saltan los ya borrados que una réplica retrasada todavía devuelve.
+        """
+        schema = arrow_schema(pa)
+        columns = [field.name for field in schema]
+        query = SystemAnalysis.__table__.select() \
+            .where(SystemAnalysis.analysis_id > after_id) \
+            .order_by(SystemAnalysis.analysis_id) \
+            .execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+        result = db.connection().execute(query)
+        try:
+            for chunk in result.partitions(ARCHIVE_BATCH_SIZE):
+                rows = []
+                for row in chunk:
+                    if row.created_at is not None and row.created_at >= cutoff:
+                        # Los ids siguientes pueden tener huecos aún sin confirmar: se vuelcan en el próximo refresco
+                        if rows:
+                            yield pa.RecordBatch.from_pydict({c: [r._mapping[c] for r in rows] for c in columns}, schema=schema)
+                        return
+                    if (row.analysis_id, row.created_at) not in deleted:
+                        rows.append(row)
+                yield pa.RecordBatch.from_pydict({c: [r._mapping[c] for r in rows] for c in columns}, schema=schema)
+        finally:
+            result.close()
+
+    def _archived_batches(self, db, pa):
+        for _, path in analysis_archive.files(db):
+            yield from pa.parquet.ParquetFile(path).iter_batches(batch_size=ARCHIVE_BATCH_SIZE)
+
+    def refresh(self):
+        """Añade los análisis nuevos; None si otro worker está refrescando"""
+        pa = _pyarrow()
+        with self._lock:
+            handle = self._file_lock()
+            if handle is None:
+                return None
+            try:
+                watermark = self.watermark()
+                cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.settle)
+                db = self._source()
+                try:
+                    batches = self._live_batches(db, watermark, cutoff, self._deleted_keys(pa), pa)
+                    if not self.segments():
+                        # Primera instantánea: también los meses ya archivados
+                        batches = itertools.chain(self._archived_batches(db, pa), batches)
+                    rows = self._write_segment(batches, pa)
+                finally:
+                    db.close()
+                if len(self.segments()) + len(self.tombstones()) > self.max_files:
+                    self.compact()
+                with open(os.path.join(self.directory, ".refreshed"), "w") as marker:
+                    marker.write(f"{time.time():.3f}")
+                self.last_error = None
+                return rows
+            finally:
+                handle.close()
+
+    def record_deletion(self, analysis_id: int, created_at: datetime.datetime):
+        """Anota un borrado; se descuenta en las consultas desde este momento"""
+        if not self.segments():
+            return
+        self._write_tombstones([(analysis_id, created_at)], _pyarrow())
+
+    def compact(self):
+        """Une todos los segmentos en uno sin las filas borradas (se llama con el candado tomado)"""
+        pa = _pyarrow()
+        segments, tombstones = self.segments(), self.tombstones()
+        if not segments:
+            return
+        target = os.path.join(self.directory, f"segment_{segments[0][0]}_{segments[-1][1]}.parquet")
+        tmp = os.path.join(self.directory, f".compact.{os.getpid()}.tmp")
+        source = self._relation([path for _, _, path in segments], tombstones)
+        self._fetch(f"COPY (SELECT * FROM {source} ORDER BY analysis_id) TO {_sql_path(tmp)} "
+                    "(FORMAT parquet, COMPRESSION zstd)", relation=False)
+
+        # Los borrados por encima del último id vigente se conservan: una réplica retrasada
+        # aún podría devolver esas filas en el siguiente refresco
+        alive = pa.parquet.read_table(tmp, columns=["analysis_id"]).column("analysis_id")
+        newest = max((i for i in alive.to_pylist() if i is not None), default=0)
+        keep = [key for key in self._deleted_keys(pa) if key[0] > newest]
+        if keep:
+            self._write_tombstones(keep, pa)
+
+        os.replace(tmp, target)
+        for _, _, path in segments:
+            if path != target:
+                os.remove(path)
+        for path in tombstones:
+            os.remove(path)
+
+    # ---- hilo de refresco ----
+    def start(self):
+        if self._thread is not None or self.refresh_interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except AnalyticsUnavailable as e:
+                self.last_error = str(e)
+                print(f"⚠️ {e}")
+                return
+            except Exception as e:
+                self.last_error = str(e)[:300]
+                print(f"❌ Error refrescando la instantánea analítica: {e}")
+            self._stop.wait(self.refresh_interval)
+
+    # ---- consultas ----
+    def _engine(self):
+        if self._connection is None:
+            try:
+                import duckdb
+            except ImportError:
+                raise AnalyticsUnavailable("Las consultas analíticas necesitan duckdb (pip install duckdb)")
+            connection = duckdb.connect(":memory:")
+            connection.execute(f"SET memory_limit = {_sql_path(ANALYTICS_MEMORY_LIMIT)}")
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _relation(segments, tombstones):
+        relation = f"read_parquet({_sql_list(segments)}, union_by_name = true)"
+        if not tombstones:
+            return relation
+        return f"(SELECT s.* FROM {relation} s ANTI JOIN read_parquet({_sql_list(tombstones)}) d " \
+               f"ON s.analysis_id = d.analysis_id AND s.created_at IS NOT DISTINCT FROM d.created_at)"
+
+    def _fetch(self, sql: str, params=(), relation: bool = True):
+        """
+        Ejecuta sql con {source} sustituido por la instantánea vigente; None si aún no hay segmentos.
+        Una compactación de otro worker puede borrar un fichero recién listado: se reintenta.
+        """
+        for attempt in range(3):
+            segments, tombstones = self.segments(), self.tombstones()
+            if relation and not segments:
+                return None
+            statement = sql.format(source=self._relation([p for _, _, p in segments], tombstones)) if relation else sql
+            with self._engine_lock:
+                cursor = self._engine().cursor()
+            try:
+                return cursor.execute(statement, list(params)).fetchall()
+            except Exception:
+                if attempt == 2 or all(os.path.exists(path) for path in [s[2] for s in segments] + tombstones):
+                    raise
+            finally:
+                cursor.close()
+
+    def query(self, group_by: str, metrics: str, since=None, until=None, profile=None, limit: int = 500):
+        """Filas agregadas por las dimensiones pedidas, calculadas solo sobre la instantánea"""
+        dimensions, measures = parse_query(group_by, metrics)
+        limit = min(max(limit, 1), ANALYTICS_MAX_ROWS)
+
+        where, params = [], []
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+        if profile:
+            where.append("main_profile = ?")
+            params.append(profile)
+
+        select = [f"{sql} AS \"{name}\"" for name, sql in dimensions]
+        select += [f"{sql} AS m{i}" for i, (_, sql, _) in enumerate(measures)]
+        select_params = [p for _, _, extra in measures for p in extra]
+        positions = ", ".join(str(i + 1) for i in range(len(dimensions)))
+        group = f" GROUP BY {positions} ORDER BY {positions}" if dimensions else ""
+
+        rows = self._fetch(
+            f"SELECT {', '.join(select)} FROM {{source}}{' WHERE ' + ' AND '.join(where) if where else ''}{group} LIMIT {limit}",
+            select_params + params
+        )
+        if rows is None:
+            raise AnalyticsUnavailable("La instantánea analítica todavía no se ha generado")
+
+        names = [name for name, _ in dimensions] + [name for name, _, _ in measures]
+        return [
+            {name: _json_value(value) for name, value in zip(names, row)}
+            for row in rows
+        ]
+
+    def snapshot(self):
+        segments, tombstones = self.segments(), self.tombstones()
+        rows = newest = None
+        try:
+            result = self._fetch("SELECT count(*), max(analysis_id) FROM {source}")
+            if result:
+                rows, newest = result[0]
+        except AnalyticsUnavailable:
+            pass
+        refreshed = self.refreshed_at()
+        return {
+            "directory": self.directory,
+            "source": "replica" if ReplicaSessionLocal is not None else "primary",
+            "segments": len(segments),
+            "pending_deletions": len(tombstones),
+            "rows": rows,
+            "watermark": newest,
+            "refreshed_at": datetime.datetime.utcfromtimestamp(refreshed).isoformat() if refreshed else None,
+            "refresh_interval": self.refresh_interval,
+            "last_error": self.last_error,
+        }
+
+def _json_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, float):
+        return round(value, 3)
+    return value
+
+# Instancia global del proceso
+analytics_snapshot = ColumnarSnapshot(ANALYTICS_DIR, ANALYTICS_REFRESH, ANALYTICS_SETTLE, ANALYTICS_MAX_FILES)
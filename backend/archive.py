@@ -0,0 +1,599 @@
+# backend/archive.py
+"""
+Particionado mensual de system_analyses (Postgres) y archivo en frío de los meses antiguos.
+
+Los meses con más de ARCHIVE_AFTER_MONTHS de antigüedad se mueven a ficheros Parquet
+comprimidos (uno por mes, ordenados por analysis_id) y se borran de la tabla: en Postgres
+particionado se desengancha y elimina la partición entera; en SQLite o en tablas sin
+particionar se borra el rango. La API sigue encontrando esos análisis por id (detalle,
+percentil, similares, informe y borrado) y los cuenta en las estadísticas.
+
+Uso (desde backend/, pensado para un cron diario):
+    python archive.py partition      # migración única a tabla particionada (Postgres)
+    python archive.py run            # crea particiones futuras y archiva los meses antiguos
+    python archive.py status
+"""
+import datetime
+import json
+import os
+import re
+import threading
+from collections import Counter
+import config  # noqa: F401  (.env antes que el resto de módulos del backend)
+from sqlalchemy import text
+from database import engine, SessionLocal, SystemAnalysis, ArchivedPartition, partitioned_tables
+
+# Directorio de los ficheros Parquet
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# Meses completos que se conservan en la base de datos (0 = no archivar nunca)
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "12"))
+# Particiones mensuales que se crean por adelantado
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# Filas por lote al exportar y por grupo de filas en el Parquet
+ARCHIVE_BATCH_SIZE = 50000
+
+TABLE = SystemAnalysis.__tablename__
+COLUMNS = [column.name for column in SystemAnalysis.__table__.columns]
+
+class ArchiveUnavailable(Exception):
+    pass
+
+def month_start(ts: datetime.datetime):
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(ts: datetime.datetime, months: int):
+    years, month = divmod(ts.month - 1 + months, 12)
+    return ts.replace(year=ts.year + years, month=month + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ArchiveUnavailable("El archivo en Parquet necesita pyarrow (pip install pyarrow)")
+
+def arrow_schema(pa):
+    """Esquema Arrow de system_analyses (también lo usa el motor analítico)"""
+    types = {"Integer": pa.int64(), "Float": pa.float64(), "String": pa.string(), "DateTime": pa.timestamp("us")}
+    return pa.schema([(column.name, types[type(column.type).__name__]) for column in SystemAnalysis.__table__.columns])
+
+def conform_batch(batch, schema, pa):
+    """Ajusta lotes de ficheros antiguos al esquema actual (columnas nuevas a nulo)"""
+    arrays = [
+        batch.column(batch.schema.get_field_index(field.name)).cast(field.type)
+        if field.name in batch.schema.names else pa.nulls(batch.num_rows, field.type)
+        for field in schema
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def load_hardware(raw):
+    """{"cpu"|"gpu": {model_id: [análisis, suma de notas, análisis con nota]}} desde archived_partitions.hardware"""
+    stored = json.loads(raw or "{}")
+    return {kind: {int(k): list(v) for k, v in stored.get(kind, {}).items()} for kind in ("cpu", "gpu")}
+
+def dump_hardware(hardware):
+    return json.dumps({kind: {str(k): v for k, v in models.items() if v[0] > 0} for kind, models in hardware.items()})
+
+def add_hardware(models, model_id, score, n=1):
+    """Suma (o resta, con n=-1) un análisis al recuento de su modelo"""
+    if model_id is None:
+        return
+    entry = models.setdefault(model_id, [0, 0.0, 0])
+    entry[0] += n
+    if score is not None:
+        entry[1] += n * score
+        entry[2] += n
+
+def merge_hardware(models, other):
+    """Acumula en models los recuentos [análisis, suma de notas, análisis con nota] de other"""
+    for model_id, (total, score_sum, scored) in other.items():
+        entry = models.setdefault(model_id, [0, 0.0, 0])
+        entry[0] += total
+        entry[1] += score_sum
+        entry[2] += scored
+
+# -------------------------
+#   PARTICIONES (Postgres)
+# -------------------------
+def partition_name(month: datetime.datetime):
+    return f"{TABLE}_p{month:%Y_%m}"
+
+def is_partitioned():
+    return TABLE in partitioned_tables()
+
+def partition_table():
+    """
+    Migración única: convierte system_analyses en una tabla particionada por mes de created_at.
+    La unicidad global de analysis_id (que Postgres no permite en una tabla particionada si no
+    incluye la clave de partición) la mantiene analysis_id_registry mediante un trigger.
+    """
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("El particionado solo está disponible en Postgres")
+    if is_partitioned():
+        print("✅ system_analyses ya está particionada")
+        return
+
+    legacy = f"{TABLE}_unpartitioned"
+    with engine.begin() as conn:
+        bounds = conn.execute(text(f"SELECT min(created_at), max(created_at) FROM {TABLE}")).first()
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {legacy}"))
+        conn.execute(text(f"""
+            CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS)
+            PARTITION BY RANGE (created_at)
+        """))
+        conn.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN created_at SET NOT NULL"))
+        conn.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN created_at SET DEFAULT (now() AT TIME ZONE 'utc')"))
+        conn.execute(text(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created_at)"))
+        conn.execute(text(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT"))
+
+        now = month_start(datetime.datetime.utcnow())
+        first = month_start(bounds[0]) if bounds[0] else now
+        month = first
+        while month <= add_months(now, PARTITION_MONTHS_AHEAD):
+            _create_partition(conn, month)
+            month = add_months(month, 1)
+
+        columns = ", ".join(COLUMNS)
+        select = ", ".join("coalesce(created_at, now() AT TIME ZONE 'utc')" if c == "created_at" else c for c in COLUMNS)
+        conn.execute(text(f"INSERT INTO {TABLE} ({columns}) SELECT {select} FROM {legacy}"))
+
+        # Unicidad global de analysis_id: el INSERT duplicado falla con IntegrityError como antes
+        conn.execute(text("CREATE TABLE IF NOT EXISTS analysis_id_registry (analysis_id integer PRIMARY KEY)"))
+        conn.execute(text(f"""
+            INSERT INTO analysis_id_registry
+            SELECT DISTINCT analysis_id FROM {legacy} WHERE analysis_id IS NOT NULL ON CONFLICT DO NOTHING
+        """))
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION system_analyses_registry() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' AND NEW.analysis_id IS NOT NULL THEN
+                    INSERT INTO analysis_id_registry VALUES (NEW.analysis_id);
+                ELSIF TG_OP = 'DELETE' THEN
+                    DELETE FROM analysis_id_registry WHERE analysis_id = OLD.analysis_id;
+                END IF;
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text(f"""
+            CREATE TRIGGER system_analyses_registry AFTER INSERT OR DELETE ON {TABLE}
+            FOR EACH ROW EXECUTE FUNCTION system_analyses_registry()
+        """))
+
+        # La secuencia de id pasa a la tabla nueva antes de borrar la antigua
+        sequence = conn.execute(text(f"SELECT pg_get_serial_sequence('{legacy}', 'id')")).scalar()
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+
+        # Índices del modelo sobre la tabla padre (se propagan a cada partición); analysis_id
+        # no puede ser UNIQUE aquí, de eso se encarga el registro
+        for index in SystemAnalysis.__table__.indexes:
+            columns = ", ".join(column.name for column in index.columns)
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index.name} ON {TABLE} ({columns})"))
+
+    # El índice de búsqueda se recrea sobre la tabla particionada
+    from search_index import create_search_index
+    create_search_index()
+    print(f"✅ system_analyses particionada por mes desde {first:%Y-%m}")
+
+def _create_partition(conn, month: datetime.datetime):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE}
+        FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')
+    """))
+
+def ensure_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """Particiones del mes actual y los siguientes; las filas fuera de rango caen en la DEFAULT"""
+    if not is_partitioned():
+        return 0
+    now = month_start(datetime.datetime.utcnow())
+    created = 0
+    for offset in range(months_ahead + 1):
+        month = add_months(now, offset)
+        try:
+            with engine.begin() as conn:
+                _create_partition(conn, month)
+            created += 1
+        except Exception as e:
+            print(f"⚠️ No se pudo crear la partición {partition_name(month)}: {e}")
+    return created
+
+def _partition_exists(conn, month):
+    return conn.execute(text("SELECT to_regclass(:name)"), {"name": partition_name(month)}).scalar() is not None
+
+# -------------------------
+#   ARCHIVO
+# -------------------------
+class AnalysisArchive:
+    """Ficheros Parquet mensuales con los análisis archivados y sus metadatos en archived_partitions"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()  # serializa las reescrituras de ficheros de este proceso
+
+    def path(self, month: datetime.datetime):
+        return os.path.join(self.directory, f"system_analyses_{month:%Y_%m}.parquet")
+
+    def files(self, db):
+        """
+        [(mes, ruta)] de los meses archivados según archived_partitions, en orden cronológico.
+        Un fichero sin su fila (exportación a medias) no cuenta: sus análisis siguen en la tabla.
+        """
+        found = []
+        for partition in db.query(ArchivedPartition).filter(ArchivedPartition.rows > 0).order_by(ArchivedPartition.month):
+            if os.path.exists(partition.path):
+                found.append((datetime.datetime.strptime(partition.month, "%Y-%m"), partition.path))
+        return found
+
+    # ---- lectura ----
+    def scan(self, db, columns, start=None, end=None):
+        """Tuplas con las columnas pedidas de los análisis archivados con created_at en [start, end)"""
+        files = self.files(db)
+        if not files:
+            return
+        pa = _pyarrow()
+        for month, path in files:
+            if (end is not None and month >= end) or (start is not None and add_months(month, 1) <= start):
+                continue
+            reader = pa.parquet.ParquetFile(path)
+            for batch in reader.iter_batches(batch_size=ARCHIVE_BATCH_SIZE, columns=list(dict.fromkeys(list(columns) + ["created_at"]))):
+                data = batch.to_pydict()
+                created = data["created_at"]
+                for i, row in enumerate(zip(*(data[c] for c in columns))):
+                    if (start is None or created[i] >= start) and (end is None or created[i] < end):
+                        yield row
+
+    def _read(self, path, analysis_ids):
+        pa = _pyarrow()
+        table = pa.parquet.read_table(path, filters=[("analysis_id", "in", list(analysis_ids))])
+        return table.to_pylist()
+
+    def find_many(self, db, analysis_ids):
+        """{analysis_id: SystemAnalysis no persistente} de los ids que están archivados"""
+        ids = sorted(set(analysis_ids))
+        if not ids:
+            return {}
+        candidates = db.query(ArchivedPartition).filter(
+            ArchivedPartition.min_analysis_id <= ids[-1], ArchivedPartition.max_analysis_id >= ids[0]
+        ).all()
+        found = {}
+        for partition in candidates:
+            wanted = [i for i in ids if partition.min_analysis_id <= i <= partition.max_analysis_id and i not in found]
+            if not wanted or not os.path.exists(partition.path):
+                continue
+            try:
+                rows = self._read(partition.path, wanted)
+            except ArchiveUnavailable as e:
+                print(f"⚠️ {e}")
+                return found
+            for row in rows:
+                found[row["analysis_id"]] = SystemAnalysis(**{k: v for k, v in row.items() if k in COLUMNS})
+        return found
+
+    def find(self, db, analysis_id: int):
+        return self.find_many(db, [analysis_id]).get(analysis_id)
+
+    def totals(self, db):
+        """(análisis, suma de puntuaciones, Counter por perfil) de todos los meses archivados"""
+        rows, score_sum, profiles = 0, 0.0, Counter()
+        for partition in db.query(ArchivedPartition).all():
+            rows += partition.rows
+            score_sum += partition.score_sum
+            profiles.update(json.loads(partition.profiles or "{}"))
+        return rows, score_sum, profiles
+
+    def score_counts(self, db):
+        """Counter puntuación -> análisis de todos los meses archivados (mejor nota y rangos)"""
+        counts = Counter()
+        for partition in db.query(ArchivedPartition).filter(ArchivedPartition.rows > 0).all():
+            if partition.scores is not None:
+                counts.update({float(score): n for score, n in json.loads(partition.scores).items()})
+            elif os.path.exists(partition.path):
+                # Meses archivados antes de guardar el reparto: se lee del fichero
+                try:
+                    pa = _pyarrow()
+                except ArchiveUnavailable as e:
+                    print(f"⚠️ {e}")
+                    continue
+                column = pa.parquet.read_table(partition.path, columns=["main_score"]).column("main_score")
+                counts.update(score for score in column.to_pylist() if score is not None)
+        return counts
+
+    def hardware_counts(self, db, kind: str):
+        """{model_id: [análisis, suma de notas, análisis con nota]} de CPU o GPU en los meses archivados"""
+        counts = {}
+        for partition in db.query(ArchivedPartition).filter(ArchivedPartition.rows > 0).all():
+            if partition.hardware is not None:
+                merge_hardware(counts, load_hardware(partition.hardware)[kind])
+            elif os.path.exists(partition.path):
+                # Meses archivados antes de guardar el recuento por modelo: se lee del fichero
+                try:
+                    pa = _pyarrow()
+                except ArchiveUnavailable as e:
+                    print(f"⚠️ {e}")
+                    continue
+                table = pa.parquet.read_table(partition.path, columns=[f"{kind}_model_id", "main_score"])
+                for model_id, score in zip(*(column.to_pylist() for column in table.columns)):
+                    add_hardware(counts, model_id, score)
+        return counts
+
+    def search(self, db, tokens, limit: int, offset: int = 0):
+        """
+        Análisis archivados cuyo cpu_model o gpu_model tiene palabras que empiezan por todos los
+        tokens (el mismo criterio que search_index), del más reciente al más antiguo.
+        Devuelve ([SystemAnalysis no persistente], hay_más).
+        """
+        files = self.files(db)
+        if not tokens or not files:
+            return [], False
+        try:
+            pa = _pyarrow()
+        except ArchiveUnavailable as e:
+            print(f"⚠️ {e}")
+            return [], False
+        import pyarrow.compute as pc
+        patterns = [f"(?:^|[^0-9a-zA-ZÀ-ſ]){re.escape(token)}" for token in tokens]
+        found = []  # (ruta, analysis_id) del más reciente al más antiguo
+        for _, path in reversed(files):
+            table = pa.parquet.read_table(path, columns=["analysis_id", "cpu_model", "gpu_model"])
+            text_column = pc.binary_join_element_wise(
+                pc.fill_null(table.column("cpu_model"), ""), pc.fill_null(table.column("gpu_model"), ""), " "
+            )
+            mask = None
+            for pattern in patterns:
+                matches = pc.match_substring_regex(text_column, pattern=pattern, ignore_case=True)
+                mask = matches if mask is None else pc.and_(mask, matches)
+            ids = pc.filter(table.column("analysis_id"), mask).to_pylist()
+            found.extend((path, analysis_id) for analysis_id in sorted(ids, reverse=True))
+            # Se buscan limit + 1 filas para saber si hay más páginas, sin leer los meses restantes
+            if len(found) > offset + limit:
+                break
+
+        # Solo se leen enteras las filas de la página pedida
+        page = found[offset:offset + limit]
+        rows = {}
+        for path in dict.fromkeys(path for path, _ in page):
+            for row in self._read(path, [analysis_id for p, analysis_id in page if p == path]):
+                rows[row["analysis_id"]] = SystemAnalysis(**{k: v for k, v in row.items() if k in COLUMNS})
+        return [rows[analysis_id] for _, analysis_id in page if analysis_id in rows], len(found) > offset + limit
+
+    # ---- escritura ----
+    def _write_tmp(self, path, batches, pa):
+        """Escribe los lotes en un fichero temporal junto a path y devuelve su ruta"""
+        schema = arrow_schema(pa)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        writer = pa.parquet.ParquetWriter(tmp, schema, compression="zstd")
+        try:
+            for batch in batches:
+                if batch.num_rows:
+                    writer.write_table(pa.Table.from_batches([conform_batch(batch, schema, pa)]),
+                                       row_group_size=ARCHIVE_BATCH_SIZE)
+        except BaseException:
+            writer.close()
+            os.remove(tmp)
+            raise
+        writer.close()
+        return tmp
+
+    def _write(self, path, batches, pa):
+        """Escribe los lotes en un fichero temporal y lo sustituye de forma atómica"""
+        os.replace(self._write_tmp(path, batches, pa), path)
+
+    def archive_month(self, db, month: datetime.datetime):
+        """Mueve un mes de la tabla al archivo; devuelve las filas archivadas"""
+        pa = _pyarrow()
+        os.makedirs(self.directory, exist_ok=True)
+        end = add_months(month, 1)
+        in_month = (SystemAnalysis.created_at >= month, SystemAnalysis.created_at < end)
+        partitioned = is_partitioned()
+        source = partition_name(month) if partitioned and _partition_exists(db.connection(), month) else None
+
+        stats = {"rows": 0, "score_sum": 0.0, "profiles": Counter(), "scores": Counter(),
+                 "hardware": {"cpu": {}, "gpu": {}}, "min": None, "max": None}
+        schema = arrow_schema(pa)
+
+        def new_batches():
+            if source:
+                query = text(f"SELECT {', '.join(COLUMNS)} FROM {source} ORDER BY analysis_id")
+            else:
+                query = SystemAnalysis.__table__.select().where(*in_month).order_by(SystemAnalysis.analysis_id)
+            result = db.connection().execute(query.execution_options(yield_per=ARCHIVE_BATCH_SIZE))
+            for chunk in result.partitions(ARCHIVE_BATCH_SIZE):
+                data = {name: [row._mapping[name] for row in chunk] for name in COLUMNS}
+                for analysis_id, profile, score, cpu_id, gpu_id in zip(
+                    data["analysis_id"], data["main_profile"], data["main_score"], data["cpu_model_id"], data["gpu_model_id"]
+                ):
+                    stats["rows"] += 1
+                    stats["score_sum"] += score or 0.0
+                    stats["profiles"][profile] += 1
+                    if score is not None:
+                        stats["scores"][score] += 1
+                    add_hardware(stats["hardware"]["cpu"], cpu_id, score)
+                    add_hardware(stats["hardware"]["gpu"], gpu_id, score)
+                    if analysis_id is not None:
+                        stats["min"] = analysis_id if stats["min"] is None else min(stats["min"], analysis_id)
+                        stats["max"] = analysis_id if stats["max"] is None else max(stats["max"], analysis_id)
+                yield pa.RecordBatch.from_pydict(data, schema=schema)
+
+        label = f"{month:%Y-%m}"
+        path = self.path(month)
+        # Meses sin filas: ni fichero ni metadatos
+        if source:
+            empty = db.execute(text(f"SELECT 1 FROM {source} LIMIT 1")).first() is None
+        else:
+            empty = db.query(SystemAnalysis.id).filter(*in_month).first() is None
+        if empty:
+            db.rollback()
+            return 0
+
+        with self._lock:
+            previous = db.query(ArchivedPartition).filter_by(month=label).first()
+
+            def all_batches():
+                # Un mes ya archivado que recibe filas tardías se reescribe con las dos partes
+                if previous is not None and os.path.exists(previous.path):
+                    yield from pa.parquet.ParquetFile(previous.path).iter_batches(batch_size=ARCHIVE_BATCH_SIZE)
+                yield from new_batches()
+
+            # El fichero definitivo no se toca hasta que el borrado esté listo para confirmarse:
+            # hasta entonces la tabla y los metadatos siguen siendo la única fuente de esos análisis
+            tmp = self._write_tmp(path, all_batches(), pa)
+            try:
+                # Solo se borra lo exportado: si entraron filas nuevas en el mes, se deja para la próxima vez
+                if source:
+                    db.execute(text(f"LOCK TABLE {source} IN EXCLUSIVE MODE"))
+                    current = db.execute(text(f"SELECT count(*) FROM {source}")).scalar()
+                else:
+                    current = db.query(SystemAnalysis.id).filter(*in_month).count()
+                if not stats["rows"] or current != stats["rows"]:
+                    os.remove(tmp)
+                    db.rollback()
+                    if stats["rows"]:
+                        print(f"⚠️ {label}: la tabla cambió durante la exportación, se reintentará")
+                    return 0
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+
+            if source:
+                db.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {source}"))
+                db.execute(text(f"DROP TABLE {source}"))
+            else:
+                db.query(SystemAnalysis).filter(*in_month).delete(synchronize_session=False)
+
+            if previous is None:
+                previous = ArchivedPartition(month=label, path=path, rows=0, score_sum=0.0, profiles="{}")
+                db.add(previous)
+            profiles = Counter(json.loads(previous.profiles or "{}"))
+            profiles.update(stats["profiles"])
+            previous.path = path
+            previous.rows += stats["rows"]
+            previous.score_sum += stats["score_sum"]
+            previous.profiles = json.dumps(dict(profiles))
+            # Un mes archivado antes de guardar el reparto de notas lo sigue leyendo de su fichero
+            if previous.rows == stats["rows"] or previous.scores is not None:
+                scores = Counter({float(k): n for k, n in json.loads(previous.scores or "{}").items()})
+                scores.update(stats["scores"])
+                previous.scores = json.dumps({str(k): n for k, n in scores.items()})
+            # Igual con el recuento por modelo de CPU/GPU
+            if previous.rows == stats["rows"] or previous.hardware is not None:
+                hardware = load_hardware(previous.hardware)
+                for kind, models in stats["hardware"].items():
+                    merge_hardware(hardware[kind], models)
+                previous.hardware = dump_hardware(hardware)
+            previous.min_analysis_id = min(i for i in (previous.min_analysis_id, stats["min"]) if i is not None)
+            previous.max_analysis_id = max(i for i in (previous.max_analysis_id, stats["max"]) if i is not None)
+            previous.archived_at = datetime.datetime.utcnow()
+            db.flush()
+            os.replace(tmp, path)
+            db.commit()
+        return stats["rows"]
+
+    def delete(self, db, analysis_id: int):
+        """Borra un análisis archivado reescribiendo su mes; devuelve la fila borrada o None"""
+        analysis = self.find(db, analysis_id)
+        if analysis is None:
+            return None
+        pa = _pyarrow()
+        import pyarrow.compute as pc
+        with self._lock:
+            partition = db.query(ArchivedPartition).filter(
+                ArchivedPartition.min_analysis_id <= analysis_id, ArchivedPartition.max_analysis_id >= analysis_id
+            ).filter(ArchivedPartition.month == f"{analysis.created_at:%Y-%m}").first()
+            if partition is None:
+                return None
+            partition.rows -= 1
+            partition.score_sum -= analysis.main_score or 0.0
+            profiles = Counter(json.loads(partition.profiles or "{}"))
+            profiles[analysis.main_profile] -= 1
+            partition.profiles = json.dumps({k: v for k, v in profiles.items() if v > 0})
+            if partition.scores is not None and analysis.main_score is not None:
+                scores = Counter({float(k): n for k, n in json.loads(partition.scores).items()})
+                scores[analysis.main_score] -= 1
+                partition.scores = json.dumps({str(k): n for k, n in scores.items() if n > 0})
+            if partition.hardware is not None:
+                hardware = load_hardware(partition.hardware)
+                add_hardware(hardware["cpu"], analysis.cpu_model_id, analysis.main_score, n=-1)
+                add_hardware(hardware["gpu"], analysis.gpu_model_id, analysis.main_score, n=-1)
+                partition.hardware = dump_hardware(hardware)
+
+            if partition.rows <= 0:
+                os.remove(partition.path)
+                db.delete(partition)
+            else:
+                batches = pa.parquet.ParquetFile(partition.path).iter_batches(batch_size=ARCHIVE_BATCH_SIZE)
+                self._write(partition.path, (
+                    batch.filter(pc.not_equal(batch.column("analysis_id"), analysis_id)) for batch in batches
+                ), pa)
+            # DETACH/DROP no disparan el trigger: el id archivado sigue reservado hasta borrarlo aquí
+            if is_partitioned():
+                db.execute(text("DELETE FROM analysis_id_registry WHERE analysis_id = :id"), {"id": analysis_id})
+            db.commit()
+        return analysis
+
+    def run(self, db, older_than_months: int = ARCHIVE_AFTER_MONTHS):
+        """Archiva todos los meses completos anteriores al límite; devuelve {mes: filas}"""
+        if older_than_months <= 0:
+            return {}
+        cutoff = add_months(month_start(datetime.datetime.utcnow()), -older_than_months)
+        oldest = db.query(SystemAnalysis.created_at).filter(SystemAnalysis.created_at < cutoff) \
+            .order_by(SystemAnalysis.created_at).first()
+        archived = {}
+        if oldest is None:
+            return archived
+        month = month_start(oldest[0])
+        while month < cutoff:
+            rows = self.archive_month(db, month)
+            if rows:
+                archived[f"{month:%Y-%m}"] = rows
+                print(f"✅ {month:%Y-%m}: {rows} análisis archivados")
+            month = add_months(month, 1)
+        return archived
+
+    def snapshot(self, db):
+        partitions = db.query(ArchivedPartition).order_by(ArchivedPartition.month).all()
+        return {
+            "directory": self.directory,
+            "archive_after_months": ARCHIVE_AFTER_MONTHS,
+            "partitioned": is_partitioned(),
+            "months": [{
+                "month": p.month,
+                "rows": p.rows,
+                "bytes": os.path.getsize(p.path) if os.path.exists(p.path) else None,
+                "archived_at": p.archived_at.isoformat() if p.archived_at else None,
+            } for p in partitions],
+        }
+
+# Instancia global del proceso
+analysis_archive = AnalysisArchive(ARCHIVE_DIR)
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["partition", "run", "status"])
+    parser.add_argument("--older-than-months", type=int, default=ARCHIVE_AFTER_MONTHS)
+    args = parser.parse_args()
+
+    from database import create_tables
+    create_tables()
+    if args.command == "partition":
+        partition_table()
+        return
+
+    db = SessionLocal()
+    try:
+        if args.command == "run":
+            created = ensure_partitions()
+            if created:
+                print(f"✅ Particiones comprobadas: {created} meses")
+            archived = analysis_archive.run(db, args.older_than_months)
+            print(f"✅ Archivo: {sum(archived.values())} análisis en {len(archived)} meses")
+        else:
+            print(json.dumps(analysis_archive.snapshot(db), indent=2, ensure_ascii=False))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# backend/benchmarks/bench_outbox.py
+"""
+Ritmo de vaciado del outbox de informes: entregas/s según el número de workers.
+
+Usa una BD SQLite temporal y el almacenamiento en memoria salvo que se indique otro.
+Uso (desde backend/):
+    python benchmarks/bench_outbox.py --entries 500 --max-workers 8
+    STORAGE_BACKEND=local python benchmarks/bench_outbox.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp.name}/bench_outbox.db")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LOCAL_STORAGE_DIR", os.path.join(_tmp.name, "artifacts"))
+
+from database import SessionLocal, SystemAnalysis, ReportOutbox, create_tables
+from outbox import ReportOutboxWorkers, enqueue
+from report_pool import report_renderer
+from scoring import scoring_models
+from storage import artifact_storage
+from bench_pdf_render import SAMPLES
+
+def fill(entries: int, first_id: int):
+    model = scoring_models.current()
+    db = SessionLocal()
+    try:
+        for i in range(entries):
+            sysinfo = SAMPLES[i % len(SAMPLES)]
+            result = model.score(sysinfo)
+            analysis_id = first_id + i
+            db.add(SystemAnalysis(analysis_id=analysis_id, main_profile=result["main_profile"], main_score=result["main_score"]))
+            enqueue(db, analysis_id, sysinfo, result)
+        db.commit()
+    finally:
+        db.close()
+
+def depth():
+    db = SessionLocal()
+    try:
+        return db.query(ReportOutbox).filter(ReportOutbox.status != "failed").count()
+    finally:
+        db.close()
+
+def run(workers: int, entries: int, first_id: int):
+    fill(entries, first_id)
+    pool = ReportOutboxWorkers(artifact_storage, workers, poll_interval=0.05)
+    start = time.perf_counter()
+    pool.start()
+    while depth():
+        time.sleep(0.02)
+    elapsed = time.perf_counter() - start
+    pool.stop()
+    return entries / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=300)
+    parser.add_argument("--max-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    create_tables()
+    artifact_storage.setup()
+    # Calentar el pool de renderizado antes de medir
+    run(1, 5, 1)
+
+    first_id = 100
+    workers = 1
+    while workers <= args.max_workers:
+        rate = run(workers, args.entries, first_id)
+        first_id += args.entries
+        print(f"{workers:>3} workers: {rate:8.1f} entregas/s  ({artifact_storage.name})")
+        workers *= 2
+    report_renderer.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# backend/benchmarks/bench_pdf_render.py
+"""
+Informes PDF por segundo (tiempo de CPU) con y sin la caché de bloques estáticos.
+
+Uso (desde backend/):
+    python benchmarks/bench_pdf_render.py --reports 500
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_report import PDF, create_pdf_report
+from scoring import scoring_models
+
+SAMPLES = [
+    {"cpu_model": "Intel Core i3-10100", "cpu_speed_ghz": 3.6, "cores": 4, "ram_gb": 8,
+     "disk_type": "HDD", "gpu_model": "GTX 1650", "gpu_vram_gb": 4},
+    {"cpu_model": "AMD Ryzen 9 7950X", "cpu_speed_ghz": 4.5, "cores": 16, "ram_gb": 64,
+     "disk_type": "NVMe", "gpu_model": "RTX 4090", "gpu_vram_gb": 24},
+    {"cpu_model": "Intel Core i5-1135G7", "cpu_speed_ghz": 2.4, "cores": 4, "ram_gb": 16,
+     "disk_type": "SSD", "gpu_model": "Intel Iris Xe", "gpu_vram_gb": 0},
+]
+
+def run(reports: int, use_cache: bool):
+    PDF.use_static_cache = use_cache
+    PDF.static_cache.clear()
+    inputs = [(info, scoring_models.current().score(info)) for info in SAMPLES]
+
+    start = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(reports):
+            info, result = inputs[i % len(inputs)]
+            create_pdf_report(info, result, i + 1)
+    return reports / (time.process_time() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reports", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for label, use_cache in (("sin caché", False), ("con caché", True)):
+            best = max(run(args.reports, use_cache) for _ in range(args.rounds))
+            print(f"{label:>10}: {best:8.1f} informes/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# backend/benchmarks/bench_report_pool.py
+"""
+Escalado del pool de renderizado: informes/s (tiempo real) según el número de workers.
+
+Uso (desde backend/):
+    python benchmarks/bench_report_pool.py --reports 2000 --max-workers 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_pool import ReportRenderer
+from scoring import scoring_models
+from bench_pdf_render import SAMPLES
+
+def run(workers: int, reports: int):
+    renderer = ReportRenderer(workers, queue_size=workers * 4, queue_timeout=60)
+    model = scoring_models.current()
+    jobs = [(SAMPLES[i % len(SAMPLES)], model.score(SAMPLES[i % len(SAMPLES)]), i + 1) for i in range(reports)]
+    try:
+        # Calentar los procesos (arranque e imports) antes de medir
+        renderer.render_many(jobs[:workers * 2])
+        start = time.perf_counter()
+        renderer.render_many(jobs)
+        return reports / (time.perf_counter() - start)
+    finally:
+        renderer.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reports", type=int, default=1000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    baseline = None
+    workers = 1
+    while workers <= args.max_workers:
+        rate = run(workers, args.reports)
+        baseline = baseline or rate
+        print(f"{workers:>3} workers: {rate:8.1f} informes/s  (x{rate / baseline:.2f})")
+        workers *= 2
+
+if __name__ == "__main__":
+    main()
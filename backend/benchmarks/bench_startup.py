@@ -0,0 +1,147 @@
+# backend/benchmarks/bench_startup.py
+"""
+Tiempo de arranque de la API: importación de main y tiempo hasta la primera petición servida.
+
+Cada ejecución lanza uvicorn en un proceso nuevo y sondea GET /api/admission hasta obtener
+respuesta; el tiempo cuenta desde el lanzamiento del proceso. Después sigue sondeando
+/api/analyses/1/percentile hasta que los índices en memoria (que se cargan en segundo plano)
+dejan de responder 503.
+
+Por defecto arranca sobre una flota sintética de --fleet-rows análisis (generate_fleet.py):
+el coste de arranque que importa es el que crece con la tabla. --fleet-rows 0 usa una BD
+vacía y --database-url una existente.
+
+Uso (desde backend/):
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --fleet-rows 200000
+    python benchmarks/bench_startup.py --database-url sqlite:////tmp/fleet.db
+    python benchmarks/bench_startup.py --env STORAGE_BACKEND=dropbox DROPBOX_ACCESS_TOKEN=x
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+
+from loadtest import BACKEND_DIR, free_port
+
+# Módulos que no deberían cargarse hasta su primer uso
+LAZY_MODULES = ("fpdf", "pdf_report", "dropbox", "dotenv")
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+def server_env(workdir, database_url, overrides):
+    env = dict(os.environ)
+    env.setdefault("STORAGE_BACKEND", "memory")
+    env.setdefault("REPORT_CACHE_DIR", os.path.join(workdir, "report_cache"))
+    env["DATABASE_URL"] = database_url or f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    env.update(overrides)
+    return env
+
+def measure_import(env):
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def generate_fleet(env, rows):
+    """Flota sintética en la BD de env (la misma semilla en cada ejecución)"""
+    print(f"Generando flota sintética de {rows} análisis...")
+    subprocess.run([sys.executable, os.path.join("benchmarks", "generate_fleet.py"), "--rows", str(rows)],
+                   cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+
+def wait_until(url, timeout, start, ready):
+    while time.perf_counter() - start < timeout:
+        try:
+            if ready(requests.get(url, timeout=1)):
+                return time.perf_counter() - start
+        except requests.RequestException:
+            pass
+        time.sleep(0.01)
+    raise SystemExit(f"{url} no respondió en {timeout:g} s")
+
+def time_to_first_request(env, timeout):
+    """(segundos hasta la primera respuesta correcta, segundos hasta tener los índices cargados)"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise SystemExit(f"El servidor no arrancó:\n{process.stderr.read().decode(errors='replace')}")
+            try:
+                if requests.get(f"{base}/api/admission", timeout=1).ok:
+                    break
+            except requests.RequestException:
+                time.sleep(0.01)
+        else:
+            raise SystemExit(f"El servidor no respondió en {timeout:g} s")
+        first = time.perf_counter() - start
+        indexes = wait_until(f"{base}/api/analyses/1/percentile", timeout, start, lambda r: r.status_code != 503)
+        return first, indexes
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+def summary(values):
+    return {
+        "min_ms": round(min(values) * 1000, 1),
+        "median_ms": round(statistics.median(values) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", help="BD sobre la que arrancar (por defecto, SQLite temporal con la flota)")
+    parser.add_argument("--fleet-rows", type=int, default=50000, help="análisis de la flota sintética (0 = BD vacía)")
+    parser.add_argument("--env", nargs="*", default=[], metavar="CLAVE=VALOR", help="variables extra para el servidor")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--out", help="JSON con los resultados")
+    args = parser.parse_args()
+
+    overrides = dict(item.split("=", 1) for item in args.env)
+    with tempfile.TemporaryDirectory() as workdir:
+        env = server_env(workdir, args.database_url, overrides)
+        if not args.database_url and args.fleet_rows > 0:
+            generate_fleet(env, args.fleet_rows)
+        # Primera ejecución descartada: crea tablas e índices y calienta la caché de bytecode
+        time_to_first_request(env, args.timeout)
+
+        imports = [measure_import(env) for _ in range(args.runs)]
+        startups = [time_to_first_request(env, args.timeout) for _ in range(args.runs)]
+
+    results = {
+        "database": "existing" if args.database_url else f"fleet of {args.fleet_rows}",
+        "import_main": summary([run["seconds"] for run in imports]),
+        "time_to_first_request": summary([first for first, _ in startups]),
+        "time_to_indexes_ready": summary([indexes for _, indexes in startups]),
+        "eager_modules": imports[0]["loaded"],
+    }
+    print(f"import main               mediana {results['import_main']['median_ms']:8.1f} ms  "
+          f"(min {results['import_main']['min_ms']:.1f}, max {results['import_main']['max_ms']:.1f})")
+    print(f"primera petición servida  mediana {results['time_to_first_request']['median_ms']:8.1f} ms  "
+          f"(min {results['time_to_first_request']['min_ms']:.1f}, max {results['time_to_first_request']['max_ms']:.1f})")
+    print(f"índices en memoria listos mediana {results['time_to_indexes_ready']['median_ms']:8.1f} ms  "
+          f"(min {results['time_to_indexes_ready']['min_ms']:.1f}, max {results['time_to_indexes_ready']['max_ms']:.1f})")
+    if results["eager_modules"]:
+        print(f"⚠️ Módulos pesados cargados al importar: {', '.join(results['eager_modules'])}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
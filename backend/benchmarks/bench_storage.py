@@ -0,0 +1,60 @@
+# backend/benchmarks/bench_storage.py
+"""
+Latencia de subida (put + link) por backend de almacenamiento con informes reales.
+
+Uso (desde backend/):
+    python benchmarks/bench_storage.py --uploads 500 --backends memory local
+    DROPBOX_ACCESS_TOKEN=... python benchmarks/bench_storage.py --uploads 20 --backends dropbox
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_report import render_pdf_report
+from scoring import scoring_models
+from storage import DropboxStorage, LocalStorage, MemoryStorage
+from bench_pdf_render import SAMPLES
+
+def make_storage(backend: str, root: str):
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "local":
+        return LocalStorage(root)
+    if backend == "dropbox":
+        storage = DropboxStorage(os.getenv("DROPBOX_ACCESS_TOKEN"), folder="/AnalizaPC-Reports/bench")
+        if not storage.available:
+            raise SystemExit("dropbox: falta DROPBOX_ACCESS_TOKEN")
+        return storage
+    raise SystemExit(f"Backend desconocido: {backend}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--backends", nargs="+", default=["memory", "local"])
+    args = parser.parse_args()
+
+    model = scoring_models.current()
+    # Informes distintos: con direccionamiento por contenido, repetir bytes no mediría nada
+    payloads = []
+    for i in range(args.uploads):
+        sysinfo = SAMPLES[i % len(SAMPLES)]
+        payloads.append((f"analisis_{i + 1:04d}.pdf", render_pdf_report(sysinfo, model.score(sysinfo), i + 1)))
+
+    with tempfile.TemporaryDirectory() as root:
+        for backend in args.backends:
+            storage = make_storage(backend, os.path.join(root, backend))
+            storage.setup()
+            start = time.perf_counter()
+            for filename, data in payloads:
+                storage.upload(filename, data)
+            elapsed = time.perf_counter() - start
+            stats = storage.metrics.snapshot()
+            print(f"{backend:>8}: {args.uploads / elapsed:9.1f} subidas/s  "
+                  f"p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms  p99 {stats['p99_ms']} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# backend/benchmarks/generate_fleet.py
+"""
+Generador de flotas sintéticas: carga masiva de análisis plausibles en SQLite o Postgres.
+
+Los modelos de CPU/GPU, discos y RAM siguen una distribución realista, las fechas llegan como
+un proceso de Poisson a lo largo de --days días y las puntuaciones se calculan con el modelo de
+scoring vigente. La misma --seed produce siempre las mismas filas. Inserta por lotes con
+executemany (SQLite) o COPY (Postgres) y, opcionalmente, guarda los JSON de cada análisis en un
+almacén local direccionado por contenido. Cada lote deja su evento en dashboard_events, como
+una importación, para que los workers en marcha lo vean (índices en memoria y dashboard).
+
+Uso (desde backend/):
+    python benchmarks/generate_fleet.py --rows 1000000
+    python benchmarks/generate_fleet.py --rows 5000000 --database-url postgresql://localhost/analiza
+    python benchmarks/generate_fleet.py --rows 20000 --artifacts-dir artifacts
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Variantes tal como las reportan los sistemas operativos, peso, núcleos posibles, rango de GHz
+CPU_CATALOG = [
+    (["Intel(R) Core(TM) i3-10100 CPU @ 3.60GHz", "Intel Core i3-10100"], 6, (4,), (3.6, 4.3)),
+    (["Intel(R) Core(TM) i5-8250U CPU @ 1.60GHz", "Intel Core i5-8250U"], 7, (4,), (1.6, 3.4)),
+    (["Intel(R) Core(TM) i5-10400 CPU @ 2.90GHz", "Intel Core i5-10400"], 9, (6,), (2.9, 4.3)),
+    (["11th Gen Intel(R) Core(TM) i5-1135G7 @ 2.40GHz", "Intel Core i5-1135G7"], 8, (4,), (2.4, 4.2)),
+    (["12th Gen Intel(R) Core(TM) i5-12400F", "Intel Core i5-12400F"], 9, (6,), (2.5, 4.4)),
+    (["Intel(R) Core(TM) i7-8700K CPU @ 3.70GHz", "Intel Core i7-8700K"], 4, (6,), (3.7, 4.7)),
+    (["Intel(R) Core(TM) i7-10700K CPU @ 3.80GHz", "Intel Core i7-10700K"], 6, (8,), (3.8, 5.1)),
+    (["12th Gen Intel(R) Core(TM) i7-12700H", "Intel Core i7-12700H"], 5, (14,), (2.3, 4.7)),
+    (["13th Gen Intel(R) Core(TM) i9-13900K", "Intel Core i9-13900K"], 2, (24,), (3.0, 5.8)),
+    (["Intel(R) Core(TM) Ultra 7 155H", "Intel Core Ultra 7 155H"], 2, (16,), (1.4, 4.8)),
+    (["AMD Ryzen 3 3200G with Radeon Vega Graphics", "AMD Ryzen 3 3200G"], 4, (4,), (3.6, 4.0)),
+    (["AMD Ryzen 5 3600 6-Core Processor", "AMD Ryzen 5 3600"], 8, (6,), (3.6, 4.2)),
+    (["AMD Ryzen 5 5600X 6-Core Processor", "AMD Ryzen 5 5600X"], 8, (6,), (3.7, 4.6)),
+    (["AMD Ryzen 7 5800X3D 8-Core Processor", "AMD Ryzen 7 5800X3D"], 4, (8,), (3.4, 4.5)),
+    (["AMD Ryzen 7 PRO 5850U with Radeon Graphics", "AMD Ryzen 7 PRO 5850U"], 3, (8,), (1.9, 4.4)),
+    (["AMD Ryzen 9 5900X 12-Core Processor", "AMD Ryzen 9 5900X"], 3, (12,), (3.7, 4.8)),
+    (["AMD Ryzen 9 7950X 16-Core Processor", "AMD Ryzen 9 7950X"], 2, (16,), (4.5, 5.7)),
+    (["Apple M1", "Apple M1"], 5, (8,), (3.2, 3.2)),
+    (["Apple M2 Pro", "Apple M2 Pro"], 3, (10, 12), (3.5, 3.5)),
+]
+
+# Variantes, peso, VRAM posibles (GB)
+GPU_CATALOG = [
+    (["Intel(R) UHD Graphics 630", "Intel UHD Graphics"], 12, (0,)),
+    (["Intel(R) Iris(R) Xe Graphics", "Intel Iris Xe"], 9, (0,)),
+    (["AMD Radeon(TM) Graphics", "AMD Radeon Vega 8"], 6, (0, 1)),
+    (["NVIDIA GeForce GTX 1050 Ti", "GTX 1050Ti"], 5, (4,)),
+    (["NVIDIA GeForce GTX 1650", "NVIDIA GeForce GTX 1650 Laptop GPU"], 9, (4,)),
+    (["NVIDIA GeForce GTX 1660 SUPER", "GTX 1660 Super"], 7, (6,)),
+    (["NVIDIA GeForce RTX 2060", "RTX 2060"], 6, (6, 12)),
+    (["NVIDIA GeForce RTX 3060", "NVIDIA GeForce RTX 3060 Laptop GPU"], 10, (6, 8, 12)),
+    (["NVIDIA GeForce RTX 3070 Ti", "rtx3070ti"], 5, (8,)),
+    (["NVIDIA GeForce RTX 4070", "RTX 4070"], 5, (12,)),
+    (["NVIDIA GeForce RTX 4090", "RTX 4090"], 1, (24,)),
+    (["AMD Radeon RX 580", "Radeon RX 580 Series"], 4, (4, 8)),
+    (["AMD Radeon RX 6700 XT", "RX 6700XT"], 4, (12,)),
+    (["AMD Radeon RX 7900 XTX", "RX 7900 XTX"], 1, (24,)),
+    (["Intel(R) Arc(TM) A770 Graphics", "Intel Arc A770"], 1, (8, 16)),
+]
+
+DISKS = [("SSD", 45), ("NVMe", 35), ("HDD", 20)]
+RAM_GB = [(4, 5), (8, 25), (16, 40), (32, 22), (64, 6), (128, 2)]
+
+COLUMNS = ("analysis_id", "cpu_model", "cpu_speed_ghz", "cores", "ram_gb", "disk_type", "gpu_model", "gpu_vram_gb",
+           "cpu_model_id", "gpu_model_id", "main_profile", "main_score", "scoring_version", "pdf_url", "json_url",
+           "created_at")
+
+class FleetGenerator:
+    """Flujo determinista de análisis sintéticos, en orden cronológico"""
+
+    def __init__(self, seed: int, rows: int, days: float, first_id: int, end: datetime.datetime):
+        from scoring import scoring_models
+        self.rng = random.Random(seed)
+        self.rows = rows
+        self.first_id = first_id
+        self.model = scoring_models.current()
+        self.clock = end - datetime.timedelta(days=days)
+        # Llegadas de Poisson: huecos exponenciales con la media que reparte N filas en el periodo
+        self.mean_gap = days * 86400 / max(rows, 1)
+        self._cpu_weights = [entry[1] for entry in CPU_CATALOG]
+        self._gpu_weights = [entry[1] for entry in GPU_CATALOG]
+        self._disks, self._disk_weights = zip(*DISKS)
+        self._ram, self._ram_weights = zip(*RAM_GB)
+
+    def sysinfo(self):
+        rng = self.rng
+        variants, _, cores, (low, high) = rng.choices(CPU_CATALOG, self._cpu_weights)[0]
+        gpu_variants, _, vram = rng.choices(GPU_CATALOG, self._gpu_weights)[0]
+        return {
+            "cpu_model": rng.choice(variants),
+            "cpu_speed_ghz": round(rng.uniform(low, high), 1),
+            "cores": rng.choice(cores),
+            "ram_gb": float(rng.choices(self._ram, self._ram_weights)[0]),
+            "disk_type": rng.choices(self._disks, self._disk_weights)[0],
+            "gpu_model": rng.choice(gpu_variants),
+            "gpu_vram_gb": float(rng.choice(vram)),
+        }
+
+    def __iter__(self):
+        for i in range(self.rows):
+            self.clock += datetime.timedelta(seconds=self.rng.expovariate(1 / self.mean_gap))
+            info = self.sysinfo()
+            yield self.first_id + i, info, self.model.score(info), self.clock
+
+def batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# -------------------------
+#   ESCRITORES
+# -------------------------
+def write_sqlite(raw, rows):
+    placeholders = ", ".join("?" for _ in COLUMNS)
+    cursor = raw.cursor()
+    cursor.executemany(f"INSERT INTO system_analyses ({', '.join(COLUMNS)}) VALUES ({placeholders})", [
+        # Mismo formato de texto que usa SQLAlchemy para DateTime en SQLite
+        row[:-1] + (row[-1].isoformat(sep=" "),) for row in rows
+    ])
+    raw.commit()
+
+def write_postgres(raw, rows):
+    with raw.cursor() as cursor:
+        with cursor.copy(f"COPY system_analyses ({', '.join(COLUMNS)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+    raw.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=float, default=365, help="periodo que cubren las fechas, hasta ahora")
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--database-url", help="por defecto DATABASE_URL o el SQLite local")
+    parser.add_argument("--artifacts-dir", help="guardar también el JSON de cada análisis (almacén local)")
+    parser.add_argument("--skip-rollups", action="store_true", help="no recalcular los agregados al terminar")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from database import engine, SessionLocal, create_tables, get_next_analysis_id
+    from dashboard_events import publish_import
+    from hardware_catalog import hardware_catalog
+    from rollups import rebuild_rollups
+    from search_index import create_search_index
+
+    create_tables()
+    create_search_index()
+
+    db = SessionLocal()
+    try:
+        # Incluye los ids de los meses archivados, que siguen ocupados
+        first_id = get_next_analysis_id(db, args.rows)
+    finally:
+        db.close()
+
+    storage = None
+    if args.artifacts_dir:
+        from storage import LocalStorage
+        storage = LocalStorage(args.artifacts_dir)
+        storage.setup()
+
+    postgres = engine.dialect.name == "postgresql"
+    writer = write_postgres if postgres else write_sqlite
+    generator = FleetGenerator(args.seed, args.rows, args.days, first_id, datetime.datetime.utcnow())
+    model_ids = {}
+
+    def model_id(kind, raw):
+        key = (kind, raw)
+        if key not in model_ids:
+            model_ids[key] = hardware_catalog.model_id(kind, raw)
+        return model_ids[key]
+
+    def publish_batch(rows):
+        # Después de confirmar las filas: quien lea el evento ya las encuentra
+        db = SessionLocal()
+        try:
+            publish_import(db, [{"analysis_id": row[0]} for row in rows])
+            db.commit()
+        finally:
+            db.close()
+
+    raw = engine.raw_connection()
+    try:
+        if not postgres:
+            # Carga masiva: sin fsync por lote, solo en esta conexión. journal_mode no se toca:
+            # es persistente y cambiaría para siempre la BD de quien apunte aquí la suya
+            raw.execute("PRAGMA synchronous=OFF")
+
+        start = time.perf_counter()
+        written = 0
+        for batch in batches(generator, args.batch_size):
+            rows = []
+            for analysis_id, info, result, created_at in batch:
+                json_url = None
+                if storage is not None:
+                    document = json.dumps({
+                        "sysinfo": info,
+                        "result": result,
+                        "analysis_id": analysis_id,
+                        "timestamp": created_at.isoformat(),
+                        "version": "2.0.0"
+                    }, indent=2, ensure_ascii=False).encode("utf-8")
+                    json_url = storage.link(storage.put(f"analisis_{analysis_id:04d}.json", document))
+                rows.append((
+                    analysis_id, info["cpu_model"], info["cpu_speed_ghz"], info["cores"], info["ram_gb"],
+                    info["disk_type"], info["gpu_model"], info["gpu_vram_gb"],
+                    model_id("cpu", info["cpu_model"]), model_id("gpu", info["gpu_model"]),
+                    result["main_profile"], result["main_score"], result["scoring_version"],
+                    f"/api/analyses/{analysis_id}/report.pdf", json_url, created_at
+                ))
+            writer(raw, rows)
+            publish_batch(rows)
+            written += len(rows)
+            elapsed = time.perf_counter() - start
+            print(f"\r{written:>10}/{args.rows} filas  {written / elapsed:10.0f} filas/s", end="", flush=True)
+        elapsed = time.perf_counter() - start
+        print(f"\n✅ {written} análisis cargados en {elapsed:.1f} s ({written / elapsed:.0f} filas/s, "
+              f"{engine.dialect.name}, semilla {args.seed})")
+    finally:
+        raw.close()
+
+    if not args.skip_rollups:
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            buckets = rebuild_rollups(db)
+            print(f"✅ Agregados temporales reconstruidos: {buckets} buckets en {time.perf_counter() - start:.1f} s")
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+# backend/benchmarks/loadtest.py
+"""
+Pruebas de carga de la API completa sin Dropbox ni Postgres remotos.
+
+Arranca una instancia local (SQLite temporal + almacenamiento en memoria) o ataca la que se
+indique con --url, ejecuta un escenario con usuarios virtuales concurrentes y escribe un JSON
+con throughput y percentiles de latencia por endpoint, comparable entre ejecuciones.
+
+Uso (desde backend/):
+    python benchmarks/loadtest.py --scenario mixed --users 16 --duration 30 --out mixed.json
+    python benchmarks/loadtest.py --scenario analyze-heavy --compare mixed_anterior.json
+    python benchmarks/loadtest.py --scenario dashboard-heavy --database-url postgresql://localhost/analiza
+    python benchmarks/loadtest.py --scenario mixed --url http://localhost:8000
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CPUS = ["Intel Core i3-10100", "Intel Core i5-12400F", "Intel Core i7-10700K", "Intel Core i9-13900K",
+        "AMD Ryzen 5 5600X", "AMD Ryzen 7 5800X3D", "AMD Ryzen 9 7950X", "Apple M2 Pro"]
+GPUS = ["", "NVIDIA GeForce GTX 1650", "NVIDIA GeForce RTX 3060", "NVIDIA GeForce RTX 4080", "AMD Radeon RX 6700 XT"]
+DISKS = ["HDD", "SSD", "NVMe"]
+SEARCH_TERMS = ["ryzen", "intel i7", "rtx", "nvme", "gaming"]
+
+def random_sysinfo(rng):
+    return {
+        "cpu_model": rng.choice(CPUS),
+        "cpu_speed_ghz": round(rng.uniform(2.0, 5.5), 1),
+        "cores": rng.choice([4, 6, 8, 12, 16, 24]),
+        "ram_gb": rng.choice([4, 8, 16, 32, 64]),
+        "disk_type": rng.choice(DISKS),
+        "gpu_model": rng.choice(GPUS),
+        "gpu_vram_gb": rng.choice([0, 4, 8, 12, 16]),
+    }
+
+# -------------------------
+#   OPERACIONES
+# -------------------------
+# Cada operación devuelve (nombre del endpoint para el informe, método, ruta, cuerpo JSON)
+def op_analyze(state, rng):
+    return "POST /api/analyze", "POST", "/api/analyze", random_sysinfo(rng)
+
+def op_dashboard(state, rng):
+    return "GET /dashboard", "GET", "/dashboard", None
+
+def op_listing(state, rng):
+    return "GET /api/analyses", "GET", "/api/analyses", None
+
+def op_listing_json(state, rng):
+    return "GET /api/analyses/json", "GET", "/api/analyses/json", None
+
+def op_stats(state, rng):
+    return "GET /api/stats", "GET", "/api/stats", None
+
+def op_timeseries(state, rng):
+    granularity = rng.choice(["hour", "day", "month"])
+    return "GET /api/stats/timeseries", "GET", f"/api/stats/timeseries?granularity={granularity}", None
+
+def op_detail(state, rng):
+    return "GET /api/analyses/{id}", "GET", f"/api/analyses/{state.random_id(rng)}", None
+
+def op_similar(state, rng):
+    return "GET /api/analyses/{id}/similar", "GET", f"/api/analyses/{state.random_id(rng)}/similar", None
+
+def op_percentile(state, rng):
+    return "GET /api/analyses/{id}/percentile", "GET", f"/api/analyses/{state.random_id(rng)}/percentile", None
+
+def op_search(state, rng):
+    return "GET /api/analyses/search", "GET", f"/api/analyses/search?q={rng.choice(SEARCH_TERMS)}", None
+
+# Escenarios: (operación, peso)
+SCENARIOS = {
+    "analyze-heavy": [
+        (op_analyze, 80), (op_stats, 10), (op_detail, 10),
+    ],
+    "dashboard-heavy": [
+        (op_dashboard, 35), (op_listing, 20), (op_stats, 20), (op_timeseries, 10),
+        (op_listing_json, 10), (op_analyze, 5),
+    ],
+    "mixed": [
+        (op_analyze, 20), (op_dashboard, 15), (op_stats, 15), (op_detail, 15), (op_search, 10),
+        (op_similar, 10), (op_percentile, 5), (op_timeseries, 5), (op_listing_json, 5),
+    ],
+}
+
+class SharedState:
+    """IDs de análisis conocidos, para que las lecturas de detalle apunten a filas existentes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ids = []
+
+    def add(self, analysis_id):
+        with self._lock:
+            self.ids.append(analysis_id)
+
+    def random_id(self, rng):
+        with self._lock:
+            return rng.choice(self.ids) if self.ids else 1
+
+# -------------------------
+#   MEDICIÓN
+# -------------------------
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][str(status)] += 1
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(recorder: Recorder, elapsed: float):
+    endpoints = {}
+    for endpoint, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        statuses = dict(recorder.statuses[endpoint])
+        errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "errors": errors,
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "latency_ms": {
+                "mean": round(sum(values) / len(values) * 1000, 2),
+                "p50": round(percentile(values, 50) * 1000, 2),
+                "p90": round(percentile(values, 90) * 1000, 2),
+                "p95": round(percentile(values, 95) * 1000, 2),
+                "p99": round(percentile(values, 99) * 1000, 2),
+                "max": round(values[-1] * 1000, 2),
+            },
+            "status_codes": statuses,
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "total_requests": total,
+        "total_errors": sum(e["errors"] for e in endpoints.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+# -------------------------
+#   EJECUCIÓN
+# -------------------------
+def virtual_user(base_url, scenario, state, recorder, stop_at, seed, timeout):
+    rng = random.Random(seed)
+    operations, weights = zip(*scenario)
+    session = requests.Session()
+    while time.monotonic() < stop_at:
+        op = rng.choices(operations, weights)[0]
+        endpoint, method, path, body = op(state, rng)
+        start = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=body, timeout=timeout)
+            status = response.status_code
+            if op is op_analyze and status == 200:
+                analysis_id = response.json().get("analysis_id")
+                if analysis_id:
+                    state.add(analysis_id)
+        except requests.RequestException as e:
+            status = type(e).__name__
+        recorder.record(endpoint, status, time.perf_counter() - start)
+
+def seed_database(base_url, rows, state, seed):
+    """Crea análisis de partida por la propia API para que las lecturas tengan datos"""
+    rng = random.Random(seed)
+    session = requests.Session()
+    existing = session.get(base_url + "/api/analyses/json", timeout=60).json().get("analyses", [])
+    for analysis in existing:
+        state.add(analysis["analysis_id"])
+    for _ in range(max(0, rows - len(existing))):
+        response = session.post(base_url + "/api/analyze", json=random_sysinfo(rng), timeout=60)
+        if response.ok:
+            state.add(response.json()["analysis_id"])
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_local_server(database_url, workdir, env_overrides):
+    port = free_port()
+    env = dict(os.environ)
+    env.setdefault("STORAGE_BACKEND", "memory")
+    env.setdefault("REPORT_CACHE_DIR", os.path.join(workdir, "report_cache"))
+    env["DATABASE_URL"] = database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    env.update(env_overrides)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"El servidor no arrancó:\n{process.stderr.read().decode(errors='replace')}")
+        try:
+            if requests.get(base_url + "/api/admission", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("El servidor no respondió en 60 s")
+
+def compare(current, baseline_path):
+    """Diferencias de throughput y p95 frente a una ejecución anterior"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nComparación con {baseline_path}:")
+    for endpoint, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before:
+            print(f"  {endpoint:<34} (nuevo)")
+            continue
+        rps_delta = (now["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0
+        p95_delta = (now["latency_ms"]["p95"] / before["latency_ms"]["p95"] - 1) * 100 if before["latency_ms"]["p95"] else 0
+        print(f"  {endpoint:<34} rps {rps_delta:+7.1f}%   p95 {p95_delta:+7.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--users", type=int, default=8, help="usuarios virtuales concurrentes")
+    parser.add_argument("--duration", type=float, default=20, help="segundos de medición")
+    parser.add_argument("--seed-rows", type=int, default=200, help="análisis previos a la medición")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30, help="timeout de cada petición")
+    parser.add_argument("--url", help="instancia ya arrancada; por defecto se arranca una local")
+    parser.add_argument("--database-url", help="BD de la instancia local (por defecto SQLite temporal)")
+    parser.add_argument("--env", action="append", default=[], metavar="CLAVE=VALOR",
+                        help="variable de entorno extra para la instancia local (repetible)")
+    parser.add_argument("--out", default="loadtest_results.json")
+    parser.add_argument("--compare", metavar="RESULTADOS.json")
+    args = parser.parse_args()
+
+    env_overrides = dict(item.split("=", 1) for item in args.env)
+    with tempfile.TemporaryDirectory() as workdir:
+        process = None
+        base_url = args.url
+        if base_url is None:
+            process, base_url = start_local_server(args.database_url, workdir, env_overrides)
+        try:
+            state = SharedState()
+            seed_database(base_url, args.seed_rows, state, args.seed)
+
+            recorder = Recorder()
+            stop_at = time.monotonic() + args.duration
+            users = [
+                threading.Thread(target=virtual_user, args=(
+                    base_url, SCENARIOS[args.scenario], state, recorder, stop_at, args.seed + i + 1, args.timeout
+                ), daemon=True)
+                for i in range(args.users)
+            ]
+            start = time.monotonic()
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+            elapsed = time.monotonic() - start
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(10)
+
+    summary = summarize(recorder, elapsed)
+    results = {
+        "scenario": args.scenario,
+        "users": args.users,
+        "duration_s": round(elapsed, 2),
+        "seed_rows": args.seed_rows,
+        "target": args.url or ("local " + (args.database_url.split(":", 1)[0] if args.database_url else "sqlite")),
+        "env": env_overrides,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **summary,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print(f"{args.scenario}: {summary['total_requests']} peticiones, {summary['throughput_rps']} req/s, "
+          f"{summary['total_errors']} errores -> {args.out}")
+    for endpoint, stats in summary["endpoints"].items():
+        latency = stats["latency_ms"]
+        print(f"  {endpoint:<34} {stats['throughput_rps']:8.2f} req/s  p50 {latency['p50']:8.1f}  "
+              f"p95 {latency['p95']:8.1f}  p99 {latency['p99']:8.1f} ms  errores {stats['errors']}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
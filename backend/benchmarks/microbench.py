@@ -0,0 +1,219 @@
+# backend/benchmarks/microbench.py
+"""
+Microbenchmarks de las funciones calientes con umbrales de regresión.
+
+Mide score_system, create_pdf_report, get_score_class/get_score_color y los constructores
+HTML de get_dashboard y get_all_analyses_html sobre datasets sintéticos fijos (1, 1k y 100k
+análisis). Compara con la línea base guardada y termina con código 1 si algún caso empeora
+más del porcentaje permitido.
+
+Uso (desde backend/):
+    python benchmarks/microbench.py --save-baseline        # en la máquina de referencia
+    python benchmarks/microbench.py                        # compara con la línea base
+    python benchmarks/microbench.py --cases score_system get_dashboard --sizes 1 1000
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/microbench.db"
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbench_baseline.json")
+SIZES = (1, 1_000, 100_000)
+SEED = 1234
+
+# Porcentaje de empeoramiento tolerado por caso; el resto usa --threshold
+THRESHOLDS = {
+    "create_pdf_report": 30,
+    "get_dashboard": 35,
+    "get_all_analyses_html": 35,
+}
+# Tamaño máximo por caso sin --full (100k PDFs son varios minutos)
+MAX_SIZE = {
+    "create_pdf_report": 1_000,
+}
+
+CPUS = ["Intel Core i3-10100", "Intel Core i5-12400F", "Intel Core i7-10700K", "Intel Core i9-13900K",
+        "AMD Ryzen 5 5600X", "AMD Ryzen 7 5800X3D", "AMD Ryzen 9 7950X", "Apple M2 Pro"]
+GPUS = ["", "NVIDIA GeForce GTX 1650", "NVIDIA GeForce RTX 3060", "NVIDIA GeForce RTX 4080", "AMD Radeon RX 6700 XT"]
+
+def synthetic_sysinfos(n: int):
+    """Dataset fijo: la misma semilla produce siempre los mismos equipos"""
+    rng = random.Random(SEED)
+    return [{
+        "cpu_model": rng.choice(CPUS),
+        "cpu_speed_ghz": round(rng.uniform(1.8, 5.5), 1),
+        "cores": rng.choice([2, 4, 6, 8, 12, 16, 24]),
+        "ram_gb": rng.choice([4, 8, 16, 32, 64]),
+        "disk_type": rng.choice(["HDD", "SSD", "NVMe"]),
+        "gpu_model": rng.choice(GPUS),
+        "gpu_vram_gb": rng.choice([0, 2, 4, 8, 12, 16, 24]),
+    } for _ in range(n)]
+
+def load_database(n: int):
+    """Sustituye el contenido de la BD por n análisis sintéticos y reconstruye los agregados"""
+    from database import engine, SystemAnalysis, AnalysisRollup, AnalysisRollupProfile, SessionLocal
+    from rollups import rebuild_rollups
+    import main
+
+    start = datetime.datetime(2024, 1, 1)
+    rows = []
+    for i, info in enumerate(synthetic_sysinfos(n)):
+        result = main.score_system(info)
+        rows.append(dict(info, analysis_id=i + 1, main_profile=result["main_profile"], main_score=result["main_score"],
+                         scoring_version=result["scoring_version"], created_at=start + datetime.timedelta(minutes=7 * i)))
+    with engine.begin() as conn:
+        for table in (AnalysisRollupProfile, AnalysisRollup, SystemAnalysis):
+            conn.execute(table.__table__.delete())
+        conn.execute(SystemAnalysis.__table__.insert(), rows)
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db)
+    finally:
+        db.close()
+
+# -------------------------
+#   CASOS
+# -------------------------
+# Cada caso recibe el tamaño y devuelve la función a cronometrar (sin argumentos)
+def case_score_system(n):
+    import main
+    infos = synthetic_sysinfos(n)
+    return lambda: [main.score_system(info) for info in infos]
+
+def case_create_pdf_report(n):
+    import main
+    from pdf_report import create_pdf_report
+    inputs = [(info, main.score_system(info)) for info in synthetic_sysinfos(n)]
+
+    def run():
+        for i, (info, result) in enumerate(inputs):
+            create_pdf_report(info, result, i + 1)
+    return run
+
+def case_score_class_color(n):
+    import main
+    scores = [main.score_system(info)["main_score"] for info in synthetic_sysinfos(n)]
+    return lambda: [(main.get_score_class(s), main.get_score_color(s)) for s in scores]
+
+def _html_case(endpoint_name):
+    def case(n):
+        import main
+        from database import SessionLocal
+        load_database(n)
+        endpoint = getattr(main, endpoint_name)
+
+        def run():
+            db = SessionLocal()
+            try:
+                endpoint(db)
+            finally:
+                db.close()
+        return run
+    return case
+
+CASES = {
+    "score_system": case_score_system,
+    "create_pdf_report": case_create_pdf_report,
+    "get_score_class_color": case_score_class_color,
+    "get_dashboard": _html_case("get_dashboard"),
+    "get_all_analyses_html": _html_case("get_all_analyses_html"),
+}
+
+def measure(fn, repeats: int):
+    """Mejor tiempo de una ejecución completa, repitiendo las cortas hasta ~0.2 s por muestra"""
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeats, number=loops)) / loops
+
+# -------------------------
+#   EJECUCIÓN
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=20, help="empeoramiento tolerado en %% (por defecto)")
+    parser.add_argument("--full", action="store_true", help="sin tope de tamaño por caso")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--out", help="JSON con los resultados de esta ejecución")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    from database import create_tables
+    create_tables()
+
+    results = {}
+    regressions = []
+    workdir = os.getcwd()
+    os.chdir(_tmp.name)  # create_pdf_report escribe en el directorio actual
+    try:
+        for name in args.cases:
+            for n in args.sizes:
+                if not args.full and n > MAX_SIZE.get(name, n):
+                    print(f"{name:<24} n={n:<7} omitido (usa --full)")
+                    continue
+                key = f"{name}[{n}]"
+                # Los prints de depuración de la app no forman parte de la medida
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn = CASES[name](n)
+                    seconds = measure(fn, args.repeats if n < 100_000 else max(1, args.repeats // 2))
+                results[key] = seconds
+
+                line = f"{name:<24} n={n:<7} {seconds * 1000:12.3f} ms  {seconds / n * 1e6:10.3f} µs/fila"
+                if key in baseline:
+                    change = (seconds / baseline[key] - 1) * 100
+                    limit = THRESHOLDS.get(name, args.threshold)
+                    line += f"  {change:+7.1f}% (límite +{limit:g}%)"
+                    if change > limit:
+                        regressions.append((key, change, limit))
+                        line += "  ❌ REGRESIÓN"
+                print(line)
+    finally:
+        os.chdir(workdir)
+
+    payload = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "results": results,
+    }
+    if args.save_baseline:
+        # Se conservan los casos que no se han medido en esta ejecución
+        previous = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                previous = json.load(f).get("results", {})
+        payload["results"] = {**previous, **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"Línea base guardada en {args.baseline}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+
+    if regressions:
+        print(f"\n{len(regressions)} regresiones:")
+        for key, change, limit in regressions:
+            print(f"  {key}: {change:+.1f}% (límite +{limit:g}%)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# backend/config.py
+"""
+Carga del .env. Tiene que importarse antes que cualquier otro módulo del backend:
+la mayoría lee su configuración con os.getenv en cuanto se importa.
+"""
+import os
+
+def load_environment():
+    """Carga el .env más cercano (este directorio o sus padres); dotenv solo se importa si existe"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+# Ruta del .env cargado (None si no hay ninguno)
+ENV_FILE = load_environment()
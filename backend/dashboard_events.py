@@ -0,0 +1,352 @@
+# backend/dashboard_events.py
+"""
+Actualizaciones en vivo de /dashboard por Server-Sent Events.
+
+analyze, delete_analysis y las importaciones insertan un DashboardEvent en la misma
+transacción que su cambio. Un único hilo por worker lee los eventos nuevos, calcula una
+vez los KPIs y los buckets de la línea temporal afectados y difunde el mismo mensaje a
+todos los dashboards conectados a ese worker: el coste es una consulta por lote de
+cambios, no una recarga completa por cada dashboard abierto.
+
+La misma tabla es el feed con el que index_sync.py mantiene al día los índices en memoria
+de cada worker; por eso se escribe siempre, haya o no dashboards conectados.
+"""
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from sqlalchemy import and_, case, func, or_
+from database import SessionLocal, SystemAnalysis, DashboardEvent
+from rollups import get_buckets
+from archive import analysis_archive
+
+# Segundos entre lecturas de eventos nuevos (los del propio worker despiertan al hilo al momento)
+DASHBOARD_POLL_INTERVAL = float(os.getenv("DASHBOARD_POLL_INTERVAL", "1"))
+# Comentario SSE de keep-alive para proxies y para detectar clientes desconectados
+DASHBOARD_HEARTBEAT = float(os.getenv("DASHBOARD_HEARTBEAT", "15"))
+# Conexiones SSE abiertas a la vez por worker (no pasan por el control de admisión)
+DASHBOARD_MAX_STREAMS = int(os.getenv("DASHBOARD_MAX_STREAMS", "500"))
+# Segundos que dura una conexión; el navegador reconecta solo con Last-Event-ID
+DASHBOARD_STREAM_MAX_AGE = float(os.getenv("DASHBOARD_STREAM_MAX_AGE", "600"))
+# Segundos que se conservan los eventos en la tabla
+DASHBOARD_EVENT_RETENTION = float(os.getenv("DASHBOARD_EVENT_RETENTION", "3600"))
+# Mensajes recientes que se reenvían a quien reconecta; más atrás, el cliente recarga la página
+DASHBOARD_BACKLOG = 256
+# Mensajes pendientes por conexión; un cliente más lento se desconecta (y se pone al día al volver)
+DASHBOARD_QUEUE = 64
+# Eventos leídos por consulta
+DASHBOARD_BATCH = 500
+# Segundos que se vuelve a buscar un id saltado: en PostgreSQL una transacción con un id menor
+# puede confirmarse después que otra con uno mayor (o no confirmarse nunca)
+DASHBOARD_GAP_TIMEOUT = 10
+
+SCORE_RANGES = (
+    ("Excelente (80-100%)", 80, None),
+    ("Bueno (60-79%)", 60, 80),
+    ("Regular (40-59%)", 40, 60),
+    ("Mejorable (0-39%)", None, 40),
+)
+TIMELINE_GRANULARITIES = ("hour", "day", "month")
+ANALYSIS_FIELDS = (
+    "analysis_id", "cpu_model", "cpu_speed_ghz", "cores", "ram_gb", "disk_type", "gpu_model",
+    "gpu_vram_gb", "main_profile", "main_score", "pdf_url", "json_url",
+)
+
+# Fin de la conexión (desconexión forzada, cola llena o apagado del worker)
+CLOSE = object()
+
+class DashboardBusy(Exception):
+    pass
+
+def _in_range(low, high):
+    bounds = []
+    if low is not None:
+        bounds.append(SystemAnalysis.main_score >= low)
+    if high is not None:
+        bounds.append(SystemAnalysis.main_score < high)
+    return and_(*bounds)
+
+def dashboard_kpis(db):
+    """
+    KPIs y repartos del dashboard con una sola consulta agrupada por perfil, más los
+    agregados de los meses archivados (archived_partitions, sin leer sus ficheros)
+    """
+    ranges = [func.sum(case((_in_range(low, high), 1), else_=0)) for _, low, high in SCORE_RANGES]
+    rows = db.query(
+        SystemAnalysis.main_profile, func.count(SystemAnalysis.id),
+        func.sum(SystemAnalysis.main_score), func.max(SystemAnalysis.main_score), *ranges
+    ).group_by(SystemAnalysis.main_profile).all()
+    archived_total, archived_score_sum, archived_profiles = analysis_archive.totals(db)
+    archived_scores = analysis_archive.score_counts(db) if archived_total else {}
+
+    total = sum(row[1] for row in rows) + archived_total
+    score_sum = sum(row[2] or 0 for row in rows) + archived_score_sum
+    best = max(itertools.chain((row[3] for row in rows if row[3] is not None), archived_scores), default=0)
+    profiles = dict(archived_profiles)
+    for row in rows:
+        profiles[row[0]] = profiles.get(row[0], 0) + row[1]
+    return {
+        "total_analyses": total,
+        "average_score": round(score_sum / total, 1) if total else 0,
+        "best_score": best,
+        "profiles": profiles,
+        "score_ranges": {
+            label: sum(int(row[4 + i] or 0) for row in rows) + sum(
+                n for score, n in archived_scores.items()
+                if (low is None or score >= low) and (high is None or score < high)
+            )
+            for i, (label, low, high) in enumerate(SCORE_RANGES)
+        },
+        "archived_analyses": archived_total,
+    }
+
+def _analysis_payload(analysis):
+    payload = {field: getattr(analysis, field) for field in ANALYSIS_FIELDS}
+    payload["created_at"] = analysis.created_at.isoformat() if analysis.created_at else None
+    return payload
+
+def publish(db, kind: str, analysis):
+    """Añade el evento a la sesión sin confirmarlo: se hace commit junto al cambio"""
+    db.add(DashboardEvent(kind=kind, payload=json.dumps(_analysis_payload(analysis), ensure_ascii=False)))
+
+def publish_import(db, records):
+    """Un evento por lote importado; la línea temporal se vuelve a pedir entera"""
+    db.add(DashboardEvent(kind="analyses_imported", payload=json.dumps({
+        "count": len(records),
+        "first_analysis_id": records[0]["analysis_id"],
+        "last_analysis_id": records[-1]["analysis_id"],
+    })))
+
+def purge_events(db):
+    """Borra los eventos de más de DASHBOARD_EVENT_RETENTION segundos"""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=DASHBOARD_EVENT_RETENTION)
+    db.query(DashboardEvent).filter(DashboardEvent.created_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+
+def latest_event_id(db):
+    """Último evento visible en db; la página lo usa como punto de partida del stream"""
+    return db.query(func.max(DashboardEvent.id)).scalar() or 0
+
+def _bucket_starts(created_at: datetime.datetime):
+    hour = created_at.replace(minute=0, second=0, microsecond=0)
+    day = hour.replace(hour=0)
+    return {"hour": hour, "day": day, "month": day.replace(day=1)}
+
+def _format(event_id: int, name: str, data):
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class EventCursor:
+    """
+    Lectura incremental de dashboard_events desde last_id. Los ids saltados se siguen
+    buscando DASHBOARD_GAP_TIMEOUT segundos, así un evento confirmado tarde no se pierde.
+    """
+
+    def __init__(self, last_id: int):
+        self.last_id = last_id
+        self._gaps = {}  # id saltado -> instante hasta el que se sigue buscando
+
+    def fetch(self, db, limit: int = DASHBOARD_BATCH):
+        """Eventos nuevos (y los saltados que ya han aparecido), en orden de id"""
+        now = time.monotonic()
+        self._gaps = {event_id: until for event_id, until in self._gaps.items() if until > now}
+        condition = DashboardEvent.id > self.last_id
+        if self._gaps:
+            condition = or_(condition, DashboardEvent.id.in_(list(self._gaps)))
+        events = db.query(DashboardEvent).filter(condition).order_by(DashboardEvent.id).limit(limit).all()
+
+        for event in events:
+            self._gaps.pop(event.id, None)
+            if event.id > self.last_id:
+                if event.id - self.last_id <= limit:
+                    self._gaps.update((missing, now + DASHBOARD_GAP_TIMEOUT) for missing in range(self.last_id + 1, event.id))
+                self.last_id = event.id
+        return events
+
+class Subscriber:
+    def __init__(self, loop, after):
+        self.loop = loop
+        self.after = after
+        self.queue = asyncio.Queue(DASHBOARD_QUEUE)
+
+    def offer(self, message):
+        # Siempre en el event loop del worker (call_soon_threadsafe)
+        if message is not CLOSE and self.queue.full():
+            message = CLOSE
+        if message is CLOSE:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+class DashboardBroadcast:
+    """
+    Difusión por worker: un hilo lee dashboard_events, construye cada mensaje una vez y lo
+    reparte a las colas de las conexiones SSE abiertas en este proceso.
+    """
+
+    def __init__(self, poll_interval: float, max_streams: int):
+        self.poll_interval = poll_interval
+        self.max_streams = max_streams
+        self.render = None  # HTML de la tarjeta de un análisis (lo fija main.py)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._backlog = deque(maxlen=DASHBOARD_BACKLOG)  # (id, mensaje SSE)
+        self._floor = None  # eventos anteriores a este id ya no están en el backlog
+        self._cursor = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    # -------------------------
+    #   CONEXIONES
+    # -------------------------
+    def subscribe(self, after: int = None):
+        """Registra una conexión; con after reenvía lo que el backlog tenga posterior a ese id"""
+        subscriber = Subscriber(asyncio.get_running_loop(), after)
+        with self._lock:
+            if len(self._subscribers) >= self.max_streams:
+                raise DashboardBusy("Demasiados dashboards conectados a este servidor")
+            cursor = self._cursor
+            if after is not None and cursor is not None:
+                if after < self._floor:
+                    subscriber.offer(_format(cursor.last_id, "reload", {}))
+                else:
+                    for event_id, message in self._backlog:
+                        if event_id > after:
+                            subscriber.offer(message)
+            self._subscribers.add(subscriber)
+        self._wake.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def disconnect_all(self):
+        """Cierra los streams abiertos (apagado del worker: si no, uvicorn esperaría a que acabasen)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.offer, CLOSE)
+
+    async def stream(self, subscriber):
+        """Mensajes SSE de una conexión hasta que se cierra o alcanza DASHBOARD_STREAM_MAX_AGE"""
+        deadline = time.monotonic() + DASHBOARD_STREAM_MAX_AGE
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), DASHBOARD_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    message = ": ping\n\n"
+                if message is CLOSE:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    # -------------------------
+    #   HILO DE DIFUSIÓN
+    # -------------------------
+    def start(self, render=None):
+        if render is not None:
+            self.render = render
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dashboard-events", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.disconnect_all()
+
+    def notify(self):
+        """Despierta al hilo sin esperar al siguiente sondeo"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Error difundiendo eventos del dashboard: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def poll(self):
+        """Lee los eventos nuevos y los difunde; False si no había nada que enviar"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            # Sin nadie escuchando no se lee nada; se reanuda desde lo que pidan los siguientes
+            self._cursor = None
+            self._backlog.clear()
+            return False
+
+        db = SessionLocal()
+        try:
+            if self._cursor is None:
+                # Desde el evento más antiguo que necesite alguno de los conectados
+                afters = [s.after for s in subscribers if s.after is not None]
+                start = min(afters) if afters else latest_event_id(db)
+                with self._lock:
+                    self._cursor = EventCursor(start)
+                    self._floor = start
+
+            events = self._cursor.fetch(db)
+            if not events:
+                return False
+            last_id = self._cursor.last_id
+            message = _format(last_id, "delta", self._build(db, events))
+        finally:
+            db.close()
+
+        with self._lock:
+            if len(self._backlog) == self._backlog.maxlen:
+                self._floor = self._backlog[0][0]
+            self._backlog.append((last_id, message))
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.offer, message)
+        return True
+
+    def _build(self, db, events):
+        """Delta común a todos los dashboards: cambios, KPIs y buckets de la línea temporal tocados"""
+        changes = []
+        touched = {granularity: set() for granularity in TIMELINE_GRANULARITIES}
+        timeline_stale = False
+        for event in events:
+            payload = json.loads(event.payload)
+            change = {"event_id": event.id, "type": event.kind}
+            if event.kind == "analyses_imported":
+                change.update(payload)
+                timeline_stale = True
+            else:
+                change["analysis_id"] = payload["analysis_id"]
+                created_at = payload.get("created_at")
+                if created_at:
+                    created_at = datetime.datetime.fromisoformat(created_at)
+                    for granularity, start in _bucket_starts(created_at).items():
+                        touched[granularity].add(start)
+                if event.kind == "analysis_created" and self.render is not None:
+                    change["html"] = self.render(SimpleNamespace(**{**payload, "created_at": created_at}))
+            changes.append(change)
+
+        return {
+            "changes": changes,
+            "kpis": dashboard_kpis(db),
+            "buckets": {granularity: get_buckets(db, granularity, starts) for granularity, starts in touched.items()},
+            "timeline_stale": timeline_stale,
+        }
+
+# Instancia global del proceso
+dashboard_broadcast = DashboardBroadcast(DASHBOARD_POLL_INTERVAL, DASHBOARD_MAX_STREAMS)
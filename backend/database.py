@@ -1,35 +1,57 @@
 # backend/database.py
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import func, create_engine, inspect, text, Column, Integer, String, Float, Text, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 
-# Obtener DATABASE_URL desde Render
-DATABASE_URL = os.getenv('DATABASE_URL')
-
-# Convertir URL de Render al formato compatible con psycopg3
-if DATABASE_URL:
+def normalize_url(url):
+    """Convertir URL de Render al formato compatible con psycopg3"""
     # Reemplazar postgres:// → postgresql+psycopg://
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+psycopg://")
+    url = url.replace("postgres://", "postgresql+psycopg://")
 
     # Reemplazar postgresql:// → postgresql+psycopg:// (si Render lo da en esta forma)
-    if DATABASE_URL.startswith("postgresql://") and "+psycopg" not in DATABASE_URL:
-        DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://")
+    if url.startswith("postgresql://") and "+psycopg" not in url:
+        url = url.replace("postgresql://", "postgresql+psycopg://")
+    return url
+
+def make_engine(url):
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(url)
 
+# Obtener DATABASE_URL desde Render
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+if DATABASE_URL:
+    DATABASE_URL = normalize_url(DATABASE_URL)
 else:
     # SQLite para desarrollo local
     DATABASE_URL = 'sqlite:///analizatupc.db'
 
+# Réplica de solo lectura opcional para los endpoints de consulta (ver replica.py)
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    DATABASE_REPLICA_URL = normalize_url(DATABASE_REPLICA_URL)
+
 # Configurar el engine
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+engine = make_engine(DATABASE_URL)
+replica_engine = make_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine else None
 Base = declarative_base()
 
+class HardwareModel(Base):
+    """Catálogo de modelos de CPU/GPU canónicos referenciados por system_analyses"""
+    __tablename__ = "hardware_models"
+    __table_args__ = (UniqueConstraint("kind", "model_key"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # "cpu" o "gpu"
+    model_key = Column(String, nullable=False)  # nombre canónico en minúsculas
+    canonical_name = Column(String, nullable=False)
+
 class SystemAnalysis(Base):
     __tablename__ = "system_analyses"
 
@@ -42,20 +64,150 @@ class SystemAnalysis(Base):
     disk_type = Column(String)
     gpu_model = Column(String)
     gpu_vram_gb = Column(Float)
+    cpu_model_id = Column(Integer, ForeignKey("hardware_models.id"), nullable=True, index=True)
+    gpu_model_id = Column(Integer, ForeignKey("hardware_models.id"), nullable=True, index=True)
     main_profile = Column(String)
     main_score = Column(Float)
+    scoring_version = Column(String, nullable=True)
     pdf_url = Column(String, nullable=True)
     json_url = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class AnalysisRollup(Base):
+    """Agregados por hora/día de los análisis para la línea temporal del dashboard"""
+    __tablename__ = "analysis_rollups"
+    __table_args__ = (UniqueConstraint("granularity", "bucket_start"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    granularity = Column(String, nullable=False)  # "hour" o "day"
+    bucket_start = Column(DateTime, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    score_sum = Column(Float, default=0.0, nullable=False)
+    score_min = Column(Float, nullable=True)
+    score_max = Column(Float, nullable=True)
+
+class AnalysisRollupProfile(Base):
+    """Número de análisis por perfil dentro de cada bucket de AnalysisRollup"""
+    __tablename__ = "analysis_rollup_profiles"
+    __table_args__ = (UniqueConstraint("granularity", "bucket_start", "main_profile"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    granularity = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    main_profile = Column(String, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+class ReportOutbox(Base):
+    """
+    Informes pendientes de subir. Se inserta en la misma transacción que el análisis,
+    así ningún análisis confirmado se queda sin su entrega aunque el proceso caiga.
+    """
+    __tablename__ = "report_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    analysis_id = Column(Integer, nullable=False, index=True)
+    payload = Column(Text, nullable=False)  # JSON con sysinfo, result y timestamp
+    status = Column(String, nullable=False, default="pending")  # pending | processing | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    lease_until = Column(DateTime, nullable=True)  # reserva de un worker; caducada = worker caído
+    last_error = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class ArchivedPartition(Base):
+    """Mes de system_analyses movido a un fichero Parquet (archive.py), con sus agregados"""
+    __tablename__ = "archived_partitions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    month = Column(String, unique=True, nullable=False)  # "YYYY-MM"
+    path = Column(String, nullable=False)
+    rows = Column(Integer, default=0, nullable=False)
+    min_analysis_id = Column(Integer, nullable=True, index=True)
+    max_analysis_id = Column(Integer, nullable=True, index=True)
+    score_sum = Column(Float, default=0.0, nullable=False)
+    profiles = Column(Text, nullable=False, default="{}")  # JSON perfil -> número de análisis
+    scores = Column(Text, nullable=True)  # JSON puntuación -> número de análisis (KPIs del dashboard)
+    hardware = Column(Text, nullable=True)  # JSON {"cpu"|"gpu": {modelo: [análisis, suma, con nota]}} (/api/stats/hardware)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class IdempotencyKey(Base):
+    """
+    Respuestas por Idempotency-Key (idempotency.py). La clave primaria hace que solo una
+    petición por clave se ejecute, aunque los reintentos lleguen a otro worker o instancia.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String, nullable=False)  # huella del cuerpo de la petición
+    status = Column(String, nullable=False, default="processing")  # processing | done
+    status_code = Column(Integer, nullable=True)  # None: la respuesta era un dict (200)
+    response = Column(Text, nullable=True)  # cuerpo JSON guardado
+    lease_until = Column(DateTime, nullable=True)  # reserva de la petición original; caducada = proceso caído
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class DashboardEvent(Base):
+    """
+    Cambios de análisis (dashboard_events.py). Se inserta en la misma transacción que el
+    análisis o el borrado; cada worker los lee para difundirlos por SSE y para mantener al
+    día sus índices en memoria (index_sync.py).
+    """
+    __tablename__ = "dashboard_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # analysis_created | analysis_deleted | analyses_imported
+    payload = Column(Text, nullable=False)  # JSON con el análisis (o el resumen del lote importado)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+def add_missing_columns():
+    """Migración mínima: añade a las tablas existentes las columnas nuevas del modelo"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    print(f"✅ Columna añadida: {table.name}.{column.name}")
+
+def partitioned_tables():
+    """Tablas particionadas en Postgres (sus índices los gestiona archive.py)"""
+    if engine.dialect.name != "postgresql":
+        return set()
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text(
+            "SELECT c.relname FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid"
+        ))}
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+
+    # create_all no añade índices nuevos a tablas que ya existían
+    partitioned = partitioned_tables()
+    for table in Base.metadata.sorted_tables:
+        if table.name in partitioned:
+            continue
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+# Último analysis_id entregado en este proceso: un lote que se inserta fuera del candado de ids
+# no se vuelve a ofrecer mientras se confirma
+_last_reserved_id = 0
 
-def get_next_analysis_id(db):
+def get_next_analysis_id(db, count: int = 1):
+    """
+    Primer id de un rango de count ids libres, que queda reservado en este proceso.
+    Se llama con el candado de ids (analysis_id_lock); entre procesos, el INSERT duplicado
+    falla con IntegrityError y quien lo recibe vuelve a pedir ids.
+    """
+    global _last_reserved_id
+    # Los ids de los meses archivados siguen ocupados aunque ya no estén en la tabla
+    archived = db.query(func.max(ArchivedPartition.max_analysis_id)).scalar() or 0
     last_analysis = db.query(SystemAnalysis).order_by(SystemAnalysis.analysis_id.desc()).first()
-    if last_analysis:
-        return last_analysis.analysis_id + 1
-    return 1
+    next_id = max(last_analysis.analysis_id if last_analysis else 0, archived, _last_reserved_id) + 1
+    _last_reserved_id = next_id + count - 1
+    return next_id
 
 def get_db():
     db = SessionLocal()
@@ -26,37 +26,43 @@ def upload_to_dropbox(access_token, local_file_path, dropbox_path):
         
         print(f"✅ Archivo subido a Dropbox: {dropbox_path}")
         
-        # Intentar crear enlace compartido
-        try:
-            shared_link = dbx.sharing_create_shared_link_with_settings(dropbox_path)
-            download_link = shared_link.url.replace('?dl=0', '?dl=1')
-            print(f"✅ Nuevo enlace compartido creado: {download_link}")
-            return download_link, None
-            
-        except dropbox.exceptions.ApiError as e:
-            # Si el error es que el enlace ya existe, obtener el enlace existente
-            if 'shared_link_already_exists' in str(e):
-                try:
-                    # Obtener enlaces compartidos existentes
-                    shared_links = dbx.sharing_list_shared_links(dropbox_path).links
-                    if shared_links:
-                        existing_link = shared_links[0].url
-                        download_link = existing_link.replace('?dl=0', '?dl=1')
-                        print(f"✅ Usando enlace compartido existente: {download_link}")
-                        return download_link, None
-                    else:
-                        return None, f"Error: Enlace ya existe pero no se pudo obtener: {e}"
-                except Exception as list_error:
-                    return None, f"Error obteniendo enlace existente: {list_error}"
-            else:
-                return None, f"Error creando enlace compartido: {e}"
+        return shared_link(dbx, dropbox_path)
         
     except dropbox.exceptions.ApiError as e:
         return None, f"Error de Dropbox API: {e}"
     except Exception as e:
         return None, f"Error inesperado: {e}"
 
-def create_dropbox_folder_structure(access_token):
+def shared_link(dbx, dropbox_path):
+    """
+    Enlace de descarga directa de un archivo ya subido, reutilizando el existente si lo hay
+    """
+    # Intentar crear enlace compartido
+    try:
+        link = dbx.sharing_create_shared_link_with_settings(dropbox_path)
+        download_link = link.url.replace('?dl=0', '?dl=1')
+        print(f"✅ Nuevo enlace compartido creado: {download_link}")
+        return download_link, None
+        
+    except dropbox.exceptions.ApiError as e:
+        # Si el error es que el enlace ya existe, obtener el enlace existente
+        if 'shared_link_already_exists' in str(e):
+            try:
+                # Obtener enlaces compartidos existentes
+                shared_links = dbx.sharing_list_shared_links(dropbox_path).links
+                if shared_links:
+                    existing_link = shared_links[0].url
+                    download_link = existing_link.replace('?dl=0', '?dl=1')
+                    print(f"✅ Usando enlace compartido existente: {download_link}")
+                    return download_link, None
+                else:
+                    return None, f"Error: Enlace ya existe pero no se pudo obtener: {e}"
+            except Exception as list_error:
+                return None, f"Error obteniendo enlace existente: {list_error}"
+        else:
+            return None, f"Error creando enlace compartido: {e}"
+
+def create_dropbox_folder_structure(access_token, folder_path="/AnalizaPC-Reports"):
     """
     Crear solo la carpeta principal - super simple
     """
@@ -64,7 +70,6 @@ def create_dropbox_folder_structure(access_token):
         dbx = dropbox.Dropbox(access_token)
         
         # Crear solo carpeta principal
-        folder_path = "/AnalizaPC-Reports"
         try:
             dbx.files_create_folder_v2(folder_path)
             print(f"✅ Carpeta principal creada: {folder_path}")
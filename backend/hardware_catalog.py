@@ -0,0 +1,129 @@
+# backend/hardware_catalog.py
+import re
+import threading
+from functools import lru_cache
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal, SystemAnalysis, HardwareModel
+
+# Ruido habitual en las cadenas que reportan los sistemas operativos
+NOISE_RE = re.compile(
+    r"\((?:r|tm|c)\)|®|™|@\s*[\d.]+\s*ghz|\b\d+-core\b|\bprocessor\b|\bcpu\b|\bwith radeon graphics\b|\blaptop gpu\b",
+    re.IGNORECASE
+)
+
+INTEL_CORE_RE = re.compile(r"\b(?:intel\s+)?(?:core\s+)?(i[3579])[\s-]*(\d{4,5}[a-z]{0,3})\b", re.IGNORECASE)
+INTEL_ULTRA_RE = re.compile(r"\b(?:intel\s+)?(?:core\s+)?ultra\s*([3579])[\s-]*(\d{3}[a-z]{0,2})\b", re.IGNORECASE)
+RYZEN_RE = re.compile(r"\b(?:amd\s+)?ryzen\s*(\d)\s*(pro\s+)?(\d{4}[a-z0-9]{0,3})\b", re.IGNORECASE)
+APPLE_RE = re.compile(r"\b(?:apple\s+)?(m\d)(?:\s+(pro|max|ultra))?\b", re.IGNORECASE)
+
+NVIDIA_RE = re.compile(r"\b(rtx|gtx|gt)\s*(\d{3,4})\s*(ti)?\s*(super)?\b", re.IGNORECASE)
+RADEON_RE = re.compile(r"\b(?:amd\s+)?(?:radeon\s+)?rx\s*(\d{3,4})\s*(xtx|xt)?\b", re.IGNORECASE)
+ARC_RE = re.compile(r"\b(?:intel\s+)?arc\s*([ab]\d{3}m?)\b", re.IGNORECASE)
+
+def _clean(raw: str):
+    return " ".join(NOISE_RE.sub(" ", raw or "").split())
+
+@lru_cache(maxsize=8192)
+def canonicalize_cpu(raw: str):
+    """'Intel(R) Core(TM) i7-10700K CPU @ 3.80GHz' y 'i7 10700k' -> 'Intel Core i7-10700K'"""
+    cleaned = _clean(raw)
+    match = INTEL_ULTRA_RE.search(cleaned)
+    if match:
+        return f"Intel Core Ultra {match.group(1)} {match.group(2).upper()}"
+    match = INTEL_CORE_RE.search(cleaned)
+    if match:
+        return f"Intel Core {match.group(1).lower()}-{match.group(2).upper()}"
+    match = RYZEN_RE.search(cleaned)
+    if match:
+        pro = "PRO " if match.group(2) else ""
+        return f"AMD Ryzen {match.group(1)} {pro}{match.group(3).upper()}"
+    match = APPLE_RE.search(cleaned)
+    if match:
+        variant = f" {match.group(2).capitalize()}" if match.group(2) else ""
+        return f"Apple {match.group(1).upper()}{variant}"
+    return cleaned
+
+@lru_cache(maxsize=8192)
+def canonicalize_gpu(raw: str):
+    """'NVIDIA GeForce RTX 3070 Ti Laptop GPU' y 'rtx3070ti' -> 'NVIDIA GeForce RTX 3070 Ti'"""
+    cleaned = _clean(raw)
+    match = NVIDIA_RE.search(cleaned)
+    if match:
+        suffix = "".join(f" {part.capitalize() if part.lower() == 'ti' else part.upper()}" for part in match.group(3, 4) if part)
+        return f"NVIDIA GeForce {match.group(1).upper()} {match.group(2)}{suffix}"
+    match = RADEON_RE.search(cleaned)
+    if match:
+        suffix = f" {match.group(2).upper()}" if match.group(2) else ""
+        return f"AMD Radeon RX {match.group(1)}{suffix}"
+    match = ARC_RE.search(cleaned)
+    if match:
+        return f"Intel Arc {match.group(1).upper()}"
+    return cleaned
+
+CANONICALIZERS = {"cpu": canonicalize_cpu, "gpu": canonicalize_gpu}
+
+class HardwareCatalog:
+    """
+    Caché en memoria (kind, modelo canónico) -> id de hardware_models.
+    Los modelos nuevos se insertan en su propia sesión para que el id cacheado
+    siga siendo válido aunque la transacción del análisis haga rollback.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+    def model_id(self, kind: str, raw: str):
+        canonical = CANONICALIZERS[kind](raw or "")
+        if not canonical:
+            return None
+
+        key = (kind, canonical.lower())
+        model_id = self._ids.get(key)
+        if model_id is None:
+            model_id = self._lookup_or_create(kind, key[1], canonical)
+            with self._lock:
+                self._ids[key] = model_id
+        return model_id
+
+    def _lookup_or_create(self, kind, model_key, canonical):
+        db = SessionLocal()
+        try:
+            existing = db.query(HardwareModel.id).filter_by(kind=kind, model_key=model_key).first()
+            if existing:
+                return existing[0]
+            model = HardwareModel(kind=kind, model_key=model_key, canonical_name=canonical)
+            db.add(model)
+            try:
+                db.commit()
+                return model.id
+            except IntegrityError:
+                # Otro worker lo insertó a la vez
+                db.rollback()
+                return db.query(HardwareModel.id).filter_by(kind=kind, model_key=model_key).scalar()
+        finally:
+            db.close()
+
+    def backfill(self, db):
+        """Asigna cpu_model_id/gpu_model_id a las filas antiguas, una UPDATE por cadena distinta"""
+        updated = 0
+        for kind, raw_column, id_column in (
+            ("cpu", SystemAnalysis.cpu_model, SystemAnalysis.cpu_model_id),
+            ("gpu", SystemAnalysis.gpu_model, SystemAnalysis.gpu_model_id),
+        ):
+            pending = db.query(raw_column).filter(id_column.is_(None), raw_column.isnot(None)).distinct().all()
+            for (raw,) in pending:
+                model_id = self.model_id(kind, raw)
+                if model_id is None:
+                    continue
+                updated += db.query(SystemAnalysis).filter(raw_column == raw, id_column.is_(None)) \
+                    .update({id_column: model_id}, synchronize_session=False)
+        db.commit()
+        return updated
+
+# Instancia global del proceso
+hardware_catalog = HardwareCatalog()
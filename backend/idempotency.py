@@ -0,0 +1,162 @@
+# backend/idempotency.py
+import datetime
+import hashlib
+import json
+import os
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal, IdempotencyKey
+from shared_metrics import shared_metrics
+
+# Segundos que se recuerda la respuesta de una clave
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# Segundos que un duplicado espera a que termine la petición original (y que dura su reserva)
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "120"))
+# Segundos entre comprobaciones mientras la original sigue en curso
+IDEMPOTENCY_POLL = 0.1
+# Limpieza de claves caducadas cada tantos segundos
+IDEMPOTENCY_PURGE_INTERVAL = 60
+
+MAX_KEY_LENGTH = 255
+
+# Resultado de reservar una clave
+OWNER, DONE, PENDING, RETRY = "owner", "done", "pending", "retry"
+
+class IdempotencyConflict(Exception):
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.status_code = status_code
+
+def fingerprint(payload: dict):
+    """Huella del cuerpo: la misma clave con otro cuerpo es un error del cliente"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _encode(response):
+    """(status_code, cuerpo JSON); status_code None para los dicts que devuelve el endpoint"""
+    if isinstance(response, Response):
+        return response.status_code, response.body.decode("utf-8")
+    return None, json.dumps(jsonable_encoder(response), ensure_ascii=False)
+
+def _decode(entry):
+    if entry.status_code is None:
+        return json.loads(entry.response)
+    return Response(content=entry.response, status_code=entry.status_code, media_type="application/json")
+
+class IdempotencyStore:
+    """
+    Respuestas por Idempotency-Key guardadas en la tabla idempotency_keys, comunes a todos los
+    workers. La primera petición de una clave la reserva con un INSERT; los duplicados esperan
+    su resultado en lugar de repetir el trabajo. Si el proceso de la original cae, su reserva
+    caduca tras IDEMPOTENCY_WAIT segundos y la siguiente petición la ejecuta.
+    """
+
+    def __init__(self, ttl: float, wait: float):
+        self.ttl = ttl
+        self.wait = wait
+        self._purged_at = 0.0
+        # Contadores de toda la instancia (sumados entre workers del servidor)
+        self.replayed = shared_metrics.counter("idempotency.replayed")
+        self.coalesced = shared_metrics.counter("idempotency.coalesced")
+
+    def run(self, key: str, payload: dict, fn):
+        """
+        Ejecuta fn() una sola vez por clave y devuelve (respuesta, repetida).
+        Las respuestas 5xx no se guardan: el cliente puede reintentarlas de verdad.
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyConflict(f"Idempotency-Key de más de {MAX_KEY_LENGTH} caracteres", 400)
+        digest = fingerprint(payload)
+        deadline = time.monotonic() + self.wait
+        waited = False
+
+        while True:
+            state, response = self._claim(key, digest)
+            if state == OWNER:
+                return self._execute(key, fn), False
+            if state == DONE:
+                self.replayed.add()
+                return response, True
+            if state == RETRY:
+                continue
+
+            # Duplicado en curso: esperar a la original
+            if not waited:
+                self.coalesced.add()
+                waited = True
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict("La petición original con esta Idempotency-Key sigue en curso", 409)
+            time.sleep(IDEMPOTENCY_POLL)
+
+    def _claim(self, key, digest):
+        """Reserva la clave o informa de su estado: (OWNER|DONE|PENDING|RETRY, respuesta)"""
+        db = SessionLocal()
+        try:
+            now = datetime.datetime.utcnow()
+            self._purge(db, now)
+            db.add(IdempotencyKey(
+                key=key, fingerprint=digest, status="processing",
+                lease_until=now + datetime.timedelta(seconds=self.wait),
+                expires_at=now + datetime.timedelta(seconds=self.ttl)
+            ))
+            try:
+                db.commit()
+                return OWNER, None
+            except IntegrityError:
+                db.rollback()
+
+            entry = db.get(IdempotencyKey, key)
+            if entry is None:
+                # La original falló sin respuesta guardable: reintentar como propietario
+                return RETRY, None
+            if entry.expires_at <= now:
+                db.delete(entry)
+                db.commit()
+                return RETRY, None
+            if entry.fingerprint != digest:
+                raise IdempotencyConflict("Idempotency-Key reutilizada con otros datos")
+            if entry.status == "done":
+                return DONE, _decode(entry)
+            if entry.lease_until is not None and entry.lease_until < now:
+                # Reserva caducada: quedársela solo si nadie se ha adelantado
+                taken = db.query(IdempotencyKey).filter(
+                    IdempotencyKey.key == key, IdempotencyKey.lease_until == entry.lease_until
+                ).update({"lease_until": now + datetime.timedelta(seconds=self.wait)}, synchronize_session=False)
+                db.commit()
+                if taken:
+                    return OWNER, None
+            return PENDING, None
+        finally:
+            db.close()
+
+    def _execute(self, key, fn):
+        response = None
+        try:
+            response = fn()
+            return response
+        finally:
+            db = SessionLocal()
+            try:
+                entry = db.query(IdempotencyKey).filter(IdempotencyKey.key == key)
+                if response is None or (isinstance(response, Response) and response.status_code >= 500):
+                    entry.delete(synchronize_session=False)
+                else:
+                    status_code, body = _encode(response)
+                    entry.update({
+                        "status": "done", "status_code": status_code, "response": body, "lease_until": None
+                    }, synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+
+    def _purge(self, db, now):
+        """Olvida las claves caducadas (como mucho una vez cada IDEMPOTENCY_PURGE_INTERVAL)"""
+        if time.monotonic() - self._purged_at < IDEMPOTENCY_PURGE_INTERVAL:
+            return
+        self._purged_at = time.monotonic()
+        db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < now).delete(synchronize_session=False)
+        db.commit()
+
+# Instancia global del proceso
+idempotent_requests = IdempotencyStore(IDEMPOTENCY_TTL, IDEMPOTENCY_WAIT)
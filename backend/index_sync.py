@@ -0,0 +1,201 @@
+# backend/index_sync.py
+"""
+Índices en memoria de cada worker (similar_machines, score_percentiles) al día con los
+cambios de cualquier worker o instancia.
+
+Cada worker carga los índices en segundo plano al arrancar (la API sirve mientras tanto; los
+endpoints que dependen de ellos responden 503 hasta que están listos) y luego sigue el feed
+de dashboard_events. Si cambia
+la configuración de scoring (recarga en caliente), los vectores normalizados con los topes
+anteriores ya no sirven: ambos índices se vuelven a cargar desde la BD.
+Los cambios se aplican de forma idempotente: un análisis que ya está en el índice no se
+vuelve a contar, así da igual que el worker que lo escribió lo haya añadido antes en línea.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from database import SessionLocal, SystemAnalysis
+from archive import analysis_archive
+from dashboard_events import EventCursor, latest_event_id, purge_events, DASHBOARD_EVENT_RETENTION
+from percentile_index import score_percentiles
+from similarity_index import similar_machines
+from scoring import scoring_models
+
+# Segundos entre lecturas del feed (los cambios del propio worker ya se aplican en línea)
+INDEX_SYNC_INTERVAL = float(os.getenv("INDEX_SYNC_INTERVAL", "1"))
+# Limpieza de eventos antiguos del feed cada tantos segundos
+INDEX_SYNC_PURGE_INTERVAL = 60
+
+VECTOR_FIELDS = ("cpu_speed_ghz", "cores", "ram_gb", "gpu_vram_gb", "disk_type")
+LOAD_COLUMNS = ("analysis_id", "main_profile", "main_score") + VECTOR_FIELDS
+
+def _info(source):
+    """Campos del vector de un dict o una fila, ignorando los nulos (como row_to_info)"""
+    get = source.get if isinstance(source, dict) else lambda field: getattr(source, field, None)
+    return {field: get(field) for field in VECTOR_FIELDS if get(field) is not None}
+
+class IndexSync:
+    """Carga los índices del worker y les aplica los cambios del feed en un hilo propio"""
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()  # serializa cargas y cambios entre el hilo y las peticiones
+        self._cursor = None
+        self.version = None  # versión de scoring con la que se normalizaron los vectores
+        self.state = "pending"  # primera carga: pending | loading | ready | error
+        self.last_error = None
+        self._purged_at = 0.0
+        self._polled_at = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+
+    # -------------------------
+    #   CAMBIOS
+    # -------------------------
+    def added(self, analysis_id: int, info, profile: str, score: float):
+        """Análisis nuevo (dict de SysInfo o fila); no hace nada si ya estaba en los índices"""
+        with self._lock:
+            if similar_machines.get_vector(analysis_id) is not None:
+                return
+            similar_machines.add(analysis_id, scoring_models.current().normalize(_info(info)))
+            if score is not None:
+                score_percentiles.add(profile, score)
+
+    def removed(self, analysis_id: int, profile: str, score: float):
+        """Análisis borrado; no hace nada si ya no estaba en los índices"""
+        with self._lock:
+            if similar_machines.get_vector(analysis_id) is None:
+                return
+            similar_machines.remove(analysis_id)
+            if score is not None:
+                score_percentiles.remove(profile, score)
+
+    # -------------------------
+    #   CARGA COMPLETA
+    # -------------------------
+    def rebuild(self, version: str = None):
+        """
+        Carga ambos índices desde la BD y el archivo; lo posterior llega por el feed.
+        Con version, no hace nada si ya están cargados con ella (otro hilo se adelantó).
+        """
+        db = SessionLocal()
+        try:
+            with self._lock:
+                if version is not None and version == self.version:
+                    return
+                # El cursor se fija antes de leer: un cambio confirmado entre medias llega
+                # repetido (y se ignora) en vez de perderse
+                cursor = EventCursor(latest_event_id(db))
+                model = scoring_models.current()
+
+                # Vectores de hardware para las máquinas similares
+                # (también los archivados, que siguen siendo consultables por id)
+                rows = db.query(*(getattr(SystemAnalysis, c) for c in LOAD_COLUMNS)).all()
+                archived = (SimpleNamespace(**dict(zip(LOAD_COLUMNS, row))) for row in analysis_archive.scan(db, LOAD_COLUMNS))
+                distribution = Counter()
+
+                def vectors():
+                    for row in itertools.chain(rows, archived):
+                        if row.main_score is not None:
+                            distribution[(row.main_profile, row.main_score)] += 1
+                        yield row.analysis_id, model.normalize(_info(row))
+
+                similar_machines.rebuild(vectors())
+                # Distribución de puntuaciones por perfil para los percentiles
+                score_percentiles.rebuild(
+                    (profile, score, count) for (profile, score), count in distribution.items()
+                )
+                self._cursor = cursor
+                self.version = model.version
+                self._polled_at = time.monotonic()
+                self.state = "ready"
+                self.last_error = None
+        finally:
+            db.close()
+        print(f"✅ Índice de similitud cargado: {len(similar_machines)} máquinas")
+
+    # -------------------------
+    #   HILO DEL FEED
+    # -------------------------
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def snapshot(self):
+        return {"state": self.state, "machines": len(similar_machines), "scoring_version": self.version,
+                "last_error": self.last_error}
+
+    def start(self):
+        """Arranca el hilo; la primera carga se hace en él, sin retrasar el arranque de la API"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="index-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while self._cursor is None and not self._stop.is_set():
+            try:
+                self.state = "loading"
+                self.rebuild()
+            except Exception as e:
+                self.state = "error"
+                self.last_error = str(e)[:300]
+                print(f"❌ Error cargando los índices en memoria: {e}")
+                self._stop.wait(5)
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Error sincronizando los índices en memoria: {e}")
+
+    def poll(self):
+        """Aplica los cambios nuevos del feed; devuelve cuántos eventos ha leído"""
+        db = SessionLocal()
+        try:
+            if time.monotonic() - self._purged_at >= INDEX_SYNC_PURGE_INTERVAL:
+                self._purged_at = time.monotonic()
+                purge_events(db)
+
+            if time.monotonic() - self._polled_at > DASHBOARD_EVENT_RETENTION / 2:
+                # Tanto tiempo sin leer el feed que parte de lo pendiente puede estar ya purgado
+                db.close()
+                self.rebuild()
+                return 0
+            version = scoring_models.current().version
+            if version != self.version:
+                # Configuración de scoring nueva: los vectores se normalizaron con los topes anteriores
+                db.close()
+                self.rebuild(version)
+                return 0
+
+            events = self._cursor.fetch(db)
+            self._polled_at = time.monotonic()
+            for event in events:
+                payload = json.loads(event.payload)
+                if event.kind == "analysis_created":
+                    self.added(payload["analysis_id"], payload, payload["main_profile"], payload["main_score"])
+                elif event.kind == "analysis_deleted":
+                    self.removed(payload["analysis_id"], payload["main_profile"], payload["main_score"])
+                elif event.kind == "analyses_imported":
+                    rows = db.query(*(getattr(SystemAnalysis, c) for c in LOAD_COLUMNS)).filter(
+                        SystemAnalysis.analysis_id.between(payload["first_analysis_id"], payload["last_analysis_id"])
+                    ).all()
+                    for row in rows:
+                        self.added(row.analysis_id, row, row.main_profile, row.main_score)
+            return len(events)
+        finally:
+            db.close()
+
+# Instancia global del proceso
+index_sync = IndexSync(INDEX_SYNC_INTERVAL)
@@ -0,0 +1,364 @@
+# backend/inventory_import.py
+"""
+Importación de inventarios de hardware (CSV o XLSX) como análisis.
+
+El fichero se lee en streaming y se procesa por lotes de IMPORT_CHUNK_SIZE filas: cada lote
+se valida, se puntúa con el modelo vigente y se inserta con un único INSERT múltiple junto a
+sus agregados temporales, en su propia transacción. La memoria depende del tamaño del lote,
+no del fichero; un lote con errores de base de datos no deshace los anteriores.
+
+Las columnas del inventario se asignan a los campos de SysInfo por nombre (ver ALIASES) o con
+un mapeo explícito, p. ej. {"cpu_model": "Processor", "ram_gb": {"column": "Memory (MB)", "scale": 0.0009765625}}.
+Los análisis importados generan su PDF bajo demanda, como los de REPORT_MODE=lazy.
+
+Uso (desde backend/):
+    python inventory_import.py inventario.csv
+    python inventory_import.py inventario.xlsx --mapping mapeo.json --chunk-size 5000
+    python inventory_import.py inventario.csv --map cpu_model=Processor --map ram_gb=Memory
+"""
+import csv
+import datetime
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+import config  # noqa: F401  (.env antes que el resto de módulos del backend)
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal, SystemAnalysis, get_next_analysis_id
+from hardware_catalog import hardware_catalog
+from rollups import record_batch
+from dashboard_events import publish_import
+from scoring import scoring_models
+
+# Filas por lote (validación, puntuación e INSERT)
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "2000"))
+# Lote máximo aceptado: acota la memoria y la duración de cada transacción
+IMPORT_MAX_CHUNK_SIZE = 10000
+# Importaciones simultáneas por proceso desde la API
+IMPORT_MAX_CONCURRENT = int(os.getenv("IMPORT_MAX_CONCURRENT", "1"))
+# Errores de fila que se devuelven con detalle (el resto solo se cuentan)
+IMPORT_MAX_ERRORS = 50
+# Reintentos de un lote cuando otro proceso ocupa los mismos analysis_id
+IMPORT_ID_ATTEMPTS = 8
+
+# Campos de SysInfo con su tipo y valor por defecto (los mismos que el modelo de la API)
+FIELDS = {
+    "cpu_model": (str, ""),
+    "cpu_speed_ghz": (float, 1.0),
+    "cores": (int, 1),
+    "ram_gb": (float, 1.0),
+    "disk_type": (str, "HDD"),
+    "gpu_model": (str, ""),
+    "gpu_vram_gb": (float, 0.0),
+}
+
+# Cabeceras reconocidas sin mapeo explícito (se comparan normalizadas: minúsculas, sin acentos)
+ALIASES = {
+    "cpu_model": ("cpu_model", "cpu", "processor", "procesador", "cpu_name", "processor_name"),
+    "cpu_speed_ghz": ("cpu_speed_ghz", "cpu_speed", "cpu_ghz", "clock_ghz", "ghz", "frecuencia", "frecuencia_ghz"),
+    "cores": ("cores", "cpu_cores", "num_cores", "nucleos", "cores_count"),
+    "ram_gb": ("ram_gb", "ram", "memory_gb", "memory", "memoria", "memoria_gb"),
+    "disk_type": ("disk_type", "disk", "disco", "storage", "storage_type", "almacenamiento"),
+    "gpu_model": ("gpu_model", "gpu", "graphics", "video_card", "tarjeta_grafica", "grafica"),
+    "gpu_vram_gb": ("gpu_vram_gb", "vram", "vram_gb", "gpu_memory", "gpu_memory_gb"),
+    "created_at": ("created_at", "scan_date", "last_scan", "fecha", "fecha_analisis"),
+}
+
+NUMBER_RE = re.compile(r"[-+]?\d+(?:[.,]\d+)?")
+
+class InventoryError(ValueError):
+    pass
+
+class ImportBusy(Exception):
+    pass
+
+def header_key(name):
+    """Cabecera normalizada: minúsculas, sin acentos y con _ como único separador"""
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+def resolve_mapping(headers, mapping=None):
+    """
+    {campo: (índice de columna, escala)} a partir de las cabeceras del fichero.
+    El mapeo explícito tiene prioridad; el resto de campos se buscan por ALIASES.
+    """
+    keys = [header_key(h) for h in headers]
+    resolved = {}
+    for field, spec in (mapping or {}).items():
+        if field not in FIELDS and field != "created_at":
+            raise InventoryError(f"Campo desconocido en el mapeo: {field}")
+        column, scale = (spec.get("column"), float(spec.get("scale", 1))) if isinstance(spec, dict) else (spec, 1.0)
+        if header_key(column) not in keys:
+            raise InventoryError(f"La columna '{column}' del mapeo no está en el fichero")
+        resolved[field] = (keys.index(header_key(column)), scale)
+
+    for field, aliases in ALIASES.items():
+        if field in resolved:
+            continue
+        index = next((keys.index(alias) for alias in aliases if alias in keys), None)
+        if index is not None:
+            resolved[field] = (index, 1.0)
+
+    if not {"cpu_model", "ram_gb"} & set(resolved):
+        raise InventoryError(f"Ninguna columna reconocida en la cabecera: {', '.join(map(str, headers))}")
+    return resolved
+
+# -------------------------
+#   LECTORES (streaming)
+# -------------------------
+def read_csv(stream):
+    """Filas de un CSV como listas; detecta el separador (, ; tab |) con una muestra inicial"""
+    sample = stream.read(64 * 1024)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(stream, dialect)
+
+def read_xlsx(source):
+    """Filas de la primera hoja de un XLSX en modo de solo lectura (openpyxl no la carga entera)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise InventoryError("Importar XLSX necesita openpyxl (pip install openpyxl)")
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+def open_rows(path: str, encoding: str = "utf-8-sig"):
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        return read_xlsx(path)
+    return read_csv(open(path, newline="", encoding=encoding))
+
+# -------------------------
+#   VALIDACIÓN
+# -------------------------
+def parse_number(value):
+    """Número de una celda: admite coma decimal y unidades ("16 GB", "3,6 GHz")"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        number = float(value)
+    else:
+        match = NUMBER_RE.search(str(value))
+        if not match:
+            raise ValueError(f"'{value}' no es un número")
+        number = float(match.group(0).replace(",", "."))
+    if not math.isfinite(number) or number < 0:
+        raise ValueError(f"'{value}' fuera de rango")
+    return number
+
+def parse_datetime(value):
+    """Fecha ISO (o celda de fecha de Excel) en UTC sin zona horaria, como created_at"""
+    if isinstance(value, datetime.datetime):
+        parsed = value
+    elif isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    else:
+        parsed = datetime.datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo is None else parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+def parse_row(row, resolved, now):
+    """(SysInfo como dict, created_at) de una fila; ValueError si algún campo no es válido"""
+    info = {}
+    for field, (kind, default) in FIELDS.items():
+        column = resolved.get(field)
+        value = row[column[0]] if column is not None and column[0] < len(row) else None
+        if value is None or (isinstance(value, str) and not value.strip()):
+            info[field] = default
+        elif kind is str:
+            info[field] = str(value).strip()
+        else:
+            try:
+                number = parse_number(value) * column[1]
+            except ValueError as e:
+                raise ValueError(f"{field}: {e}")
+            info[field] = int(round(number)) if kind is int else number
+    if info["cores"] < 1:
+        raise ValueError("cores: debe ser al menos 1")
+
+    created_at = now
+    column = resolved.get("created_at")
+    if column is not None and column[0] < len(row) and row[column[0]] not in (None, ""):
+        try:
+            created_at = parse_datetime(row[column[0]])
+        except (TypeError, ValueError):
+            raise ValueError(f"created_at: '{row[column[0]]}' no es una fecha ISO")
+    return info, created_at
+
+# -------------------------
+#   IMPORTACIÓN
+# -------------------------
+class InventoryImporter:
+    """
+    Valida, puntúa e inserta un inventario por lotes. run() es un generador que devuelve el
+    progreso tras cada lote (y el resumen final con done=True).
+    """
+
+    def __init__(self, mapping=None, chunk_size: int = IMPORT_CHUNK_SIZE, id_lock=None, on_inserted=None):
+        self.mapping = mapping
+        self.chunk_size = min(max(1, chunk_size), IMPORT_MAX_CHUNK_SIZE)
+        # Serializa la reserva de ids con los análisis de la API del mismo proceso
+        self.id_lock = id_lock or threading.Lock()
+        self.on_inserted = on_inserted
+        self.read = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+        self.first_id = None
+        self.last_id = None
+
+    def _reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"row": line, "message": message})
+
+    def progress(self, start, done=False):
+        elapsed = time.perf_counter() - start
+        report = {
+            "rows": self.read,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(self.read / elapsed) if elapsed > 0 else None,
+        }
+        if done:
+            report.update(done=True, first_analysis_id=self.first_id, last_analysis_id=self.last_id, errors=self.errors)
+        return report
+
+    def run(self, rows):
+        start = time.perf_counter()
+        rows = iter(rows)
+        headers = next(rows, None)
+        if headers is None:
+            raise InventoryError("El fichero está vacío")
+        resolved = resolve_mapping(headers, self.mapping)
+
+        chunk = []
+        # La cabecera es la fila 1 del fichero
+        for line, row in enumerate(rows, start=2):
+            if not any(cell not in (None, "") for cell in row):
+                continue
+            self.read += 1
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self._process(chunk, resolved)
+                chunk = []
+                yield self.progress(start)
+        if chunk:
+            self._process(chunk, resolved)
+        yield self.progress(start, done=True)
+
+    def _process(self, chunk, resolved):
+        now = datetime.datetime.utcnow()
+        valid = []
+        for line, row in chunk:
+            try:
+                valid.append(parse_row(row, resolved, now))
+            except ValueError as e:
+                self._reject(line, str(e))
+        if not valid:
+            return
+
+        model = scoring_models.current()
+        scores = model.score_batch([info for info, _ in valid])
+        records = [
+            {
+                **info,
+                "cpu_model_id": hardware_catalog.model_id("cpu", info["cpu_model"]),
+                "gpu_model_id": hardware_catalog.model_id("gpu", info["gpu_model"]),
+                "main_profile": profile,
+                "main_score": score,
+                "scoring_version": model.version,
+                "created_at": created_at,
+            }
+            for (info, created_at), (profile, score) in zip(valid, scores)
+        ]
+        self._insert(records)
+        if self.on_inserted is not None:
+            self.on_inserted(records)
+
+    def _insert(self, records):
+        """
+        Un INSERT múltiple por lote con ids consecutivos. Solo la reserva del rango pasa por el
+        candado: el INSERT y el commit no bloquean los análisis de la API. Si otro proceso ocupa
+        esos ids, se reserva otro rango.
+        """
+        for attempt in range(IMPORT_ID_ATTEMPTS):
+            db = SessionLocal()
+            try:
+                with self.id_lock:
+                    first = get_next_analysis_id(db, len(records))
+                for offset, record in enumerate(records):
+                    record["analysis_id"] = first + offset
+                    record["pdf_url"] = f"/api/analyses/{first + offset}/report.pdf"
+                db.execute(insert(SystemAnalysis), records)
+                record_batch(db, records)
+                publish_import(db, records)
+                db.commit()
+                break
+            except IntegrityError:
+                db.rollback()
+                if attempt == IMPORT_ID_ATTEMPTS - 1:
+                    raise
+            finally:
+                db.close()
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+        self.inserted += len(records)
+        if self.first_id is None:
+            self.first_id = first
+        self.last_id = first + len(records) - 1
+
+# Importaciones en curso en este proceso (la API rechaza las que superan el límite)
+import_slots = threading.BoundedSemaphore(IMPORT_MAX_CONCURRENT)
+
+def parse_mapping_args(mapping_file=None, pairs=()):
+    mapping = {}
+    if mapping_file:
+        with open(mapping_file, encoding="utf-8") as f:
+            mapping.update(json.load(f))
+    for pair in pairs:
+        field, _, column = pair.partition("=")
+        if not column:
+            raise SystemExit(f"--map espera campo=Columna: {pair}")
+        mapping[field.strip()] = column.strip()
+    return mapping
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="fichero .csv o .xlsx")
+    parser.add_argument("--mapping", help="JSON {campo de SysInfo: columna}")
+    parser.add_argument("--map", action="append", default=[], metavar="CAMPO=COLUMNA")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--encoding", default="utf-8-sig", help="codificación del CSV")
+    args = parser.parse_args()
+
+    from database import create_tables
+    create_tables()
+
+    importer = InventoryImporter(parse_mapping_args(args.mapping, args.map), args.chunk_size)
+    try:
+        for report in importer.run(open_rows(args.path, args.encoding)):
+            print(f"\r{report['rows']:>10} filas  {report['inserted']:>10} importadas  {report['rejected']:>8} rechazadas  "
+                  f"{report['rows_per_second'] or 0:>8} filas/s", end="", flush=True)
+    except InventoryError as e:
+        raise SystemExit(f"❌ {e}")
+    print()
+    for error in report["errors"]:
+        print(f"⚠️ Fila {error['row']}: {error['message']}")
+    if report["rejected"] > len(report["errors"]):
+        print(f"⚠️ ... y {report['rejected'] - len(report['errors'])} filas rechazadas más")
+    print(f"✅ {report['inserted']} análisis importados en {report['elapsed_seconds']} s "
+          f"({report['rows_per_second']} filas/s), ids {report['first_analysis_id']}-{report['last_analysis_id']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,65 @@
-from fastapi import FastAPI, Depends
+# Primero: carga el .env antes de que los módulos del backend lean su configuración
+import config  # noqa: F401
+from fastapi import FastAPI, Depends, BackgroundTasks, Header, File, Form, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from fpdf import FPDF
+from typing import Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from database import get_db, SystemAnalysis, create_tables, get_next_analysis_id
+from sqlalchemy.exc import IntegrityError
+from database import get_db, SessionLocal, SystemAnalysis, AnalysisRollup, HardwareModel, ReportOutbox, create_tables, get_next_analysis_id
 import datetime
 from datetime import timezone, timedelta
+import html
+import io
 import json
 import os
-from dropbox_upload import upload_to_dropbox, create_dropbox_folder_structure
-from dotenv import load_dotenv
+import random
+import threading
+import time
+from search_index import create_search_index, search_analyses, count_analyses, parse_query
+from similarity_index import similar_machines
+from percentile_index import score_percentiles
+from index_sync import index_sync
+from rollups import record_analysis, refresh_buckets, rebuild_rollups, get_timeseries
+from hardware_catalog import hardware_catalog
+from recommendations import recommend
+from report_pool import report_renderer, ReportQueueFull
+from report_cache import report_cache
+from scoring import scoring_models, FEATURES
+from idempotency import idempotent_requests, IdempotencyConflict
+from admission import AdmissionMiddleware, admission_control, http_requests
+from shared_metrics import shared_metrics
+from replica import read_router, get_read_db
+from archive import analysis_archive, ensure_partitions, merge_hardware
+from analytics import analytics_snapshot, AnalyticsUnavailable, AnalyticsQueryError
+from inventory_import import InventoryImporter, read_csv, read_xlsx, import_slots, IMPORT_CHUNK_SIZE
+from dashboard_events import dashboard_broadcast, dashboard_kpis, latest_event_id, publish as publish_dashboard_event, DashboardBusy
+from storage import artifact_storage, content_type, StorageError
+from outbox import report_outbox, enqueue as enqueue_report
 
-# Cargar variables de entorno
-load_dotenv()
 access_token = os.getenv("DROPBOX_ACCESS_TOKEN")
 
+# "eager": cada análisis sube PDF + JSON antes de responder (con el outbox como respaldo);
+# "background": solo los encola en el outbox; "lazy": el PDF se genera al pedirlo
+REPORT_MODE = os.getenv("REPORT_MODE", "eager").lower()
+# En modo lazy, subir también al almacenamiento los informes que se llegan a abrir
+REPORT_UPLOAD_ON_RENDER = os.getenv("REPORT_UPLOAD_ON_RENDER", "0") == "1"
+# Tarjetas de análisis que muestra /dashboard (las más recientes; el resto en /api/analyses)
+DASHBOARD_CARDS = int(os.getenv("DASHBOARD_CARDS", "50"))
+# Reintentos al asignar analysis_id cuando dos análisis concurrentes calculan el mismo
+ANALYSIS_ID_ATTEMPTS = 8
+# Serializa la asignación dentro del proceso; los reintentos cubren a otros procesos
+analysis_id_lock = threading.Lock()
+# Esquema y migraciones ya aplicados en este proceso (o en el maestro antes del fork)
+database_prepared = False
+
 app = FastAPI(title="AnalizaTuPC API", version="2.0.0")
 
-print("🚀 CARGANDO VERSIÓN NUEVA MEJORADA - " + datetime.datetime.now().strftime("%H:%M:%S"))
+# Control de admisión por dentro de CORS: los rechazos también llevan cabeceras CORS
+app.add_middleware(AdmissionMiddleware, control=admission_control)
 
 # CORS
 app.add_middleware(
@@ -28,6 +68,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Los clientes sin cookies pueden reenviar X-Last-Write en sus lecturas (réplica)
+    expose_headers=["X-Last-Write"],
 )
 
 # -------------------------
@@ -45,394 +87,33 @@ class SysInfo(BaseModel):
 # -------------------------
 #   FUNCIONES DE SCORE
 # -------------------------
-def score_system(info: dict):
-    cpu = info.get('cpu_speed_ghz', 1.0) * info.get('cores', 1)
-    ram = info.get('ram_gb', 1.0)
-    gpu = info.get('gpu_vram_gb', 0.0)
-    disk = 1.0 if info.get('disk_type', '').lower() == 'nvme' else 0.6 if 'ssd' in info.get('disk_type', '').lower() else 0.2
-
-    cpu_norm = min(cpu / 8.0, 1.0)
-    ram_norm = min(ram / 32.0, 1.0)
-    gpu_norm = min(gpu / 8.0, 1.0)
-
-    profiles = {
-        "Ofimática": 0.4 * cpu_norm + 0.4 * ram_norm + 0.2 * disk,
-        "Gaming": 0.25 * cpu_norm + 0.4 * gpu_norm + 0.2 * ram_norm + 0.15 * disk,
-        "Edición Vídeo": 0.3 * cpu_norm + 0.3 * gpu_norm + 0.3 * ram_norm + 0.1 * disk,
-        "Virtualización": 0.45 * cpu_norm + 0.45 * ram_norm + 0.1 * disk,
-        "ML Ligero": 0.2 * cpu_norm + 0.6 * gpu_norm + 0.2 * ram_norm,
-    }
+def normalize_features(info: dict):
+    """Vector normalizado (cpu, ram, gpu, disco) en el rango 0-1"""
+    return scoring_models.current().normalize(info)
 
-    sorted_profiles = sorted(profiles.items(), key=lambda x: x[1], reverse=True)
-    main_profile, main_score = sorted_profiles[0]
+def score_system(info: dict):
+    """Puntuación por perfil con la configuración de scoring vigente (ver scoring_profiles.json)"""
+    return scoring_models.current().score(info)
 
+def stored_result(analysis, info: dict):
+    """
+    Resultado tal como se guardó el análisis (perfil, puntuación y versión de scoring).
+    El desglose por perfil no se guarda: solo se recalcula si la versión vigente es la misma.
+    """
+    model = scoring_models.current()
+    if analysis.scoring_version is not None and analysis.scoring_version == model.version:
+        scores = model.score(info)["scores"]
+    elif analysis.main_score is not None:
+        scores = {analysis.main_profile: analysis.main_score / 100}
+    else:
+        scores = {}
     return {
-        "scores": profiles,
-        "main_profile": main_profile,
-        "main_score": round(main_score * 100, 1)
+        "scores": scores,
+        "main_profile": analysis.main_profile,
+        "main_score": analysis.main_score,
+        "scoring_version": analysis.scoring_version or "sin-version"
     }
 
-# -------------------------
-#   PDF SUPER ELEGANTE - COLORES MÁS CLAROS
-# -------------------------
-class PDF(FPDF):
-    def __init__(self, analysis_id: int):
-        super().__init__()
-        self.analysis_id = f"APC-{analysis_id:04d}"
-    
-    def header(self):
-        # ENCABEZADO CON AZUL CELESTE
-        # Fondo con azul celeste
-        self.set_fill_color(173, 216, 230)  # Azul celeste claro
-        self.rect(0, 0, 210, 45, 'F')
-        
-        # Efecto de gradiente (simulado con rectángulos superpuestos)
-        self.set_fill_color(135, 206, 235)  # Azul celeste medio
-        self.rect(0, 0, 210, 15, 'F')
-        
-        # TÍTULO PRINCIPAL
-        self.set_font("Arial", "B", 28)
-        self.set_text_color(0, 0, 139)  # Azul oscuro para contraste
-        
-        # Efecto de sombra para el título
-        self.set_text_color(70, 130, 180)  # Azul acero para sombra
-        self.cell(0, 28, "AnalizaTuPc", ln=True, align="C")
-        
-        # Título principal (sobre la sombra)
-        self.set_y(20)
-        self.set_text_color(0, 0, 139)  # Azul oscuro principal
-        self.set_font("Arial", "B", 28)
-        self.cell(0, 8, "AnalizaTuPc", ln=True, align="C")
-        
-        # Subtítulo elegante
-        self.set_y(32)
-        self.set_font("Arial", "I", 12)
-        self.set_text_color(0, 0, 100)  # Azul oscuro
-        self.cell(0, 8, "ANÁLISIS PROFESIONAL DE HARDWARE", ln=True, align="C")
-        
-        # LÍNEA DECORATIVA MEJORADA
-        self.set_draw_color(0, 0, 139)  # Azul oscuro
-        self.set_line_width(1.5)
-        self.line(30, 42, 180, 42)
-        
-        # Elementos decorativos en las esquinas
-        self.set_draw_color(0, 0, 139)
-        self.set_line_width(1)
-        # Esquina superior izquierda
-        self.line(10, 10, 25, 10)
-        self.line(10, 10, 10, 25)
-        # Esquina superior derecha
-        self.line(185, 10, 200, 10)
-        self.line(200, 10, 200, 25)
-        
-        self.ln(20)
-
-    def footer(self):
-        self.set_y(-25)  # Más espacio para el footer
-        self.set_font("Arial", "I", 9)
-        self.set_text_color(100, 100, 100)
-        
-        # Línea separadora
-        self.set_draw_color(200, 200, 200)
-        self.line(10, self.get_y(), 200, self.get_y())
-        self.ln(5)
-        
-        # Obtener hora local corregida (UTC+1 para España)
-        local_time = datetime.datetime.now(timezone(timedelta(hours=1)))
-        
-        # Información del footer CON HORA CORREGIDA
-        self.cell(0, 6, f"Reporte generado el {local_time.strftime('%d/%m/%Y')} a las {local_time.strftime('%H:%M')}", align="C")
-        self.ln(4)
-        self.cell(0, 6, f"Página {self.page_no()}", align="C")
-        self.ln(4)
-        # ID DEL ANÁLISIS SIEMPRE EN EL FOOTER
-        self.set_font("Arial", "B", 9)
-        self.set_text_color(70, 130, 180)  # Azul acero
-        self.cell(0, 6, f"ID del análisis: {self.analysis_id}", align="C")
-
-    def add_section_title(self, title):
-        self.ln(12)
-        self.set_font("Arial", "B", 18)
-        self.set_text_color(255, 255, 255)  # Texto blanco
-        self.set_fill_color(135, 206, 235)  # Azul celeste para fondo
-        
-        # Borde redondeado simulado
-        self.cell(0, 14, f" {title.upper()} ", ln=True, fill=True, align='L')
-        
-        # Línea decorativa debajo del título
-        self.set_draw_color(0, 0, 139)  # Azul oscuro
-        self.set_line_width(0.8)
-        self.line(15, self.get_y() - 2, 60, self.get_y() - 2)
-        self.ln(10)
-
-    def add_feature_card(self, title, value, highlight=False):
-        self.set_font("Arial", "B", 11)
-        self.set_text_color(60, 60, 60)
-        self.cell(60, 8, f"{title}:", border=0)
-        
-        self.set_font("Arial", "B" if highlight else "", 11)
-        if highlight:
-            self.set_text_color(220, 0, 0)
-        else:
-            self.set_text_color(0, 0, 0)
-            
-        self.cell(0, 8, str(value), ln=True)
-        self.ln(3)
-
-    def add_score_meter(self, profile, score, rank):
-        self.set_font("Arial", "B", 12)
-        
-        # COLORES MÁS CLAROS Y SUAVES para las puntuaciones
-        if score >= 80:
-            color = (200, 230, 255)  # Azul muy claro y suave - EXCELENTE
-            label = "EXCELENTE"
-        elif score >= 60:
-            color = (220, 240, 255)  # Azul casi blanco - BUENO
-            label = "BUENO"
-        elif score >= 40:
-            color = (240, 248, 255)  # Azul alice muy claro - REGULAR
-            label = "REGULAR"
-        else:
-            color = (245, 250, 255)  # Casi blanco con tono azul - MEJORABLE
-            label = "MEJORABLE"
-        
-        # Tarjeta de puntuación con borde sutil
-        self.set_fill_color(color[0], color[1], color[2])
-        self.set_text_color(0, 0, 0)  # Texto negro para mejor contraste
-        self.set_draw_color(200, 200, 200)  # Borde gris claro
-        self.set_line_width(0.2)  # Borde más delgado
-        self.cell(0, 10, f" {label} - {profile}: {score}% ({rank})", border=1, ln=True, fill=True)
-        self.ln(5)
-
-# -------------------------
-#   GENERACIÓN DEL PDF ELEGANTE
-# -------------------------
-def create_pdf_report(sysinfo: dict, result: dict, analysis_id: int):
-    pdf = PDF(analysis_id)
-    pdf.add_page()
-
-    # PORTADA CON AZUL CELESTE
-    # Fondo de portada
-    pdf.set_fill_color(240, 248, 255)  # Azul alice muy claro
-    pdf.rect(0, 45, 210, 160, 'F')
-    
-    # TÍTULO PRINCIPAL DE PORTADA
-    pdf.set_y(60)
-    pdf.set_font("Arial", "B", 32)
-    pdf.set_text_color(70, 130, 180)  # Azul acero
-    
-    # Efecto de sombra para el título principal
-    pdf.set_text_color(100, 149, 237)  # Azul cornflower para sombra
-    pdf.cell(0, 15, "INFORME PROFESIONAL", ln=True, align="C")
-    pdf.set_text_color(70, 130, 180)  # Azul acero principal
-    pdf.set_y(75)
-    pdf.cell(0, 15, "INFORME PROFESIONAL", ln=True, align="C")
-    
-    # Subtítulo elegante
-    pdf.set_y(100)
-    pdf.set_font("Arial", "I", 18)
-    pdf.set_text_color(100, 100, 100)
-    pdf.cell(0, 10, "Análisis Completo de Hardware", ln=True, align="C")
-    
-    # Línea decorativa doble en azules
-    pdf.set_draw_color(135, 206, 235)  # Azul celeste
-    pdf.set_line_width(1)
-    pdf.line(50, 115, 160, 115)
-    pdf.set_draw_color(0, 0, 139)  # Azul oscuro
-    pdf.set_line_width(0.5)
-    pdf.line(55, 117, 155, 117)
-    
-    pdf.ln(40)
-    
-    # PERFIL PRINCIPAL DESTACADO CON AZUL CELESTE
-    pdf.set_fill_color(200, 230, 255)  # Azul muy claro y suave
-    pdf.set_draw_color(173, 216, 230)  # Azul celeste claro para borde
-    pdf.set_line_width(1)
-    
-    # Sombra del recuadro (más sutil)
-    pdf.set_fill_color(220, 220, 220)
-    pdf.rect(52, pdf.get_y() + 2, 106, 54, 'F')
-    
-    # Recuadro principal
-    pdf.set_fill_color(200, 230, 255)  # Azul muy claro y suave
-    pdf.rect(50, pdf.get_y(), 106, 50, 'F')
-    
-    # Contenido del recuadro
-    pdf.set_y(pdf.get_y() + 8)
-    pdf.set_font("Arial", "B", 16)
-    pdf.set_text_color(0, 0, 139)  # Azul oscuro
-    pdf.cell(0, 8, "PERFIL RECOMENDADO", ln=True, align="C")
-    
-    pdf.ln(5)
-    pdf.set_font("Arial", "B", 24)
-    pdf.set_text_color(0, 0, 100)  # Azul muy oscuro
-    pdf.cell(0, 12, f"{result['main_profile']}", ln=True, align="C")
-    
-    pdf.set_font("Arial", "B", 20)
-    pdf.set_text_color(70, 130, 180)  # Azul acero
-    pdf.cell(0, 10, f"{result['main_score']}% DE EFICIENCIA", ln=True, align="C")
-    
-    pdf.ln(40)
-
-    # NUEVA PÁGINA - DETALLES TÉCNICOS
-    pdf.add_page()
-    
-    # SECCIÓN: ESPECIFICACIONES DEL SISTEMA EN TABLA
-    pdf.add_section_title("Especificaciones del Sistema")
-    
-    # Crear tabla elegante para especificaciones CON AZUL CELESTE
-    pdf.set_fill_color(200, 230, 255)  # Azul muy claro para cabecera
-    pdf.set_font("Arial", "B", 12)
-    pdf.set_text_color(0, 0, 0)  # Texto negro para mejor contraste
-    pdf.cell(80, 10, "COMPONENTE", border=1, fill=True, align='C')
-    pdf.cell(0, 10, "ESPECIFICACIÓN", border=1, fill=True, align='C')
-    pdf.ln()
-    
-    # Datos de la tabla
-    specs_data = [
-        ("Procesador (CPU)", f"{sysinfo.get('cpu_model', 'No detectado')}"),
-        ("Núcleos", f"{sysinfo.get('cores', '?')} núcleos"),
-        ("Velocidad CPU", f"{sysinfo.get('cpu_speed_ghz', '?')} GHz"),
-        ("Memoria RAM", f"{sysinfo.get('ram_gb', '?')} GB"),
-        ("Tarjeta Gráfica (GPU)", f"{sysinfo.get('gpu_model', 'No detectado')}"),
-        ("VRAM GPU", f"{sysinfo.get('gpu_vram_gb', '0')} GB"),
-        ("Almacenamiento", f"{sysinfo.get('disk_type', 'No detectado')}"),
-    ]
-    
-    pdf.set_font("Arial", "", 10)
-    for i, (component, spec) in enumerate(specs_data):
-        # Fondo alternado para mejor lectura
-        fill_color = (245, 250, 255) if i % 2 == 0 else (255, 255, 255)  # Azul muy claro alternado
-        pdf.set_fill_color(*fill_color)
-        
-        # Componente
-        pdf.set_text_color(0, 0, 0)
-        pdf.cell(80, 10, f"   {component}", border=1, fill=True)
-        
-        # Especificación
-        pdf.cell(0, 10, spec, border=1, fill=True, align='C')
-        pdf.ln()
-    
-    # SECCIÓN: RESULTADOS DEL ANÁLISIS
-    pdf.add_section_title("Resultados del Análisis")
-    
-    # Ordenar perfiles por puntuación
-    sorted_scores = sorted(result['scores'].items(), key=lambda x: x[1], reverse=True)
-    
-    for i, (profile, score) in enumerate(sorted_scores):
-        score_percent = round(score * 100, 1)
-        rank = f"#{i+1}"
-        pdf.add_score_meter(profile, score_percent, rank)
-    
-    # SECCIÓN: TABLA DETALLADA DE PUNTUACIONES
-    pdf.add_section_title("Tabla de Puntuaciones Detalladas")
-    
-    # Cabecera de tabla CON AZUL MUY CLARO
-    pdf.set_fill_color(200, 230, 255)  # Azul muy claro
-    pdf.set_font("Arial", "B", 11)
-    pdf.set_text_color(0, 0, 0)  # Texto negro
-    pdf.cell(100, 10, "PERFIL DE USO", border=1, fill=True, align='C')
-    pdf.cell(45, 10, "PUNTUACIÓN", border=1, fill=True, align='C')
-    pdf.cell(0, 10, "CLASIFICACIÓN", border=1, fill=True, align='C')
-    pdf.ln()
-    
-    # Filas de tabla
-    pdf.set_font("Arial", "", 10)
-    for i, (profile, score) in enumerate(sorted_scores):
-        score_percent = round(score * 100, 1)
-        
-        # Fondo alternado muy suave
-        fill_color = (245, 250, 255) if i % 2 == 0 else (255, 255, 255)  # Azul muy claro alternado
-        pdf.set_fill_color(*fill_color)
-        
-        # Perfil
-        pdf.set_text_color(0, 0, 0)
-        pdf.cell(100, 10, f"   {profile}", border=1, fill=True)
-        
-        # Puntuación con color EN TONOS AZULES MUY CLAROS
-        if score_percent >= 80:
-            text_color = (0, 0, 139)  # Azul oscuro para contraste
-            classification = "Excelente"
-        elif score_percent >= 60:
-            text_color = (70, 130, 180)  # Azul acero
-            classification = "Bueno"
-        elif score_percent >= 40:
-            text_color = (100, 149, 237)  # Azul cornflower
-            classification = "Regular"
-        else:
-            text_color = (135, 206, 235)  # Azul celeste
-            classification = "Mejorable"
-        
-        pdf.set_text_color(*text_color)
-        pdf.cell(45, 10, f"{score_percent}%", border=1, fill=True, align='C')
-        pdf.set_text_color(100, 100, 100)
-        pdf.cell(0, 10, classification, border=1, fill=True, align='C')
-        pdf.ln()
-
-    # SECCIÓN: RECOMENDACIONES
-    pdf.add_section_title("Recomendaciones y Observaciones")
-    
-    # Análisis de componentes para recomendaciones
-    recommendations = []
-    
-    # Análisis de CPU
-    cpu_model = sysinfo.get('cpu_model', '').lower()
-    if any(x in cpu_model for x in ['i3', 'ryzen 3']):
-        recommendations.append("Considera actualizar a un procesador de gama media para mejor rendimiento")
-    elif any(x in cpu_model for x in ['i9', 'ryzen 9']):
-        recommendations.append("Tu procesador es excelente para cualquier tarea demandante")
-    
-    # Análisis de RAM
-    ram_gb = sysinfo.get('ram_gb', 0)
-    if ram_gb < 8:
-        recommendations.append("Se recomienda aumentar la RAM a al menos 8GB para multitarea")
-    elif ram_gb >= 32:
-        recommendations.append("Tienes suficiente RAM incluso para tareas muy demandantes")
-    
-    # Análisis de almacenamiento
-    disk_type = sysinfo.get('disk_type', '').lower()
-    if disk_type == 'hdd':
-        recommendations.append("Cambiar a SSD mejorará drásticamente los tiempos de carga")
-    elif disk_type == 'nvme':
-        recommendations.append("Tu almacenamiento NVMe es óptimo para máximo rendimiento")
-    
-    # Análisis de GPU
-    gpu_vram = sysinfo.get('gpu_vram_gb', 0)
-    if gpu_vram < 4:
-        recommendations.append("Considera una GPU con más VRAM para gaming y aplicaciones gráficas")
-    
-    # Recomendaciones generales basadas en puntuación principal
-    main_score = result['main_score']
-    if main_score >= 80:
-        recommendations.append("Tu sistema está excelentemente equilibrado para la mayoría de tareas")
-        recommendations.append("Mantén los controladores actualizados para mantener el rendimiento")
-    elif main_score >= 60:
-        recommendations.append("Tu sistema tiene un buen equilibrio para uso general")
-        recommendations.append("Considera optimizaciones de software para mejorar aún más")
-    else:
-        recommendations.append("Se recomiendan mejoras de hardware para un rendimiento óptimo")
-        recommendations.append("Prioriza actualizar los componentes con menor puntuación")
-    
-    # Añadir recomendaciones generales
-    recommendations.append("Realiza mantenimiento regular del sistema")
-    recommendations.append("Mantén el sistema operativo actualizado")
-    
-    # Escribir recomendaciones
-    pdf.set_font("Arial", "", 10)
-    pdf.set_text_color(80, 80, 80)
-    
-    for i, rec in enumerate(recommendations):
-        pdf.cell(10, 8, f"{i+1}.", border=0)
-        pdf.multi_cell(0, 8, f" {rec}")
-        pdf.ln(2)
-
-    # Guardar PDF CON NUEVO NOMBRE
-    pdf_filename = f"analisis_{analysis_id:04d}.pdf"  # Ej: analisis_0001.pdf, analisis_0002.pdf
-    pdf.output(pdf_filename)
-
-    print(f"✅ PDF elegante generado: {pdf_filename}")
-    return pdf_filename
-
 # -------------------------
 #   FUNCIONES AUXILIARES DASHBOARD
 # -------------------------
@@ -458,19 +139,177 @@ def get_score_color(score):
     else:
         return "#e53e3e"  # Rojo
 
+def render_analysis_card(analysis):
+    """Tarjeta HTML de un análisis en el dashboard (también la envían los eventos en vivo)"""
+    # Los modelos y el disco llegan tal cual del cliente o del inventario importado
+    cpu_model = html.escape(analysis.cpu_model or "No especificado")
+    gpu_model = html.escape(analysis.gpu_model or "No especificado")
+    disk_type = html.escape(str(analysis.disk_type or ""))
+    return f"""
+                <div class="analysis-card" id="analysis-{analysis.analysis_id}">
+                    <div class="analysis-header">
+                        <div class="analysis-id">
+                            <i class="fas fa-desktop"></i> Análisis #{analysis.analysis_id}
+                        </div>
+                        <div class="analysis-score {get_score_class(analysis.main_score)}">
+                            {analysis.main_score}%
+                        </div>
+                    </div>
+                    
+                    <div class="hardware-grid">
+                        <div class="hardware-item">
+                            <div class="hardware-label">Procesador</div>
+                            <div class="hardware-value">{cpu_model}</div>
+                        </div>
+                        <div class="hardware-item">
+                            <div class="hardware-label">Núcleos</div>
+                            <div class="hardware-value">{analysis.cores}</div>
+                        </div>
+                        <div class="hardware-item">
+                            <div class="hardware-label">Memoria RAM</div>
+                            <div class="hardware-value">{analysis.ram_gb} GB</div>
+                        </div>
+                        <div class="hardware-item">
+                            <div class="hardware-label">Tarjeta Gráfica</div>
+                            <div class="hardware-value">{gpu_model}</div>
+                        </div>
+                        <div class="hardware-item">
+                            <div class="hardware-label">VRAM</div>
+                            <div class="hardware-value">{analysis.gpu_vram_gb} GB</div>
+                        </div>
+                        <div class="hardware-item">
+                            <div class="hardware-label">Almacenamiento</div>
+                            <div class="hardware-value">{disk_type}</div>
+                        </div>
+                    </div>
+                    
+                    <div class="profile-badge">
+                        <i class="fas fa-bullseye"></i> Perfil Recomendado: {html.escape(str(analysis.main_profile))}
+                    </div>
+                    
+                    <div class="analysis-links">
+                        {"<a href='"+html.escape(analysis.pdf_url)+"' class='analysis-link' target='_blank'><i class='fas fa-file-pdf'></i> Ver Informe PDF</a>" if analysis.pdf_url else ""}
+                        {"<a href='"+html.escape(analysis.json_url)+"' class='analysis-link json' target='_blank'><i class='fas fa-code'></i> Ver Datos JSON</a>" if analysis.json_url else ""}
+                    </div>
+                    
+                    <div class="analysis-meta">
+                        <i class="fas fa-clock"></i> Generado el {analysis.created_at.strftime("%d/%m/%Y a las %H:%M") if analysis.created_at else "Fecha no disponible"}
+                    </div>
+                </div>
+                """
+
+def row_to_info(row):
+    """Reconstruye el dict de SysInfo a partir de una fila, ignorando columnas nulas"""
+    fields = ("cpu_model", "cpu_speed_ghz", "cores", "ram_gb", "disk_type", "gpu_model", "gpu_vram_gb")
+    return {f: getattr(row, f) for f in fields if getattr(row, f, None) is not None}
+
+def analysis_to_dict(analysis):
+    """Serializa un SystemAnalysis para las respuestas JSON"""
+    return {
+        "analysis_id": analysis.analysis_id,
+        "cpu_model": analysis.cpu_model,
+        "cpu_speed_ghz": analysis.cpu_speed_ghz,
+        "cores": analysis.cores,
+        "ram_gb": analysis.ram_gb,
+        "disk_type": analysis.disk_type,
+        "gpu_model": analysis.gpu_model,
+        "gpu_vram_gb": analysis.gpu_vram_gb,
+        "cpu_model_id": analysis.cpu_model_id,
+        "gpu_model_id": analysis.gpu_model_id,
+        "main_profile": analysis.main_profile,
+        "main_score": analysis.main_score,
+        "scoring_version": analysis.scoring_version,
+        "pdf_url": analysis.pdf_url,
+        "json_url": analysis.json_url,
+        "created_at": analysis.created_at.isoformat() if analysis.created_at else None
+    }
+
+def find_analysis(db, analysis_id: int):
+    """
+    Análisis por id; si la sesión es de la réplica y aún no lo tiene, se busca en la primaria.
+    Los meses archivados (archive.py) se leen de su Parquet como objetos no persistentes.
+    """
+    analysis = db.query(SystemAnalysis).filter(SystemAnalysis.analysis_id == analysis_id).first()
+    if analysis is None and read_router.on_replica(db):
+        primary = SessionLocal()
+        try:
+            analysis = primary.query(SystemAnalysis).filter(SystemAnalysis.analysis_id == analysis_id).first()
+            if analysis is not None:
+                primary.expunge(analysis)
+        finally:
+            primary.close()
+    if analysis is None:
+        analysis = analysis_archive.find(db, analysis_id)
+    return analysis
+
+# Listados, búsqueda y estadísticas por hardware recorren solo la tabla
+LIVE_SCOPE_NOTE = ("Solo análisis sin archivar: los meses archivados se consultan por id, en /api/stats, "
+                   "/api/stats/hardware, /api/analyses/search o en /api/analytics")
+
+def live_scope(db):
+    """Campos que avisan de que la respuesta no incluye los meses archivados"""
+    return {"scope": "live", "archived_analyses": analysis_archive.totals(db)[0], "note": LIVE_SCOPE_NOTE}
+
 # -------------------------
 #   API ENDPOINTS
 # -------------------------
-@app.on_event("startup")
-async def startup_event():
-    if access_token:
-        create_dropbox_folder_structure(access_token)
-        print("✅ Dropbox configurado")
-    
+def prepare_database():
+    """
+    Esquema, índice de búsqueda y migraciones de datos. Con server.py lo ejecuta una sola vez
+    el proceso maestro antes del fork, para que los workers no lo repitan a la vez.
+    """
+    global database_prepared
     # Crear tablas si no existen
     create_tables()
+    create_search_index()
+    # Particiones mensuales por adelantado (solo si system_analyses está particionada)
+    ensure_partitions()
     print("✅ Base de datos configurada")
 
+    db = SessionLocal()
+    try:
+        # Asignar modelo canónico de CPU/GPU a las filas anteriores al catálogo
+        backfilled = hardware_catalog.backfill(db)
+        if backfilled:
+            print(f"✅ Catálogo de hardware: {backfilled} filas normalizadas")
+
+        # Rellenar la tabla de agregados si se acaba de crear sobre una BD con datos
+        if not db.query(AnalysisRollup.id).first() and db.query(SystemAnalysis.id).first():
+            print(f"✅ Agregados temporales reconstruidos: {rebuild_rollups(db)} buckets")
+    finally:
+        db.close()
+    database_prepared = True
+
+@app.on_event("startup")
+async def startup_event():
+    # La preparación remota del almacenamiento sigue en segundo plano con la API ya sirviendo
+    artifact_storage.setup_in_background()
+
+    if not database_prepared:
+        prepare_database()
+
+    # Índices en memoria: cada worker carga los suyos en segundo plano y los mantiene al día
+    # con los cambios de todos los workers e instancias
+    index_sync.start()
+
+    # Workers que entregan los informes pendientes (incluidos los que dejó una caída anterior)
+    if artifact_storage.available:
+        report_outbox.start()
+
+    # Refresco incremental de la instantánea columnar para /api/analytics
+    analytics_snapshot.start()
+
+    # Difusión de los cambios a los dashboards abiertos en este worker
+    dashboard_broadcast.start(render=render_analysis_card)
+
+@app.on_event("shutdown")
+def shutdown_event():
+    report_outbox.stop()
+    index_sync.stop()
+    analytics_snapshot.stop()
+    dashboard_broadcast.stop()
+    report_renderer.shutdown()
+
 @app.get("/", response_class=HTMLResponse)
 def read_root():
     """Página de inicio elegante con el mismo estilo del dashboard"""
@@ -1001,6 +840,22 @@ def read_root():
                             Estadísticas globales en formato JSON: total de análisis, puntuación promedio y distribución.
                         </p>
                     </div>
+
+                    <div class="endpoint-card">
+                        <span class="endpoint-method get">GET</span>
+                        <div class="endpoint-path">/api/stats/timeseries?granularity=</div>
+                        <p class="endpoint-description">
+                            Evolución agregada por hora, día o mes: número de análisis, puntuación media/mín/máx y perfiles.
+                        </p>
+                    </div>
+
+                    <div class="endpoint-card">
+                        <span class="endpoint-method get">GET</span>
+                        <div class="endpoint-path">/api/scoring</div>
+                        <p class="endpoint-description">
+                            Perfiles, pesos y versión del modelo de puntuación vigente (scoring_profiles.json, recarga en caliente).
+                        </p>
+                    </div>
                     
                     <div class="endpoint-card">
                         <span class="endpoint-method get">GET</span>
@@ -1009,7 +864,63 @@ def read_root():
                             Todos los análisis en formato JSON para integración con otras aplicaciones.
                         </p>
                     </div>
-                    
+
+                    <div class="endpoint-card">
+                        <span class="endpoint-method get">GET</span>
+                        <div class="endpoint-path">/api/analytics?group_by=&amp;metrics=</div>
+                        <p class="endpoint-description">
+                            Agregados ad hoc (ej. RAM media por perfil y mes, % de NVMe por gama de GPU) sobre una instantánea columnar.
+                        </p>
+                    </div>
+
+                    <div class="endpoint-card">
+                        <span class="endpoint-method post">POST</span>
+                        <div class="endpoint-path">/api/imports</div>
+                        <p class="endpoint-description">
+                            Importación masiva de inventarios CSV/XLSX con mapeo de columnas; progreso en NDJSON.
+                        </p>
+                    </div>
+
+                    <div class="endpoint-card">
+                        <span class="endpoint-method get">GET</span>
+                        <div class="endpoint-path">/api/dashboard/events</div>
+                        <p class="endpoint-description">
+                            Server-Sent Events con los cambios en vivo del dashboard (análisis nuevos o borrados, KPIs y línea temporal).
+                        </p>
+                    </div>
+
+                    <div class="endpoint-card">
+                        <span class="endpoint-method get">GET</span>
+                        <div class="endpoint-path">/api/analyses/search?q=</div>
+                        <p class="endpoint-description">
+                            Búsqueda indexada por modelo de CPU o GPU (ej. "Ryzen 7", "RTX 30xx") con ranking y paginación.
+                        </p>
+                    </div>
+
+                    <div class="endpoint-card">
+                        <span class="endpoint-method get">GET</span>
+                        <div class="endpoint-path">/api/analyses/&#123;id&#125;/similar?k=</div>
+                        <p class="endpoint-description">
+                            Las k máquinas analizadas más parecidas en CPU, RAM, GPU y almacenamiento.
+                        </p>
+                    </div>
+
+                    <div class="endpoint-card">
+                        <span class="endpoint-method get">GET</span>
+                        <div class="endpoint-path">/api/analyses/&#123;id&#125;/percentile</div>
+                        <p class="endpoint-description">
+                            Qué porcentaje de análisis supera este equipo, en global y dentro de su perfil.
+                        </p>
+                    </div>
+
+                    <div class="endpoint-card">
+                        <span class="endpoint-method get">GET</span>
+                        <div class="endpoint-path">/api/analyses/&#123;id&#125;/report.pdf</div>
+                        <p class="endpoint-description">
+                            Informe PDF del análisis, generado bajo demanda y servido desde caché.
+                        </p>
+                    </div>
+
                     <div class="endpoint-card">
                         <span class="endpoint-method delete">DELETE</span>
                         <div class="endpoint-path">/api/analyses/&#123;id&#125;</div>
@@ -1088,87 +999,97 @@ def read_root():
     return HTMLResponse(content=html_content)
 
 @app.post("/api/analyze")
-def analyze(sysinfo: SysInfo, db: Session = Depends(get_db)):
+def analyze(sysinfo: SysInfo, response: Response, db: Session = Depends(get_db),
+            idempotency_key: Optional[str] = Header(None)):
     info = sysinfo.dict()
-    result = score_system(info)
+    if not idempotency_key:
+        content = create_analysis(info, db)
+    else:
+        # Los reintentos del cliente con la misma clave devuelven la respuesta original
+        try:
+            content, replayed = idempotent_requests.run(idempotency_key, info, lambda: create_analysis(info, db))
+        except IdempotencyConflict as e:
+            return JSONResponse(status_code=e.status_code, content={"status": "error", "message": str(e)})
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
 
-    # DEBUG: Ver qué hay en la base de datos
-    print("🔍 === DEBUG INICIO ===")
-    all_analyses = db.query(SystemAnalysis).all()
-    print(f"🔍 ANALISIS EN BD: {len(all_analyses)} registros")
-    for analysis in all_analyses:
-        print(f"   - ID: {analysis.analysis_id}, CPU: {analysis.cpu_model}, Score: {analysis.main_score}%")
-
-    # OBTENER EL PRÓXIMO ID
-    analysis_id = get_next_analysis_id(db)
-    print(f"📊 NUEVO ID CALCULADO: {analysis_id}")
-    print("🔍 === DEBUG FIN ===")
-    
-    # Crear PDF ELEGANTE con el ID
-    pdf_filename = create_pdf_report(info, result, analysis_id)
-
-    # Guardar JSON
-    json_filename = f"analisis_{analysis_id:04d}.json"  # Mismo nombre base
-    with open(json_filename, "w", encoding="utf-8") as f:
-        json.dump({
-            "sysinfo": info,
-            "result": result,
-            "analysis_id": analysis_id,
-            "timestamp": datetime.datetime.now(timezone(timedelta(hours=1))).isoformat(),
-            "version": "2.0.0"
-        }, f, indent=2, ensure_ascii=False)
+    # Las siguientes lecturas del cliente ven su análisis aunque la réplica vaya por detrás
+    read_router.mark_write(response)
+    return content
 
-    pdf_url = None
-    json_url = None
+def create_analysis(info: dict, db: Session):
+    result = score_system(info)
 
-    if access_token and access_token != "tu_token_de_dropbox_aqui":
-        try:
-            pdf_dropbox_path = f"/AnalizaPC-Reports/{pdf_filename}"
-            pdf_url, pdf_error = upload_to_dropbox(access_token, pdf_filename, pdf_dropbox_path)
+    if not (REPORT_MODE == "lazy" or artifact_storage.available):
+        print("⚠️ Token Dropbox no configurado")
+    cpu_model_id = hardware_catalog.model_id("cpu", info.get('cpu_model', ''))
+    gpu_model_id = hardware_catalog.model_id("gpu", info.get('gpu_model', ''))
 
-            json_dropbox_path = f"/AnalizaPC-Reports/{json_filename}"
-            json_url, json_error = upload_to_dropbox(access_token, json_filename, json_dropbox_path)
+    for attempt in range(ANALYSIS_ID_ATTEMPTS):
+        with analysis_id_lock:
+            # OBTENER EL PRÓXIMO ID
+            analysis_id = get_next_analysis_id(db)
 
-            if pdf_error:
-                print(f"❌ Error subiendo PDF: {pdf_error}")
-            if json_error:
-                print(f"❌ Error subiendo JSON: {json_error}")
-            else:
-                print(f"✅ Archivos subidos a Dropbox")
-        except Exception as e:
-            print(f"❌ Error en subida a Dropbox: {e}")
+            pdf_url = None
+            json_url = None
+            outbox_entry = None
 
-    else:
-        print("⚠️ Token Dropbox no configurado")
+            if REPORT_MODE == "lazy" or artifact_storage.available:
+                # Mientras no haya enlaces definitivos, el PDF se genera la primera vez que alguien lo abre
+                pdf_url = f"/api/analyses/{analysis_id}/report.pdf"
 
-    # GUARDAR EN BASE DE DATOS
-    db_analysis = SystemAnalysis(
-        analysis_id=analysis_id,
-        cpu_model=info.get('cpu_model', ''),
-        cpu_speed_ghz=info.get('cpu_speed_ghz', 0),
-        cores=info.get('cores', 0),
-        ram_gb=info.get('ram_gb', 0),
-        disk_type=info.get('disk_type', ''),
-        gpu_model=info.get('gpu_model', ''),
-        gpu_vram_gb=info.get('gpu_vram_gb', 0),
-        main_profile=result['main_profile'],
-        main_score=result['main_score'],
-        pdf_url=pdf_url,
-        json_url=json_url
-    )
-    
-    db.add(db_analysis)
-    db.commit()
+            # GUARDAR EN BASE DE DATOS
+            db_analysis = SystemAnalysis(
+                analysis_id=analysis_id,
+                cpu_model=info.get('cpu_model', ''),
+                cpu_speed_ghz=info.get('cpu_speed_ghz', 0),
+                cores=info.get('cores', 0),
+                ram_gb=info.get('ram_gb', 0),
+                disk_type=info.get('disk_type', ''),
+                gpu_model=info.get('gpu_model', ''),
+                gpu_vram_gb=info.get('gpu_vram_gb', 0),
+                cpu_model_id=cpu_model_id,
+                gpu_model_id=gpu_model_id,
+                main_profile=result['main_profile'],
+                main_score=result['main_score'],
+                scoring_version=result['scoring_version'],
+                pdf_url=pdf_url,
+                json_url=json_url
+            )
+
+            db.add(db_analysis)
+            if REPORT_MODE != "lazy" and artifact_storage.available:
+                # Misma transacción que el análisis: si se confirma uno, se confirma el otro
+                outbox_entry = enqueue_report(db, analysis_id, info, result, claimed=REPORT_MODE == "eager")
+            try:
+                db.flush()
+                record_analysis(db, db_analysis)
+                publish_dashboard_event(db, "analysis_created", db_analysis)
+                db.commit()
+                break
+            except IntegrityError:
+                db.rollback()
+                if attempt == ANALYSIS_ID_ATTEMPTS - 1:
+                    raise
+        # Otro proceso se quedó con el mismo ID: recalcularlo tras una espera aleatoria
+        time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
     db.refresh(db_analysis)
+    dashboard_broadcast.notify()
 
     print(f"💾 Análisis guardado en BD con ID: {analysis_id}")
 
-    # Limpiar archivos locales
-    try:
-        os.remove(pdf_filename)
-        os.remove(json_filename)
-    except:
-        pass
+    if outbox_entry is not None:
+        if REPORT_MODE == "eager":
+            # Entrega en línea; si falla, la entrada queda en el outbox y la reintentan los workers
+            delivered = report_outbox.process(db, outbox_entry.id)
+            if delivered:
+                pdf_url, json_url = delivered
+        else:
+            report_outbox.notify()
+
+    index_sync.added(analysis_id, info, result['main_profile'], result['main_score'])
+    # Mientras el worker carga sus índices no hay distribución con la que comparar
+    percentile = score_percentiles.percentiles(result['main_profile'], result['main_score']) if index_sync.ready else None
 
     return {
         "status": "success",
@@ -1176,6 +1097,8 @@ def analyze(sysinfo: SysInfo, db: Session = Depends(get_db)):
         "pdf_url": pdf_url,
         "json_url": json_url,
         "result": result,
+        "percentile": percentile,
+        "recommendations": recommend(info, result['main_score']),
         "message": "Análisis completado correctamente",
         "version": "2.0.0"
     }
@@ -1183,32 +1106,20 @@ def analyze(sysinfo: SysInfo, db: Session = Depends(get_db)):
 # ==================== DASHBOARD EMPRESARIAL ELEGANTE ====================
 
 @app.get("/dashboard", response_class=HTMLResponse)
-def get_dashboard(db: Session = Depends(get_db)):
+def get_dashboard(db: Session = Depends(get_read_db)):
     """Dashboard empresarial elegante con la misma paleta de colores de los PDFs"""
     
-    # Obtener datos para el dashboard
-    analyses = db.query(SystemAnalysis).order_by(SystemAnalysis.analysis_id.desc()).all()
-    total_analyses = len(analyses)
+    # Lo posterior a este evento llega por /api/dashboard/events; se lee antes que los datos
+    # para que un análisis confirmado entre medias llegue repetido en vez de perderse
+    last_event_id = latest_event_id(db)
     
-    # Calcular estadísticas
-    avg_score = db.query(func.avg(SystemAnalysis.main_score)).scalar() or 0
-    best_analysis = db.query(SystemAnalysis).order_by(SystemAnalysis.main_score.desc()).first()
-    latest_analysis = db.query(SystemAnalysis).order_by(SystemAnalysis.created_at.desc()).first()
+    # Obtener datos para el dashboard: solo las tarjetas más recientes, los totales salen de los KPIs
+    analyses = db.query(SystemAnalysis).order_by(SystemAnalysis.analysis_id.desc()).limit(DASHBOARD_CARDS).all()
     
-    # Distribución por perfiles
-    profiles = db.query(SystemAnalysis.main_profile).all()
-    profile_counts = {}
-    for profile in profiles:
-        profile_name = profile[0]
-        profile_counts[profile_name] = profile_counts.get(profile_name, 0) + 1
-    
-    # Distribución por rangos de puntuación
-    score_ranges = {
-        "Excelente (80-100%)": db.query(SystemAnalysis).filter(SystemAnalysis.main_score >= 80).count(),
-        "Bueno (60-79%)": db.query(SystemAnalysis).filter(SystemAnalysis.main_score >= 60, SystemAnalysis.main_score < 80).count(),
-        "Regular (40-59%)": db.query(SystemAnalysis).filter(SystemAnalysis.main_score >= 40, SystemAnalysis.main_score < 60).count(),
-        "Mejorable (0-39%)": db.query(SystemAnalysis).filter(SystemAnalysis.main_score < 40).count()
-    }
+    # KPIs y repartos (la misma consulta que usan las actualizaciones en vivo)
+    kpis = dashboard_kpis(db)
+    profile_counts = kpis["profiles"]
+    score_ranges = kpis["score_ranges"]
     
     # Datos para gráficos
     profile_chart_data = []
@@ -1220,16 +1131,11 @@ def get_dashboard(db: Session = Depends(get_db)):
     for i, (range_name, count) in enumerate(score_ranges.items()):
         score_chart_data.append(f"{{label: '{range_name}', data: {count}, color: '{score_colors[i]}'}}")
     
-    # Evolución temporal (últimos 10 análisis)
-    recent_analyses = analyses[:10][::-1]  # Últimos 10, ordenados por fecha
-    timeline_labels = []
-    timeline_scores = []
-    timeline_colors = []
-    
-    for analysis in recent_analyses:
-        timeline_labels.append(f"#{analysis.analysis_id}")
-        timeline_scores.append(analysis.main_score)
-        timeline_colors.append(get_score_color(analysis.main_score))
+    # Evolución temporal (media diaria de los últimos 90 días, desde los rollups)
+    timeline = get_timeseries(db, "day", 90)
+    timeline_labels = [point["bucket_start"][:10] for point in timeline]
+    timeline_scores = [point["avg_score"] for point in timeline]
+    timeline_colors = [get_score_color(point["avg_score"]) for point in timeline]
 
     # Obtener hora actual corregida para el footer del dashboard
     current_time = datetime.datetime.now(timezone(timedelta(hours=1))).strftime("%d/%m/%Y %H:%M")
@@ -1433,7 +1339,16 @@ def get_dashboard(db: Session = Depends(get_db)):
                 margin-bottom: 25px;
                 text-align: center;
             }}
-            
+
+            .timeline-select {{
+                margin-left: 10px;
+                padding: 4px 8px;
+                border: 1px solid var(--borde-claro);
+                border-radius: 8px;
+                color: var(--azul-oscuro);
+                font-size: 0.7em;
+            }}
+
             .chart-wrapper {{
                 position: relative;
                 height: 320px;
@@ -1592,6 +1507,17 @@ def get_dashboard(db: Session = Depends(get_db)):
                 padding-top: 15px;
             }}
             
+            .analyses-more {{
+                text-align: center;
+                margin-top: 20px;
+                color: var(--texto-medio);
+            }}
+            
+            .analyses-more a {{
+                color: var(--azul-oscuro);
+                font-weight: 600;
+            }}
+            
             /* NO DATA STATE */
             .no-data {{
                 text-align: center;
@@ -1692,7 +1618,7 @@ def get_dashboard(db: Session = Depends(get_db)):
                     <div class="stat-icon">
                         <i class="fas fa-chart-bar"></i>
                     </div>
-                    <div class="stat-number">{total_analyses}</div>
+                    <div class="stat-number" id="kpiTotal">{kpis["total_analyses"]}</div>
                     <div class="stat-label">Total de Análisis</div>
                 </div>
                 
@@ -1700,7 +1626,7 @@ def get_dashboard(db: Session = Depends(get_db)):
                     <div class="stat-icon">
                         <i class="fas fa-percentage"></i>
                     </div>
-                    <div class="stat-number">{round(avg_score, 1)}%</div>
+                    <div class="stat-number" id="kpiAverage">{kpis["average_score"]}%</div>
                     <div class="stat-label">Puntuación Promedia</div>
                 </div>
                 
@@ -1708,7 +1634,7 @@ def get_dashboard(db: Session = Depends(get_db)):
                     <div class="stat-icon">
                         <i class="fas fa-layer-group"></i>
                     </div>
-                    <div class="stat-number">{len(profile_counts)}</div>
+                    <div class="stat-number" id="kpiProfiles">{len(profile_counts)}</div>
                     <div class="stat-label">Perfiles Diferentes</div>
                 </div>
                 
@@ -1716,7 +1642,7 @@ def get_dashboard(db: Session = Depends(get_db)):
                     <div class="stat-icon">
                         <i class="fas fa-trophy"></i>
                     </div>
-                    <div class="stat-number">{best_analysis.main_score if best_analysis else 0}%</div>
+                    <div class="stat-number" id="kpiBest">{kpis["best_score"]}%</div>
                     <div class="stat-label">Mejor Puntuación</div>
                 </div>
             </div>
@@ -1745,7 +1671,12 @@ def get_dashboard(db: Session = Depends(get_db)):
                     
                     <div class="chart-container">
                         <div class="chart-title">
-                            <i class="fas fa-chart-line"></i> Evolución Reciente
+                            <i class="fas fa-chart-line"></i> Evolución Temporal
+                            <select id="timelineGranularity" class="timeline-select">
+                                <option value="hour">Por hora</option>
+                                <option value="day" selected>Por día</option>
+                                <option value="month">Por mes</option>
+                            </select>
                         </div>
                         <div class="chart-wrapper">
                             <canvas id="timelineChart"></canvas>
@@ -1755,67 +1686,19 @@ def get_dashboard(db: Session = Depends(get_db)):
             </section>
             
             <!-- SECCIÓN DE ANÁLISIS DETALLADOS -->
-            <section class="analyses-section">
+            <section class="analyses-section" id="analysesSection">
                 <h2 class="section-title">Análisis Detallados del Sistema</h2>
                 
-                {"".join([f"""
-                <div class="analysis-card">
-                    <div class="analysis-header">
-                        <div class="analysis-id">
-                            <i class="fas fa-desktop"></i> Análisis #{analysis.analysis_id}
-                        </div>
-                        <div class="analysis-score {get_score_class(analysis.main_score)}">
-                            {analysis.main_score}%
-                        </div>
-                    </div>
-                    
-                    <div class="hardware-grid">
-                        <div class="hardware-item">
-                            <div class="hardware-label">Procesador</div>
-                            <div class="hardware-value">{analysis.cpu_model or "No especificado"}</div>
-                        </div>
-                        <div class="hardware-item">
-                            <div class="hardware-label">Núcleos</div>
-                            <div class="hardware-value">{analysis.cores}</div>
-                        </div>
-                        <div class="hardware-item">
-                            <div class="hardware-label">Memoria RAM</div>
-                            <div class="hardware-value">{analysis.ram_gb} GB</div>
-                        </div>
-                        <div class="hardware-item">
-                            <div class="hardware-label">Tarjeta Gráfica</div>
-                            <div class="hardware-value">{analysis.gpu_model or "No especificado"}</div>
-                        </div>
-                        <div class="hardware-item">
-                            <div class="hardware-label">VRAM</div>
-                            <div class="hardware-value">{analysis.gpu_vram_gb} GB</div>
-                        </div>
-                        <div class="hardware-item">
-                            <div class="hardware-label">Almacenamiento</div>
-                            <div class="hardware-value">{analysis.disk_type}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="profile-badge">
-                        <i class="fas fa-bullseye"></i> Perfil Recomendado: {analysis.main_profile}
-                    </div>
-                    
-                    <div class="analysis-links">
-                        {"<a href='"+analysis.pdf_url+"' class='analysis-link' target='_blank'><i class='fas fa-file-pdf'></i> Ver Informe PDF</a>" if analysis.pdf_url else ""}
-                        {"<a href='"+analysis.json_url+"' class='analysis-link json' target='_blank'><i class='fas fa-code'></i> Ver Datos JSON</a>" if analysis.json_url else ""}
-                    </div>
-                    
-                    <div class="analysis-meta">
-                        <i class="fas fa-clock"></i> Generado el {analysis.created_at.strftime("%d/%m/%Y a las %H:%M") if analysis.created_at else "Fecha no disponible"}
-                    </div>
-                </div>
-                """ for analysis in analyses]) if analyses else '''
+                {"".join(render_analysis_card(analysis) for analysis in analyses) if analyses else '''
                 <div class="no-data">
                     <i class="fas fa-inbox"></i>
                     <h3>No hay análisis disponibles</h3>
                     <p>Realiza el primer análisis para ver los datos en este dashboard</p>
                 </div>
                 '''}
+                <div class="analyses-more" id="analysesMore"{"" if kpis["total_analyses"] > len(analyses) else " hidden"}>
+                    Últimos {DASHBOARD_CARDS} análisis · <a href="/api/analyses" target="_blank">Ver todos</a>
+                </div>
             </section>
             
             <!-- FOOTER Y ENLACES -->
@@ -1846,7 +1729,7 @@ def get_dashboard(db: Session = Depends(get_db)):
             }};
             
             // Gráfico de distribución por perfiles
-            new Chart(document.getElementById('profileChart'), {{
+            const profileChart = new Chart(document.getElementById('profileChart'), {{
                 type: 'doughnut',
                 data: {{
                     labels: profileData.map(p => p.label),
@@ -1888,7 +1771,7 @@ def get_dashboard(db: Session = Depends(get_db)):
             }});
             
             // Gráfico de rangos de puntuación
-            new Chart(document.getElementById('scoreChart'), {{
+            const scoreChart = new Chart(document.getElementById('scoreChart'), {{
                 type: 'bar',
                 data: {{
                     labels: scoreData.map(s => s.label),
@@ -1939,12 +1822,12 @@ def get_dashboard(db: Session = Depends(get_db)):
             }});
             
             // Gráfico de evolución temporal
-            new Chart(document.getElementById('timelineChart'), {{
+            const timelineChart = new Chart(document.getElementById('timelineChart'), {{
                 type: 'line',
                 data: {{
                     labels: timelineData.labels,
                     datasets: [{{
-                        label: 'Puntuación del Sistema',
+                        label: 'Puntuación Media',
                         data: timelineData.scores,
                         borderColor: '#00008b',
                         backgroundColor: 'rgba(0, 0, 139, 0.1)',
@@ -2001,20 +1884,154 @@ def get_dashboard(db: Session = Depends(get_db)):
                 }}
             }});
             
-            // Auto-refresh cada 60 segundos
-            setTimeout(() => {{
-                window.location.reload();
-            }}, 60000);
+            // Cambiar la granularidad de la línea temporal sin recargar la página
+            const scoreColor = score => score >= 80 ? '#38a169' : score >= 60 ? '#3182ce' : score >= 40 ? '#d69e2e' : '#e53e3e';
+            const timelineLimits = {{hour: 48, day: 90, month: 24}};
+            const timelineLabel = (granularity, start) => start.slice(0, granularity === 'hour' ? 16 : granularity === 'day' ? 10 : 7).replace('T', ' ');
+            let timelineGranularity = 'day';
+
+            async function loadTimeline(granularity) {{
+                const response = await fetch(`/api/stats/timeseries?granularity=${{granularity}}&limit=${{timelineLimits[granularity]}}`);
+                const data = await response.json();
+                if (data.status !== 'success') return;
+
+                timelineGranularity = granularity;
+                timelineChart.data.labels = data.series.map(point => timelineLabel(granularity, point.bucket_start));
+                timelineChart.data.datasets[0].data = data.series.map(point => point.avg_score);
+                timelineChart.data.datasets[0].pointBackgroundColor = data.series.map(point => scoreColor(point.avg_score));
+                timelineChart.update();
+            }}
+            document.getElementById('timelineGranularity').addEventListener('change', event => loadTimeline(event.target.value));
             
             // Efectos de hover mejorados
-            document.querySelectorAll('.analysis-card').forEach(card => {{
+            function addCardEffects(card) {{
                 card.addEventListener('mouseenter', function() {{
                     this.style.transform = 'translateX(12px)';
                 }});
                 card.addEventListener('mouseleave', function() {{
                     this.style.transform = 'translateX(0)';
                 }});
-            }});
+            }}
+            document.querySelectorAll('.analysis-card').forEach(addCardEffects);
+            
+            // Actualizaciones en vivo: el servidor difunde un delta por lote de cambios
+            // (tarjetas nuevas o borradas, KPIs y buckets de la línea temporal) y se aplica sin recargar
+            const profileColors = Object.fromEntries(profileData.map(p => [p.label, p.color]));
+            const extraColors = ['#4682b4', '#87ceeb', '#00008b', '#805ad5', '#dd6b20', '#319795'];
+            const analysesSection = document.getElementById('analysesSection');
+            let timelineReload = null;
+
+            function applyChange(change) {{
+                const existing = document.getElementById(`analysis-${{change.analysis_id}}`);
+                if (change.type === 'analysis_deleted') {{
+                    if (existing) existing.remove();
+                }} else if (change.type === 'analysis_created' && change.html) {{
+                    const template = document.createElement('template');
+                    template.innerHTML = change.html.trim();
+                    const card = template.content.firstElementChild;
+                    if (existing) {{
+                        existing.replaceWith(card);
+                    }} else {{
+                        analysesSection.querySelector('.section-title').after(card);
+                    }}
+                    addCardEffects(card);
+                    const empty = analysesSection.querySelector('.no-data');
+                    if (empty) empty.remove();
+                    // Solo las {DASHBOARD_CARDS} más recientes; el resto sigue en /api/analyses
+                    const cards = analysesSection.querySelectorAll('.analysis-card');
+                    for (let i = {DASHBOARD_CARDS}; i < cards.length; i++) cards[i].remove();
+                    if (cards.length > {DASHBOARD_CARDS}) document.getElementById('analysesMore').hidden = false;
+                }}
+            }}
+
+            function applyKpis(kpis) {{
+                document.getElementById('kpiTotal').textContent = kpis.total_analyses;
+                document.getElementById('kpiAverage').textContent = `${{kpis.average_score}}%`;
+                document.getElementById('kpiProfiles').textContent = Object.keys(kpis.profiles).length;
+                document.getElementById('kpiBest').textContent = `${{kpis.best_score}}%`;
+
+                const labels = Object.keys(kpis.profiles);
+                labels.filter(label => !profileColors[label]).forEach(label => {{
+                    profileColors[label] = extraColors[Object.keys(profileColors).length % extraColors.length];
+                }});
+                profileChart.data.labels = labels;
+                profileChart.data.datasets[0].data = labels.map(label => kpis.profiles[label]);
+                profileChart.data.datasets[0].backgroundColor = labels.map(label => profileColors[label]);
+                profileChart.update();
+
+                scoreChart.data.datasets[0].data = scoreChart.data.labels.map(label => kpis.score_ranges[label] || 0);
+                scoreChart.update();
+            }}
+
+            function applyBuckets(points) {{
+                const labels = timelineChart.data.labels;
+                const dataset = timelineChart.data.datasets[0];
+                const limit = timelineLimits[timelineGranularity];
+                points.forEach(point => {{
+                    const label = timelineLabel(timelineGranularity, point.bucket_start);
+                    const index = labels.indexOf(label);
+                    if (index >= 0 && point.count === 0) {{
+                        labels.splice(index, 1);
+                        dataset.data.splice(index, 1);
+                        dataset.pointBackgroundColor.splice(index, 1);
+                    }} else if (index >= 0) {{
+                        dataset.data[index] = point.avg_score;
+                        dataset.pointBackgroundColor[index] = scoreColor(point.avg_score);
+                    }} else if (point.count > 0) {{
+                        // Bucket nuevo en su posición; si es más antiguo que toda una serie completa, fuera de la ventana
+                        let at = labels.findIndex(existing => existing > label);
+                        if (at < 0) at = labels.length;
+                        if (at === 0 && labels.length >= limit) return;
+                        labels.splice(at, 0, label);
+                        dataset.data.splice(at, 0, point.avg_score);
+                        dataset.pointBackgroundColor.splice(at, 0, scoreColor(point.avg_score));
+                        if (labels.length > limit) {{
+                            labels.shift();
+                            dataset.data.shift();
+                            dataset.pointBackgroundColor.shift();
+                        }}
+                    }}
+                }});
+                timelineChart.update();
+            }}
+
+            if (window.EventSource) {{
+                // Al reconectar, el navegador envía Last-Event-ID y el servidor reenvía lo perdido
+                const liveEvents = new EventSource('/api/dashboard/events?after={last_event_id}');
+                liveEvents.addEventListener('delta', event => {{
+                    const delta = JSON.parse(event.data);
+                    delta.changes.forEach(applyChange);
+                    applyKpis(delta.kpis);
+                    if (delta.timeline_stale) {{
+                        // Importación por lotes: la serie se pide entera, una vez por ráfaga
+                        clearTimeout(timelineReload);
+                        timelineReload = setTimeout(() => loadTimeline(timelineGranularity), 2000);
+                    }} else {{
+                        applyBuckets(delta.buckets[timelineGranularity]);
+                    }}
+                }});
+                liveEvents.addEventListener('reload', () => {{
+                    // Demasiado atrás para ponerse al día con deltas (como mucho una recarga por minuto)
+                    const last = Number(sessionStorage.getItem('dashboardReload') || 0);
+                    if (Date.now() - last > 60000) {{
+                        sessionStorage.setItem('dashboardReload', Date.now());
+                        window.location.reload();
+                    }}
+                }});
+                liveEvents.onerror = () => {{
+                    // Conexión rechazada (servidor lleno): volver a la recarga periódica
+                    if (liveEvents.readyState === EventSource.CLOSED) {{
+                        setTimeout(() => {{
+                            window.location.reload();
+                        }}, 60000);
+                    }}
+                }};
+            }} else {{
+                // Auto-refresh cada 60 segundos
+                setTimeout(() => {{
+                    window.location.reload();
+                }}, 60000);
+            }}
         </script>
     </body>
     </html>
@@ -2022,13 +2039,35 @@ def get_dashboard(db: Session = Depends(get_db)):
     
     return HTMLResponse(content=html_content)
 
+@app.get("/api/dashboard/events")
+async def dashboard_events(after: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events con los cambios del dashboard: un evento "delta" por lote de análisis
+    creados o borrados, con los KPIs y los buckets de la línea temporal ya recalculados.
+    after (o Last-Event-ID al reconectar) es el último evento que ya refleja la página.
+    """
+    if last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+    try:
+        subscriber = dashboard_broadcast.subscribe(after)
+    except DashboardBusy as e:
+        return JSONResponse(status_code=503, content={"status": "error", "message": str(e)}, headers={"Retry-After": "30"})
+
+    return StreamingResponse(
+        dashboard_broadcast.stream(subscriber),
+        media_type="text/event-stream",
+        # Sin caché ni buffering en proxies intermedios: cada evento sale al momento
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ==================== ENDPOINT /api/analyses CON FORMATO BONITO ====================
 
 @app.get("/api/analyses", response_class=HTMLResponse)
-def get_all_analyses_html(db: Session = Depends(get_db)):
-    """Endpoint /api/analyses con formato HTML bonito"""
+def get_all_analyses_html(db: Session = Depends(get_read_db)):
+    """Endpoint /api/analyses con formato HTML bonito (los campos del cliente se escapan)"""
     try:
         analyses = db.query(SystemAnalysis).order_by(SystemAnalysis.analysis_id.desc()).all()
+        scope = live_scope(db)
         
         html_content = f"""
         <!DOCTYPE html>
@@ -2362,7 +2401,7 @@ def get_all_analyses_html(db: Session = Depends(get_db)):
                 <!-- HEADER -->
                 <header class="header">
                     <h1><i class="fas fa-list-alt"></i> Lista de Análisis</h1>
-                    <p class="subtitle">Todos los análisis de sistemas realizados</p>
+                    <p class="subtitle">Todos los análisis de sistemas realizados{f' · {scope["archived_analyses"]} archivados no aparecen: {scope["note"]}' if scope["archived_analyses"] else ''}</p>
                 </header>
                 
                 <!-- STATS BAR -->
@@ -2401,7 +2440,7 @@ def get_all_analyses_html(db: Session = Depends(get_db)):
                         <div class="hardware-info">
                             <div class="hardware-row">
                                 <span class="hardware-label">Procesador:</span>
-                                <span class="hardware-value">{analysis.cpu_model or "No especificado"}</span>
+                                <span class="hardware-value">{html.escape(analysis.cpu_model or "No especificado")}</span>
                             </div>
                             <div class="hardware-row">
                                 <span class="hardware-label">Núcleos:</span>
@@ -2413,7 +2452,7 @@ def get_all_analyses_html(db: Session = Depends(get_db)):
                             </div>
                             <div class="hardware-row">
                                 <span class="hardware-label">GPU:</span>
-                                <span class="hardware-value">{analysis.gpu_model or "No especificado"}</span>
+                                <span class="hardware-value">{html.escape(analysis.gpu_model or "No especificado")}</span>
                             </div>
                             <div class="hardware-row">
                                 <span class="hardware-label">VRAM:</span>
@@ -2421,19 +2460,19 @@ def get_all_analyses_html(db: Session = Depends(get_db)):
                             </div>
                             <div class="hardware-row">
                                 <span class="hardware-label">Almacenamiento:</span>
-                                <span class="hardware-value">{analysis.disk_type}</span>
+                                <span class="hardware-value">{html.escape(str(analysis.disk_type or ""))}</span>
                             </div>
                         </div>
                         
                         <div class="profile-section">
                             <div class="profile-badge">
-                                <i class="fas fa-bullseye"></i> Perfil Recomendado: {analysis.main_profile}
+                                <i class="fas fa-bullseye"></i> Perfil Recomendado: {html.escape(str(analysis.main_profile))}
                             </div>
                         </div>
                         
                         <div class="links-section">
-                            {"<a href='"+analysis.pdf_url+"' class='analysis-link' target='_blank'><i class='fas fa-file-pdf'></i> PDF</a>" if analysis.pdf_url else ""}
-                            {"<a href='"+analysis.json_url+"' class='analysis-link json' target='_blank'><i class='fas fa-code'></i> JSON</a>" if analysis.json_url else ""}
+                            {"<a href='"+html.escape(analysis.pdf_url)+"' class='analysis-link' target='_blank'><i class='fas fa-file-pdf'></i> PDF</a>" if analysis.pdf_url else ""}
+                            {"<a href='"+html.escape(analysis.json_url)+"' class='analysis-link json' target='_blank'><i class='fas fa-code'></i> JSON</a>" if analysis.json_url else ""}
                         </div>
                         
                         <div class="analysis-meta">
@@ -2476,7 +2515,7 @@ def get_all_analyses_html(db: Session = Depends(get_db)):
 # ==================== ENDPOINTS DE BASE DE DATOS (JSON) ====================
 
 @app.get("/api/analyses/json")
-def get_all_analyses_json(db: Session = Depends(get_db)):
+def get_all_analyses_json(db: Session = Depends(get_read_db)):
     """Obtener todos los análisis en formato JSON"""
     try:
         analyses = db.query(SystemAnalysis).order_by(SystemAnalysis.analysis_id.desc()).all()
@@ -2484,6 +2523,7 @@ def get_all_analyses_json(db: Session = Depends(get_db)):
         return {
             "status": "success",
             "total": len(analyses),
+            **live_scope(db),
             "analyses": [
                 {
                     "analysis_id": a.analysis_id,
@@ -2503,11 +2543,45 @@ def get_all_analyses_json(db: Session = Depends(get_db)):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.get("/api/analyses/search")
+def search_analyses_endpoint(q: str, page: int = 1, page_size: int = 20, db: Session = Depends(get_read_db)):
+    """Buscar análisis por modelo de CPU/GPU (prefijos, ordenado por relevancia; después, los meses archivados)"""
+    try:
+        page = max(page, 1)
+        page_size = min(max(page_size, 1), 100)
+        offset = (page - 1) * page_size
+
+        hits, has_more = search_analyses(db, q, limit=page_size, offset=offset)
+
+        # Cargar las filas encontradas en una sola consulta y mantener el orden del ranking
+        ids = [row_id for row_id, _ in hits]
+        rows = {a.id: a for a in db.query(SystemAnalysis).filter(SystemAnalysis.id.in_(ids)).all()} if ids else {}
+        results = [{**analysis_to_dict(rows[row_id]), "rank": rank} for row_id, rank in hits if row_id in rows]
+
+        # Agotados los resultados en vivo siguen los archivados, sin rank (del más reciente al más antiguo)
+        if not has_more:
+            live_total = offset + len(hits) if hits or not offset else count_analyses(db, q)
+            archived, has_more = analysis_archive.search(
+                db, parse_query(q), limit=page_size - len(hits), offset=max(offset - live_total, 0)
+            )
+            results += [{**analysis_to_dict(a), "rank": None, "archived": True} for a in archived]
+
+        return {
+            "status": "success",
+            "query": q,
+            "page": page,
+            "page_size": page_size,
+            "has_more": has_more,
+            "results": results
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
 @app.get("/api/analyses/{analysis_id}")
-def get_analysis(analysis_id: int, db: Session = Depends(get_db)):
+def get_analysis(analysis_id: int, db: Session = Depends(get_read_db)):
     """Obtener un análisis específico por ID"""
     try:
-        analysis = db.query(SystemAnalysis).filter(SystemAnalysis.analysis_id == analysis_id).first()
+        analysis = find_analysis(db, analysis_id)
         
         if not analysis:
             return {"status": "error", "message": "Análisis no encontrado"}
@@ -2533,20 +2607,200 @@ def get_analysis(analysis_id: int, db: Session = Depends(get_db)):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+def upload_rendered_report(analysis_id: int, pdf_filename: str, pdf_bytes: bytes):
+    """Tarea en segundo plano: sube un informe renderizado bajo demanda y guarda su enlace"""
+    if not artifact_storage.available:
+        return
+
+    try:
+        pdf_url = artifact_storage.upload(pdf_filename, pdf_bytes)
+    except StorageError as e:
+        print(f"❌ Error subiendo PDF: {e}")
+        return
+
+    db = SessionLocal()
+    try:
+        db.query(SystemAnalysis).filter(SystemAnalysis.analysis_id == analysis_id).update({SystemAnalysis.pdf_url: pdf_url})
+        db.commit()
+    finally:
+        db.close()
+
+@app.get("/api/analyses/{analysis_id}/report.pdf")
+def get_analysis_report(analysis_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Informe PDF generado bajo demanda y guardado en la caché LRU en disco"""
+    analysis = find_analysis(db, analysis_id)
+
+    if not analysis:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "Análisis no encontrado"})
+
+    # El informe refleja la puntuación guardada; su versión forma parte de la clave de caché
+    info = row_to_info(analysis)
+    result = stored_result(analysis, info)
+    pdf_filename = f"analisis_{analysis_id:04d}.pdf"
+    cache_key = f"analisis_{analysis_id:04d}_{result['scoring_version']}.pdf"
+
+    pdf_bytes = report_cache.get(cache_key)
+    if pdf_bytes is None:
+        try:
+            pdf_bytes = report_renderer.render(info, result, analysis_id)
+        except ReportQueueFull as e:
+            return JSONResponse(status_code=503, content={"status": "error", "message": str(e)})
+        report_cache.put(cache_key, pdf_bytes)
+
+        if REPORT_UPLOAD_ON_RENDER and analysis.pdf_url == f"/api/analyses/{analysis_id}/report.pdf":
+            background_tasks.add_task(upload_rendered_report, analysis_id, pdf_filename, pdf_bytes)
+
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{pdf_filename}"'}
+    )
+
+@app.get("/api/artifacts/{key}")
+def get_artifact(key: str):
+    """Sirve un artefacto de los backends local o en memoria por su clave de contenido"""
+    data = artifact_storage.get(key)
+    if data is None:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "Artefacto no encontrado"})
+    return Response(
+        content=data,
+        media_type=content_type(key),
+        # Direccionado por contenido: la misma clave nunca cambia de contenido
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+@app.get("/api/storage")
+def get_storage_stats():
+    """Backend de almacenamiento activo y latencia de sus subidas"""
+    return {"status": "success", **artifact_storage.snapshot()}
+
+@app.get("/api/admission")
+def get_admission_stats():
+    """Peticiones en curso, en espera y rechazadas por cada limitador"""
+    return {"status": "success", "workers": shared_metrics.workers, "limiters": admission_control.snapshot()}
+
+@app.get("/api/replica")
+def get_replica_stats():
+    """Estado de la réplica de lectura: retraso medido y lecturas servidas por cada base de datos"""
+    return {"status": "success", **read_router.snapshot()}
+
+@app.get("/api/analytics")
+def get_analytics(group_by: str = "", metrics: str = "count", since: Optional[str] = None,
+                  until: Optional[str] = None, profile: Optional[str] = None, limit: int = 500):
+    """
+    Agregados ad hoc sobre la instantánea columnar (DuckDB), sin consultar la base de datos.
+    Ej.: ?group_by=main_profile,month&metrics=avg:ram_gb  ·  ?group_by=gpu_tier&metrics=share:disk_type=NVMe
+    """
+    try:
+        since_at = datetime.datetime.fromisoformat(since) if since else None
+        until_at = datetime.datetime.fromisoformat(until) if until else None
+    except ValueError:
+        return {"status": "error", "message": "since y until deben ser fechas ISO 8601"}
+
+    try:
+        rows = analytics_snapshot.query(group_by, metrics, since_at, until_at, profile, limit)
+    except AnalyticsQueryError as e:
+        return {"status": "error", "message": str(e)}
+    except AnalyticsUnavailable as e:
+        return JSONResponse(status_code=503, content={"status": "error", "message": str(e)})
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+    snapshot = analytics_snapshot.snapshot()
+    return {
+        "status": "success",
+        "group_by": [name.strip() for name in group_by.split(",") if name.strip()],
+        "metrics": [name.strip() for name in metrics.split(",") if name.strip()],
+        "rows": rows,
+        "snapshot": {"watermark": snapshot["watermark"], "refreshed_at": snapshot["refreshed_at"]},
+    }
+
+@app.get("/api/analytics/snapshot")
+def get_analytics_snapshot():
+    """Estado de la instantánea columnar: segmentos, filas, último id volcado y último refresco"""
+    return {"status": "success", **analytics_snapshot.snapshot()}
+
+@app.get("/api/outbox")
+def get_outbox_stats(db: Session = Depends(get_db)):
+    """Profundidad de la cola de subidas pendientes y ritmo de vaciado"""
+    return {"status": "success", **report_outbox.stats(db)}
+
+def indexes_loading():
+    """503 de los endpoints que usan los índices en memoria mientras el worker los carga"""
+    return JSONResponse(status_code=503, headers={"Retry-After": "2"}, content={
+        "status": "error", "message": "Índices en memoria cargándose, reintenta en unos segundos",
+        "indexes": index_sync.snapshot()
+    })
+
+@app.get("/api/analyses/{analysis_id}/similar")
+def get_similar_analyses(analysis_id: int, k: int = 5, db: Session = Depends(get_read_db)):
+    """Máquinas analizadas más parecidas según el vector normalizado cpu/ram/gpu/disco"""
+    if not index_sync.ready:
+        return indexes_loading()
+    try:
+        vector = similar_machines.get_vector(analysis_id)
+        if vector is None:
+            return {"status": "error", "message": "Análisis no encontrado"}
+
+        k = min(max(k, 1), 50)
+        neighbours = similar_machines.nearest(vector, k=k, exclude=analysis_id)
+
+        ids = [neighbour_id for neighbour_id, _ in neighbours]
+        rows = {a.analysis_id: a for a in db.query(SystemAnalysis).filter(SystemAnalysis.analysis_id.in_(ids)).all()} if ids else {}
+        # Vecinos que ya no están en la tabla: meses archivados
+        missing = [i for i in ids if i not in rows]
+        if missing:
+            rows.update(analysis_archive.find_many(db, missing))
+
+        return {
+            "status": "success",
+            "analysis_id": analysis_id,
+            "k": k,
+            "similar": [
+                {**analysis_to_dict(rows[neighbour_id]), "distance": round(distance, 4)}
+                for neighbour_id, distance in neighbours if neighbour_id in rows
+            ]
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get("/api/analyses/{analysis_id}/percentile")
+def get_analysis_percentile(analysis_id: int, db: Session = Depends(get_read_db)):
+    """Porcentaje de análisis que supera este equipo, en global y dentro de su perfil"""
+    if not index_sync.ready:
+        return indexes_loading()
+    try:
+        analysis = find_analysis(db, analysis_id)
+
+        if not analysis:
+            return {"status": "error", "message": "Análisis no encontrado"}
+
+        return {
+            "status": "success",
+            "analysis_id": analysis.analysis_id,
+            "main_profile": analysis.main_profile,
+            "main_score": analysis.main_score,
+            "percentile": score_percentiles.percentiles(analysis.main_profile, analysis.main_score)
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
 @app.get("/api/stats")
-def get_stats(db: Session = Depends(get_db)):
+def get_stats(db: Session = Depends(get_read_db)):
     """Estadísticas de los análisis - VERSIÓN CORREGIDA QUE CONSULTA LA BD"""
     try:
-        # CONSULTAR DATOS REALES DE LA BASE DE DATOS
-        total_analyses = db.query(SystemAnalysis).count()
+        # CONSULTAR DATOS REALES DE LA BASE DE DATOS (más los agregados de los meses archivados)
+        archived_total, archived_score_sum, archived_profiles = analysis_archive.totals(db)
+        live_total = db.query(SystemAnalysis).count()
+        total_analyses = live_total + archived_total
         
         # Calcular promedio real
-        avg_score_result = db.query(func.avg(SystemAnalysis.main_score)).scalar()
-        average_score = round(avg_score_result, 2) if avg_score_result else 0.0
+        live_score_sum = db.query(func.sum(SystemAnalysis.main_score)).scalar() or 0.0
+        average_score = round((live_score_sum + archived_score_sum) / total_analyses, 2) if total_analyses else 0.0
         
         # Distribución real de perfiles
         profiles = db.query(SystemAnalysis.main_profile).all()
-        profiles_distribution = {}
+        profiles_distribution = dict(archived_profiles)
         for profile in profiles:
             profile_name = profile[0]
             profiles_distribution[profile_name] = profiles_distribution.get(profile_name, 0) + 1
@@ -2555,22 +2809,176 @@ def get_stats(db: Session = Depends(get_db)):
             "status": "success",
             "total_analyses": total_analyses,
             "average_score": average_score,
-            "profiles_distribution": profiles_distribution
+            "profiles_distribution": profiles_distribution,
+            "archived_analyses": archived_total,
+            # Totales de toda la instancia, sumados entre los workers de server.py
+            "server": {"workers": shared_metrics.workers, "requests": int(http_requests.total())}
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get("/api/scoring")
+def get_scoring_model():
+    """Perfiles y pesos de la configuración de scoring vigente"""
+    model = scoring_models.current()
+    return {
+        "status": "success",
+        "version": model.version,
+        "normalization": dict(zip(("cpu", "ram", "gpu"), model.caps)),
+        "profiles": {
+            name: {FEATURES[i]: w for i, w in row}
+            for name, row in zip(model.profiles, model.matrix)
+        }
+    }
+
+@app.post("/api/imports")
+def import_inventory(file: UploadFile = File(...), mapping: Optional[str] = Form(None),
+                     chunk_size: int = Form(IMPORT_CHUNK_SIZE)):
+    """
+    Importa un inventario CSV/XLSX por lotes. La respuesta es NDJSON: una línea de progreso
+    por lote ({"status": "progress", ...}) y el resumen final ({"status": "success", ...}).
+    Con réplica, la última línea lleva last_write: enviarlo como X-Last-Write para leer lo
+    importado (las cabeceras salen antes de escribir ninguna fila).
+    """
+    try:
+        column_mapping = json.loads(mapping) if mapping else None
+    except ValueError:
+        return {"status": "error", "message": "mapping debe ser un objeto JSON {campo: columna}"}
+    if column_mapping is not None and not isinstance(column_mapping, dict):
+        return {"status": "error", "message": "mapping debe ser un objeto JSON {campo: columna}"}
+    if not import_slots.acquire(blocking=False):
+        return JSONResponse(status_code=429, content={"status": "error", "message": "Ya hay una importación en curso"})
+
+    def on_inserted(records):
+        # Índices en memoria de este worker; el resto los carga al arrancar
+        for record in records:
+            index_sync.added(record["analysis_id"], record, record["main_profile"], record["main_score"])
+
+    def last_write(importer):
+        # Instante tras el último lote confirmado (los anteriores a un error siguen guardados)
+        stamp = read_router.write_stamp() if importer is not None and importer.inserted else None
+        return {"last_write": stamp} if stamp else {}
+
+    def progress():
+        importer = None
+        try:
+            if (file.filename or "").lower().endswith((".xlsx", ".xlsm")):
+                rows = read_xlsx(file.file)
+            else:
+                rows = read_csv(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+            importer = InventoryImporter(column_mapping, chunk_size,
+                                         id_lock=analysis_id_lock, on_inserted=on_inserted)
+            for report in importer.run(rows):
+                if report.get("done"):
+                    yield json.dumps({"status": "success", **report, **last_write(importer)}, ensure_ascii=False) + "\n"
+                else:
+                    yield json.dumps({"status": "progress", **report}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"status": "error", "message": str(e), **last_write(importer)}, ensure_ascii=False) + "\n"
+
+    # La plaza se libera al terminar la respuesta, también si el cliente se desconecta antes de empezar
+    return StreamingResponse(progress(), media_type="application/x-ndjson",
+                             background=BackgroundTask(import_slots.release))
+
+@app.post("/api/scoring/reload")
+def reload_scoring_model():
+    """Recargar scoring_profiles.json sin reiniciar (también se recarga solo al cambiar el fichero)"""
+    try:
+        model = scoring_models.reload()
+        # Los índices de este worker se recargan ya; los demás, en su próxima lectura del feed
+        index_sync.rebuild(model.version)
+        return {"status": "success", "version": model.version}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get("/api/stats/timeseries")
+def get_stats_timeseries(granularity: str = "day", limit: int = 90, db: Session = Depends(get_read_db)):
+    """Evolución temporal agregada (hour, day o month) leída de la tabla de rollups"""
+    try:
+        if granularity not in ("hour", "day", "month"):
+            return {"status": "error", "message": "granularity debe ser hour, day o month"}
+
+        limit = min(max(limit, 1), 120 if granularity == "month" else 1000)
+
+        return {
+            "status": "success",
+            "granularity": granularity,
+            "series": get_timeseries(db, granularity, limit)
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get("/api/stats/hardware")
+def get_stats_hardware(kind: str = "cpu", limit: int = 20, db: Session = Depends(get_read_db)):
+    """Modelos de CPU o GPU más frecuentes, agrupando por el id canónico del catálogo"""
+    try:
+        if kind not in ("cpu", "gpu"):
+            return {"status": "error", "message": "kind debe ser cpu o gpu"}
+
+        model_column = SystemAnalysis.cpu_model_id if kind == "cpu" else SystemAnalysis.gpu_model_id
+        limit = min(max(limit, 1), 200)
+
+        # Agregar sobre la columna entera y sumar los recuentos guardados de los meses archivados
+        counts = analysis_archive.hardware_counts(db, kind)
+        live = db.query(
+            model_column, func.count(SystemAnalysis.id), func.sum(SystemAnalysis.main_score), func.count(SystemAnalysis.main_score)
+        ).filter(model_column.isnot(None)).group_by(model_column).all()
+        merge_hardware(counts, {model_id: [total, score_sum or 0.0, scored] for model_id, total, score_sum, scored in live})
+
+        # Unir con el catálogo solo los modelos más frecuentes
+        top = sorted(counts.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        names = dict(db.query(HardwareModel.id, HardwareModel.canonical_name)
+                     .filter(HardwareModel.id.in_([model_id for model_id, _ in top])).all()) if top else {}
+
+        return {
+            "status": "success",
+            "kind": kind,
+            "models": [
+                {"model_id": model_id, "model": names[model_id], "total": total,
+                 "average_score": round(score_sum / scored, 2) if scored else None}
+                for model_id, (total, score_sum, scored) in top if model_id in names
+            ]
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 @app.delete("/api/analyses/{analysis_id}")
-def delete_analysis(analysis_id: int, db: Session = Depends(get_db)):
+def delete_analysis(analysis_id: int, response: Response, db: Session = Depends(get_db)):
     """Eliminar un análisis por ID"""
     try:
         analysis = db.query(SystemAnalysis).filter(SystemAnalysis.analysis_id == analysis_id).first()
         
+        if analysis:
+            db.delete(analysis)
+        else:
+            # Puede estar en un mes archivado: se reescribe su fichero
+            analysis = analysis_archive.delete(db, analysis_id)
+        
         if not analysis:
             return {"status": "error", "message": "Análisis no encontrado"}
         
-        db.delete(analysis)
-        db.commit()
+        created_at = analysis.created_at
+        artifact_keys = [artifact_storage.key_for(url) for url in (analysis.pdf_url, analysis.json_url)]
+        db.query(ReportOutbox).filter(ReportOutbox.analysis_id == analysis_id).delete(synchronize_session=False)
+        publish_dashboard_event(db, "analysis_deleted", analysis)
+        if created_at:
+            # Buckets recalculados en la misma transacción que el borrado y su evento:
+            # los dashboards nunca reciben el borrado con los agregados de antes
+            db.flush()
+            refresh_buckets(db, created_at)
+        else:
+            db.commit()
+        dashboard_broadcast.notify()
+        index_sync.removed(analysis_id, analysis.main_profile, analysis.main_score)
+        try:
+            analytics_snapshot.record_deletion(analysis_id, created_at)
+        except Exception as e:
+            print(f"⚠️ Borrado no anotado en la instantánea analítica: {e}")
+        report_cache.discard_prefix(f"analisis_{analysis_id:04d}_")
+        for key in artifact_keys:
+            if key:
+                artifact_storage.delete(key)
+        read_router.mark_write(response)
         
         return {"status": "success", "message": f"Análisis {analysis_id} eliminado correctamente"}
     except Exception as e:
@@ -0,0 +1,233 @@
+# backend/outbox.py
+import datetime
+import json
+import os
+import random
+import threading
+from datetime import timezone, timedelta
+from sqlalchemy import and_, func, or_
+from database import SessionLocal, SystemAnalysis, ReportOutbox
+from report_pool import report_renderer, ReportQueueFull
+from storage import artifact_storage, StorageError, StorageUnavailable
+from shared_metrics import shared_metrics
+
+# Hilos que vacían el outbox en segundo plano
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "2"))
+# Segundos entre sondeos cuando no hay trabajo
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+# Segundos que una entrada reservada queda bloqueada para el resto de workers
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "120"))
+# Intentos antes de marcar la entrada como failed
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "12"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "5"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "900"))
+
+def enqueue(db, analysis_id: int, info: dict, result: dict, claimed: bool = False):
+    """
+    Añade la entrega del informe a la sesión sin confirmarla: se hace commit junto al análisis.
+    claimed=True la deja ya reservada para que la propia petición la procese en línea.
+    """
+    now = datetime.datetime.utcnow()
+    entry = ReportOutbox(
+        analysis_id=analysis_id,
+        payload=json.dumps({
+            "sysinfo": info,
+            "result": result,
+            "timestamp": datetime.datetime.now(timezone(timedelta(hours=1))).isoformat()
+        }, ensure_ascii=False),
+        status="processing" if claimed else "pending",
+        attempts=0,
+        next_attempt_at=now,
+        lease_until=now + timedelta(seconds=OUTBOX_LEASE) if claimed else None
+    )
+    db.add(entry)
+    return entry
+
+def build_artifacts(analysis_id: int, payload: dict):
+    """Bytes del PDF y del JSON de un análisis: [(nombre, datos)]"""
+    info, result = payload["sysinfo"], payload["result"]
+    # Crear PDF ELEGANTE con el ID (en el pool de procesos de renderizado)
+    pdf_bytes = report_renderer.render(info, result, analysis_id)
+    json_bytes = json.dumps({
+        "sysinfo": info,
+        "result": result,
+        "analysis_id": analysis_id,
+        "timestamp": payload["timestamp"],
+        "version": "2.0.0"
+    }, indent=2, ensure_ascii=False).encode("utf-8")
+    return [(f"analisis_{analysis_id:04d}.pdf", pdf_bytes), (f"analisis_{analysis_id:04d}.json", json_bytes)]
+
+def _ready(now):
+    """Entradas listas: pendientes cuyo reintento ya toca o reservadas con la reserva caducada"""
+    return or_(
+        and_(ReportOutbox.status == "pending", ReportOutbox.next_attempt_at <= now),
+        and_(ReportOutbox.status == "processing", ReportOutbox.lease_until < now),
+    )
+
+class ReportOutboxWorkers:
+    """
+    Pool de hilos que vacía report_outbox: renderiza, sube al almacenamiento, rellena
+    pdf_url/json_url y borra la entrada en una sola transacción. Los fallos se reintentan
+    con backoff exponencial; si el circuito del almacenamiento está abierto se aplazan sin
+    gastar intentos.
+    """
+
+    def __init__(self, storage, workers: int, poll_interval: float):
+        self.storage = storage
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        # Contadores de toda la instancia (sumados entre workers del servidor)
+        self._completed = shared_metrics.rate("outbox.completed")
+        self.delivered = shared_metrics.counter("outbox.delivered")
+        self.retried = shared_metrics.counter("outbox.retried")
+        self.failed = shared_metrics.counter("outbox.failed")
+
+    def start(self):
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"report-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"✅ Outbox de informes: {self.workers} workers")
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Despierta a los workers sin esperar al siguiente sondeo"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                worked = self.drain_one()
+            except Exception as e:
+                print(f"❌ Error en el outbox de informes: {e}")
+                worked = False
+            if not worked:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def drain_one(self):
+        """Reserva y procesa una entrada lista; False si no había ninguna"""
+        db = SessionLocal()
+        try:
+            entry_id = self._claim(db)
+            if entry_id is None:
+                return False
+            self.process(db, entry_id)
+            return True
+        finally:
+            db.close()
+
+    def drain(self):
+        """Procesa en el hilo actual todo lo que esté listo; devuelve cuántas entradas ha tratado"""
+        done = 0
+        while self.drain_one():
+            done += 1
+        return done
+
+    def _claim(self, db):
+        now = datetime.datetime.utcnow()
+        candidates = db.query(ReportOutbox.id).filter(_ready(now)) \
+            .order_by(ReportOutbox.next_attempt_at).limit(self.workers * 2 or 1).all()
+        for (entry_id,) in candidates:
+            # UPDATE condicional: si otro worker la reservó antes, no toca ninguna fila
+            claimed = db.query(ReportOutbox).filter(ReportOutbox.id == entry_id, _ready(now)).update(
+                {ReportOutbox.status: "processing", ReportOutbox.lease_until: now + timedelta(seconds=OUTBOX_LEASE)},
+                synchronize_session=False
+            )
+            db.commit()
+            if claimed:
+                return entry_id
+        return None
+
+    def process(self, db, entry_id: int):
+        """Entrega una entrada ya reservada; devuelve (pdf_url, json_url) o None si queda para reintento"""
+        entry = db.query(ReportOutbox).filter(ReportOutbox.id == entry_id).first()
+        if entry is None:
+            return None
+        analysis_id = entry.analysis_id
+
+        try:
+            urls = [self.storage.upload(name, data) for name, data in build_artifacts(analysis_id, json.loads(entry.payload))]
+        except StorageUnavailable as e:
+            self._reschedule(db, entry, e, count_attempt=False)
+            return None
+        except (StorageError, ReportQueueFull) as e:
+            self._reschedule(db, entry, e)
+            return None
+        except Exception as e:
+            print(f"❌ Error inesperado entregando el análisis {analysis_id}: {e}")
+            self._reschedule(db, entry, e)
+            return None
+
+        pdf_url, json_url = urls
+        updated = db.query(SystemAnalysis).filter(SystemAnalysis.analysis_id == analysis_id) \
+            .update({SystemAnalysis.pdf_url: pdf_url, SystemAnalysis.json_url: json_url}, synchronize_session=False)
+        db.query(ReportOutbox).filter(ReportOutbox.id == entry_id).delete(synchronize_session=False)
+        db.commit()
+
+        if not updated:
+            # El análisis se borró mientras se subía: no dejar artefactos huérfanos
+            for url in urls:
+                key = self.storage.key_for(url)
+                if key:
+                    self.storage.delete(key)
+
+        self.delivered.add()
+        self._completed.mark()
+        print(f"✅ Archivos del análisis {analysis_id} subidos ({self.storage.name})")
+        return pdf_url, json_url
+
+    def _reschedule(self, db, entry, error, count_attempt=True):
+        attempts = entry.attempts + (1 if count_attempt else 0)
+        if count_attempt:
+            # Backoff exponencial con la mitad de jitter: nunca reintenta antes de la mitad del tramo
+            window = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+        else:
+            window = OUTBOX_BACKOFF_BASE
+        delay = window / 2 + random.uniform(0, window / 2)
+
+        status = "failed" if attempts >= OUTBOX_MAX_ATTEMPTS else "pending"
+        entry.attempts = attempts
+        entry.status = status
+        entry.lease_until = None
+        entry.next_attempt_at = datetime.datetime.utcnow() + timedelta(seconds=delay)
+        entry.last_error = str(error)[:500]
+        db.commit()
+
+        if status == "failed":
+            self.failed.add()
+        else:
+            self.retried.add()
+        print(f"⚠️ Subida del análisis {entry.analysis_id} aplazada ({status}, intento {attempts}): {error}")
+
+    def stats(self, db):
+        counters = {name: int(counter.total()) for name, counter in
+                    (("delivered", self.delivered), ("retried", self.retried), ("failed", self.failed))}
+
+        depth = dict(db.query(ReportOutbox.status, func.count(ReportOutbox.id)).group_by(ReportOutbox.status).all())
+        oldest = db.query(func.min(ReportOutbox.created_at)).filter(ReportOutbox.status != "failed").scalar()
+        return {
+            "workers": len(self._threads),
+            "queue_depth": depth.get("pending", 0) + depth.get("processing", 0),
+            "pending": depth.get("pending", 0),
+            "processing": depth.get("processing", 0),
+            "failed_entries": depth.get("failed", 0),
+            "oldest_pending_seconds": round((datetime.datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None,
+            "drain_per_minute": self._completed.total(),
+            **counters
+        }
+
+# Instancia global del proceso
+report_outbox = ReportOutboxWorkers(artifact_storage, OUTBOX_WORKERS, OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,397 @@
+# backend/pdf_report.py
+from fpdf import FPDF
+import datetime
+from datetime import timezone, timedelta
+from recommendations import recommend
+
+# -------------------------
+#   PDF SUPER ELEGANTE - COLORES MÁS CLAROS
+# -------------------------
+class PDF(FPDF):
+    # Fragmentos estáticos ya renderizados, compartidos por todos los informes del proceso
+    static_cache = {}
+    STATIC_CACHE_MAX = 64
+    use_static_cache = True
+
+    # Estado de FPDF que un bloque estático puede leer o modificar (además de fuentes)
+    STATE_ATTRS = (
+        "x", "y", "lastw", "lasth", "ws", "line_width", "draw_color", "fill_color", "text_color", "color_flag",
+        "font_family", "font_style", "font_size_pt", "font_size", "underline", "unifontsubset",
+    )
+
+    def __init__(self, analysis_id: int):
+        super().__init__()
+        self.analysis_id = f"APC-{analysis_id:04d}"
+
+    def _state_key(self):
+        values = tuple(getattr(self, attr, None) for attr in self.STATE_ATTRS)
+        return values + (tuple((name, font['i']) for name, font in self.fonts.items()),)
+
+    def _copy_fonts(self, fonts, current_i):
+        # Copias por documento: FPDF anota en cada fuente su número de objeto al generar el PDF
+        self.fonts = {name: dict(font) for name, font in fonts.items()}
+        self.current_font = next((f for f in self.fonts.values() if f['i'] == current_i), None)
+
+    def static_block(self, name, draw):
+        """
+        Dibuja un bloque que no depende del análisis. La primera vez se renderiza y se guarda
+        el fragmento del content stream junto con el estado final de FPDF; las siguientes
+        veces, si el estado de partida coincide, se estampa directamente sin recalcularlo.
+        """
+        if not self.use_static_cache:
+            draw()
+            return
+
+        key = (name, self._state_key())
+        cached = PDF.static_cache.get(key)
+        if cached is not None:
+            content, state, fonts, current_i = cached
+            self.pages[self.page] += content
+            for attr, value in state.items():
+                setattr(self, attr, value)
+            self._copy_fonts(fonts, current_i)
+            return
+
+        page, start = self.page, len(self.pages[self.page])
+        draw()
+        # Un bloque que provoca salto de página no se puede estampar como un solo fragmento
+        if self.page == page and len(PDF.static_cache) < self.STATIC_CACHE_MAX:
+            state = {attr: getattr(self, attr, None) for attr in self.STATE_ATTRS}
+            fonts = {name: dict(font) for name, font in self.fonts.items()}
+            current_i = self.current_font['i'] if getattr(self, "current_font", None) else None
+            PDF.static_cache[key] = (self.pages[self.page][start:], state, fonts, current_i)
+
+    def header(self):
+        self.static_block("header", self._draw_header)
+
+    def _draw_header(self):
+        # ENCABEZADO CON AZUL CELESTE
+        # Fondo con azul celeste
+        self.set_fill_color(173, 216, 230)  # Azul celeste claro
+        self.rect(0, 0, 210, 45, 'F')
+        
+        # Efecto de gradiente (simulado con rectángulos superpuestos)
+        self.set_fill_color(135, 206, 235)  # Azul celeste medio
+        self.rect(0, 0, 210, 15, 'F')
+        
+        # TÍTULO PRINCIPAL
+        self.set_font("Arial", "B", 28)
+        self.set_text_color(0, 0, 139)  # Azul oscuro para contraste
+        
+        # Efecto de sombra para el título
+        self.set_text_color(70, 130, 180)  # Azul acero para sombra
+        self.cell(0, 28, "AnalizaTuPc", ln=True, align="C")
+        
+        # Título principal (sobre la sombra)
+        self.set_y(20)
+        self.set_text_color(0, 0, 139)  # Azul oscuro principal
+        self.set_font("Arial", "B", 28)
+        self.cell(0, 8, "AnalizaTuPc", ln=True, align="C")
+        
+        # Subtítulo elegante
+        self.set_y(32)
+        self.set_font("Arial", "I", 12)
+        self.set_text_color(0, 0, 100)  # Azul oscuro
+        self.cell(0, 8, "ANÁLISIS PROFESIONAL DE HARDWARE", ln=True, align="C")
+        
+        # LÍNEA DECORATIVA MEJORADA
+        self.set_draw_color(0, 0, 139)  # Azul oscuro
+        self.set_line_width(1.5)
+        self.line(30, 42, 180, 42)
+        
+        # Elementos decorativos en las esquinas
+        self.set_draw_color(0, 0, 139)
+        self.set_line_width(1)
+        # Esquina superior izquierda
+        self.line(10, 10, 25, 10)
+        self.line(10, 10, 10, 25)
+        # Esquina superior derecha
+        self.line(185, 10, 200, 10)
+        self.line(200, 10, 200, 25)
+        
+        self.ln(20)
+
+    def footer(self):
+        self.set_y(-25)  # Más espacio para el footer
+        self.set_font("Arial", "I", 9)
+        self.set_text_color(100, 100, 100)
+        
+        # Línea separadora
+        self.set_draw_color(200, 200, 200)
+        self.line(10, self.get_y(), 200, self.get_y())
+        self.ln(5)
+        
+        # Obtener hora local corregida (UTC+1 para España)
+        local_time = datetime.datetime.now(timezone(timedelta(hours=1)))
+        
+        # Información del footer CON HORA CORREGIDA
+        self.cell(0, 6, f"Reporte generado el {local_time.strftime('%d/%m/%Y')} a las {local_time.strftime('%H:%M')}", align="C")
+        self.ln(4)
+        self.cell(0, 6, f"Página {self.page_no()}", align="C")
+        self.ln(4)
+        # ID DEL ANÁLISIS SIEMPRE EN EL FOOTER
+        self.set_font("Arial", "B", 9)
+        self.set_text_color(70, 130, 180)  # Azul acero
+        self.cell(0, 6, f"ID del análisis: {self.analysis_id}", align="C")
+
+    def add_section_title(self, title):
+        self.ln(12)
+        self.set_font("Arial", "B", 18)
+        self.set_text_color(255, 255, 255)  # Texto blanco
+        self.set_fill_color(135, 206, 235)  # Azul celeste para fondo
+        
+        # Borde redondeado simulado
+        self.cell(0, 14, f" {title.upper()} ", ln=True, fill=True, align='L')
+        
+        # Línea decorativa debajo del título
+        self.set_draw_color(0, 0, 139)  # Azul oscuro
+        self.set_line_width(0.8)
+        self.line(15, self.get_y() - 2, 60, self.get_y() - 2)
+        self.ln(10)
+
+    def add_feature_card(self, title, value, highlight=False):
+        self.set_font("Arial", "B", 11)
+        self.set_text_color(60, 60, 60)
+        self.cell(60, 8, f"{title}:", border=0)
+        
+        self.set_font("Arial", "B" if highlight else "", 11)
+        if highlight:
+            self.set_text_color(220, 0, 0)
+        else:
+            self.set_text_color(0, 0, 0)
+            
+        self.cell(0, 8, str(value), ln=True)
+        self.ln(3)
+
+    def add_score_meter(self, profile, score, rank):
+        self.set_font("Arial", "B", 12)
+        
+        # COLORES MÁS CLAROS Y SUAVES para las puntuaciones
+        if score >= 80:
+            color = (200, 230, 255)  # Azul muy claro y suave - EXCELENTE
+            label = "EXCELENTE"
+        elif score >= 60:
+            color = (220, 240, 255)  # Azul casi blanco - BUENO
+            label = "BUENO"
+        elif score >= 40:
+            color = (240, 248, 255)  # Azul alice muy claro - REGULAR
+            label = "REGULAR"
+        else:
+            color = (245, 250, 255)  # Casi blanco con tono azul - MEJORABLE
+            label = "MEJORABLE"
+        
+        # Tarjeta de puntuación con borde sutil
+        self.set_fill_color(color[0], color[1], color[2])
+        self.set_text_color(0, 0, 0)  # Texto negro para mejor contraste
+        self.set_draw_color(200, 200, 200)  # Borde gris claro
+        self.set_line_width(0.2)  # Borde más delgado
+        self.cell(0, 10, f" {label} - {profile}: {score}% ({rank})", border=1, ln=True, fill=True)
+        self.ln(5)
+
+# -------------------------
+#   GENERACIÓN DEL PDF ELEGANTE
+# -------------------------
+def render_pdf_report(sysinfo: dict, result: dict, analysis_id: int) -> bytes:
+    """Renderiza el informe en memoria; solo recibe dicts para poder ejecutarse en otro proceso"""
+    pdf = PDF(analysis_id)
+    pdf.add_page()
+
+    # La portada, títulos y cabeceras de tabla son iguales en todos los informes:
+    # se renderizan una vez por proceso y después se estampan (ver PDF.static_block)
+    def draw_cover():
+        # PORTADA CON AZUL CELESTE
+        # Fondo de portada
+        pdf.set_fill_color(240, 248, 255)  # Azul alice muy claro
+        pdf.rect(0, 45, 210, 160, 'F')
+    
+        # TÍTULO PRINCIPAL DE PORTADA
+        pdf.set_y(60)
+        pdf.set_font("Arial", "B", 32)
+        pdf.set_text_color(70, 130, 180)  # Azul acero
+    
+        # Efecto de sombra para el título principal
+        pdf.set_text_color(100, 149, 237)  # Azul cornflower para sombra
+        pdf.cell(0, 15, "INFORME PROFESIONAL", ln=True, align="C")
+        pdf.set_text_color(70, 130, 180)  # Azul acero principal
+        pdf.set_y(75)
+        pdf.cell(0, 15, "INFORME PROFESIONAL", ln=True, align="C")
+    
+        # Subtítulo elegante
+        pdf.set_y(100)
+        pdf.set_font("Arial", "I", 18)
+        pdf.set_text_color(100, 100, 100)
+        pdf.cell(0, 10, "Análisis Completo de Hardware", ln=True, align="C")
+    
+        # Línea decorativa doble en azules
+        pdf.set_draw_color(135, 206, 235)  # Azul celeste
+        pdf.set_line_width(1)
+        pdf.line(50, 115, 160, 115)
+        pdf.set_draw_color(0, 0, 139)  # Azul oscuro
+        pdf.set_line_width(0.5)
+        pdf.line(55, 117, 155, 117)
+    
+        pdf.ln(40)
+    
+        # PERFIL PRINCIPAL DESTACADO CON AZUL CELESTE
+        pdf.set_fill_color(200, 230, 255)  # Azul muy claro y suave
+        pdf.set_draw_color(173, 216, 230)  # Azul celeste claro para borde
+        pdf.set_line_width(1)
+    
+        # Sombra del recuadro (más sutil)
+        pdf.set_fill_color(220, 220, 220)
+        pdf.rect(52, pdf.get_y() + 2, 106, 54, 'F')
+    
+        # Recuadro principal
+        pdf.set_fill_color(200, 230, 255)  # Azul muy claro y suave
+        pdf.rect(50, pdf.get_y(), 106, 50, 'F')
+    
+        # Contenido del recuadro
+        pdf.set_y(pdf.get_y() + 8)
+        pdf.set_font("Arial", "B", 16)
+        pdf.set_text_color(0, 0, 139)  # Azul oscuro
+        pdf.cell(0, 8, "PERFIL RECOMENDADO", ln=True, align="C")
+    
+        pdf.ln(5)
+        pdf.set_font("Arial", "B", 24)
+        pdf.set_text_color(0, 0, 100)  # Azul muy oscuro
+
+    pdf.static_block("cover", draw_cover)
+    pdf.cell(0, 12, f"{result['main_profile']}", ln=True, align="C")
+    
+    pdf.set_font("Arial", "B", 20)
+    pdf.set_text_color(70, 130, 180)  # Azul acero
+    pdf.cell(0, 10, f"{result['main_score']}% DE EFICIENCIA", ln=True, align="C")
+    
+    pdf.ln(40)
+
+    # NUEVA PÁGINA - DETALLES TÉCNICOS
+    pdf.add_page()
+    
+    def draw_specs_header():
+        # SECCIÓN: ESPECIFICACIONES DEL SISTEMA EN TABLA
+        pdf.add_section_title("Especificaciones del Sistema")
+        
+        # Crear tabla elegante para especificaciones CON AZUL CELESTE
+        pdf.set_fill_color(200, 230, 255)  # Azul muy claro para cabecera
+        pdf.set_font("Arial", "B", 12)
+        pdf.set_text_color(0, 0, 0)  # Texto negro para mejor contraste
+        pdf.cell(80, 10, "COMPONENTE", border=1, fill=True, align='C')
+        pdf.cell(0, 10, "ESPECIFICACIÓN", border=1, fill=True, align='C')
+        pdf.ln()
+        pdf.set_font("Arial", "", 10)
+
+    pdf.static_block("specs_header", draw_specs_header)
+    
+    # Datos de la tabla
+    specs_data = [
+        ("Procesador (CPU)", f"{sysinfo.get('cpu_model', 'No detectado')}"),
+        ("Núcleos", f"{sysinfo.get('cores', '?')} núcleos"),
+        ("Velocidad CPU", f"{sysinfo.get('cpu_speed_ghz', '?')} GHz"),
+        ("Memoria RAM", f"{sysinfo.get('ram_gb', '?')} GB"),
+        ("Tarjeta Gráfica (GPU)", f"{sysinfo.get('gpu_model', 'No detectado')}"),
+        ("VRAM GPU", f"{sysinfo.get('gpu_vram_gb', '0')} GB"),
+        ("Almacenamiento", f"{sysinfo.get('disk_type', 'No detectado')}"),
+    ]
+    
+    for i, (component, spec) in enumerate(specs_data):
+        def draw_component(i=i, component=component):
+            # Fondo alternado para mejor lectura
+            fill_color = (245, 250, 255) if i % 2 == 0 else (255, 255, 255)  # Azul muy claro alternado
+            pdf.set_fill_color(*fill_color)
+            
+            # Componente
+            pdf.set_text_color(0, 0, 0)
+            pdf.cell(80, 10, f"   {component}", border=1, fill=True)
+
+        pdf.static_block(f"spec_component_{i}", draw_component)
+        
+        # Especificación
+        pdf.cell(0, 10, spec, border=1, fill=True, align='C')
+        pdf.ln()
+    
+    # SECCIÓN: RESULTADOS DEL ANÁLISIS
+    pdf.static_block("results_title", lambda: pdf.add_section_title("Resultados del Análisis"))
+    
+    # Ordenar perfiles por puntuación
+    sorted_scores = sorted(result['scores'].items(), key=lambda x: x[1], reverse=True)
+    
+    for i, (profile, score) in enumerate(sorted_scores):
+        score_percent = round(score * 100, 1)
+        rank = f"#{i+1}"
+        pdf.add_score_meter(profile, score_percent, rank)
+    
+    def draw_scores_header():
+        # SECCIÓN: TABLA DETALLADA DE PUNTUACIONES
+        pdf.add_section_title("Tabla de Puntuaciones Detalladas")
+        
+        # Cabecera de tabla CON AZUL MUY CLARO
+        pdf.set_fill_color(200, 230, 255)  # Azul muy claro
+        pdf.set_font("Arial", "B", 11)
+        pdf.set_text_color(0, 0, 0)  # Texto negro
+        pdf.cell(100, 10, "PERFIL DE USO", border=1, fill=True, align='C')
+        pdf.cell(45, 10, "PUNTUACIÓN", border=1, fill=True, align='C')
+        pdf.cell(0, 10, "CLASIFICACIÓN", border=1, fill=True, align='C')
+        pdf.ln()
+        
+        # Filas de tabla
+        pdf.set_font("Arial", "", 10)
+
+    pdf.static_block("scores_header", draw_scores_header)
+    for i, (profile, score) in enumerate(sorted_scores):
+        score_percent = round(score * 100, 1)
+        
+        # Fondo alternado muy suave
+        fill_color = (245, 250, 255) if i % 2 == 0 else (255, 255, 255)  # Azul muy claro alternado
+        pdf.set_fill_color(*fill_color)
+        
+        # Perfil
+        pdf.set_text_color(0, 0, 0)
+        pdf.cell(100, 10, f"   {profile}", border=1, fill=True)
+        
+        # Puntuación con color EN TONOS AZULES MUY CLAROS
+        if score_percent >= 80:
+            text_color = (0, 0, 139)  # Azul oscuro para contraste
+            classification = "Excelente"
+        elif score_percent >= 60:
+            text_color = (70, 130, 180)  # Azul acero
+            classification = "Bueno"
+        elif score_percent >= 40:
+            text_color = (100, 149, 237)  # Azul cornflower
+            classification = "Regular"
+        else:
+            text_color = (135, 206, 235)  # Azul celeste
+            classification = "Mejorable"
+        
+        pdf.set_text_color(*text_color)
+        pdf.cell(45, 10, f"{score_percent}%", border=1, fill=True, align='C')
+        pdf.set_text_color(100, 100, 100)
+        pdf.cell(0, 10, classification, border=1, fill=True, align='C')
+        pdf.ln()
+
+    def draw_recommendations_title():
+        # SECCIÓN: RECOMENDACIONES
+        pdf.add_section_title("Recomendaciones y Observaciones")
+        pdf.set_font("Arial", "", 10)
+        pdf.set_text_color(80, 80, 80)
+
+    pdf.static_block("recommendations_title", draw_recommendations_title)
+    
+    # Recomendaciones del motor de reglas compilado
+    recommendations = recommend(sysinfo, result['main_score'])
+    
+    for i, rec in enumerate(recommendations):
+        pdf.cell(10, 8, f"{i+1}.", border=0)
+        pdf.multi_cell(0, 8, f" {rec}")
+        pdf.ln(2)
+
+    # FPDF 1.7 devuelve el documento como str latin-1
+    return pdf.output(dest='S').encode('latin1')
+
+def create_pdf_report(sysinfo: dict, result: dict, analysis_id: int):
+    # Guardar PDF CON NUEVO NOMBRE
+    pdf_filename = f"analisis_{analysis_id:04d}.pdf"  # Ej: analisis_0001.pdf, analisis_0002.pdf
+    with open(pdf_filename, "wb") as f:
+        f.write(render_pdf_report(sysinfo, result, analysis_id))
+
+    print(f"✅ PDF elegante generado: {pdf_filename}")
+    return pdf_filename
@@ -0,0 +1,86 @@
+# backend/percentile_index.py
+import threading
+
+# main_score va de 0 a 100 con un decimal: 1001 valores posibles
+BUCKETS = 1001
+
+def _bucket(score):
+    return min(max(int(round(score * 10)), 0), BUCKETS - 1)
+
+class ScoreDistribution:
+    """
+    Árbol de Fenwick sobre los 1001 valores posibles de main_score.
+    Insertar, borrar y contar cuántas puntuaciones quedan por debajo es O(log 1001),
+    independientemente del número de análisis.
+    """
+
+    def __init__(self):
+        self._tree = [0] * (BUCKETS + 1)
+        self.total = 0
+
+    def add(self, score, count=1):
+        i = _bucket(score) + 1
+        while i <= BUCKETS:
+            self._tree[i] += count
+            i += i & -i
+        self.total += count
+
+    def count_below(self, score):
+        i = _bucket(score)
+        below = 0
+        while i > 0:
+            below += self._tree[i]
+            i -= i & -i
+        return below
+
+    def percentile(self, score):
+        """Porcentaje de los demás análisis con puntuación estrictamente menor"""
+        others = self.total - 1
+        if others <= 0:
+            return 100.0
+        return round(min(self.count_below(score) / others, 1.0) * 100, 1)
+
+class PercentileTracker:
+    """Distribución global y una por perfil, alimentadas en cada inserción"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._overall = ScoreDistribution()
+        self._profiles = {}
+
+    def rebuild(self, grouped_counts):
+        """Carga desde [(main_profile, main_score, count)] agrupados en la BD"""
+        overall = ScoreDistribution()
+        profiles = {}
+        for profile, score, count in grouped_counts:
+            if score is None:
+                continue
+            overall.add(score, count)
+            profiles.setdefault(profile, ScoreDistribution()).add(score, count)
+        with self._lock:
+            self._overall = overall
+            self._profiles = profiles
+
+    def add(self, profile, score):
+        with self._lock:
+            self._overall.add(score)
+            self._profiles.setdefault(profile, ScoreDistribution()).add(score)
+
+    def remove(self, profile, score):
+        with self._lock:
+            self._overall.add(score, -1)
+            if profile in self._profiles:
+                self._profiles[profile].add(score, -1)
+
+    def percentiles(self, profile, score):
+        with self._lock:
+            profile_dist = self._profiles.get(profile)
+            return {
+                "overall": self._overall.percentile(score),
+                "profile": profile_dist.percentile(score) if profile_dist else 100.0,
+                "total_analyses": self._overall.total,
+                "profile_analyses": profile_dist.total if profile_dist else 0
+            }
+
+# Instancia global del proceso
+score_percentiles = PercentileTracker()
@@ -0,0 +1,113 @@
+# backend/recommendations.py
+import re
+from bisect import bisect_right
+
+# -------------------------
+#   REGLAS DECLARATIVAS
+# -------------------------
+# Patrones: subcadenas sobre el campo en minúsculas; gana el primer nivel de la lista que coincida
+PATTERN_RULES = {
+    "cpu_model": [
+        (["i3", "ryzen 3"], "Considera actualizar a un procesador de gama media para mejor rendimiento"),
+        (["i9", "ryzen 9"], "Tu procesador es excelente para cualquier tarea demandante"),
+    ],
+}
+
+# Valores exactos sobre el campo en minúsculas
+EXACT_RULES = {
+    "disk_type": {
+        "hdd": "Cambiar a SSD mejorará drásticamente los tiempos de carga",
+        "nvme": "Tu almacenamiento NVMe es óptimo para máximo rendimiento",
+    },
+}
+
+# Tramos numéricos: (límite superior exclusivo, recomendaciones); None = sin límite
+THRESHOLD_RULES = {
+    "ram_gb": [
+        (8, ["Se recomienda aumentar la RAM a al menos 8GB para multitarea"]),
+        (32, []),
+        (None, ["Tienes suficiente RAM incluso para tareas muy demandantes"]),
+    ],
+    "gpu_vram_gb": [
+        (4, ["Considera una GPU con más VRAM para gaming y aplicaciones gráficas"]),
+        (None, []),
+    ],
+    "main_score": [
+        (60, ["Se recomiendan mejoras de hardware para un rendimiento óptimo",
+              "Prioriza actualizar los componentes con menor puntuación"]),
+        (80, ["Tu sistema tiene un buen equilibrio para uso general",
+              "Considera optimizaciones de software para mejorar aún más"]),
+        (None, ["Tu sistema está excelentemente equilibrado para la mayoría de tareas",
+                "Mantén los controladores actualizados para mantener el rendimiento"]),
+    ],
+}
+
+GENERAL_RECOMMENDATIONS = [
+    "Realiza mantenimiento regular del sistema",
+    "Mantén el sistema operativo actualizado",
+]
+
+# Orden en el que aparecen las recomendaciones (el mismo que tenía el informe PDF)
+RULE_ORDER = ["cpu_model", "ram_gb", "disk_type", "gpu_vram_gb", "main_score"]
+
+# -------------------------
+#   COMPILACIÓN
+# -------------------------
+class RecommendationEngine:
+    """
+    Compila las reglas una sola vez: todos los patrones de un campo se unen en una
+    única expresión regular con un grupo por nivel, y los tramos numéricos en
+    listas de límites para resolverlos con bisect.
+    """
+
+    def __init__(self, pattern_rules, exact_rules, threshold_rules, general, order):
+        self._order = order
+        self._general = list(general)
+        self._exact = {field: dict(table) for field, table in exact_rules.items()}
+
+        self._patterns = {}
+        for field, tiers in pattern_rules.items():
+            # Lookahead de ancho cero: finditer prueba todas las posiciones, incluso solapadas
+            alternatives = "|".join(
+                f"(?P<t{i}>{'|'.join(re.escape(p.lower()) for p in patterns)})"
+                for i, (patterns, _) in enumerate(tiers)
+            )
+            self._patterns[field] = (re.compile(f"(?=(?:{alternatives}))"), [text for _, text in tiers])
+
+        self._thresholds = {}
+        for field, bands in threshold_rules.items():
+            bounds = [limit for limit, _ in bands if limit is not None]
+            self._thresholds[field] = (bounds, [texts for _, texts in bands])
+
+    def _match_pattern(self, field, value):
+        regex, texts = self._patterns[field]
+        best = None
+        for match in regex.finditer(value.lower()):
+            tier = int(match.lastgroup[1:])
+            if best is None or tier < best:
+                best = tier
+                if best == 0:
+                    break
+        return [texts[best]] if best is not None else []
+
+    def recommend(self, sysinfo: dict, main_score: float):
+        values = dict(sysinfo, main_score=main_score)
+        recommendations = []
+        for field in self._order:
+            value = values.get(field)
+            if field in self._patterns:
+                recommendations += self._match_pattern(field, value or "")
+            elif field in self._exact:
+                text = self._exact[field].get((value or "").lower())
+                if text:
+                    recommendations.append(text)
+            elif field in self._thresholds:
+                bounds, texts = self._thresholds[field]
+                recommendations += texts[bisect_right(bounds, value or 0)]
+        return recommendations + self._general
+
+engine = RecommendationEngine(PATTERN_RULES, EXACT_RULES, THRESHOLD_RULES, GENERAL_RECOMMENDATIONS, RULE_ORDER)
+
+def recommend(sysinfo: dict, main_score: float):
+    """Lista de recomendaciones para un equipo, compartida por el PDF y la API JSON"""
+    return engine.recommend(sysinfo, main_score)
@@ -0,0 +1,156 @@
+# backend/replica.py
+import os
+import threading
+import time
+from datetime import timezone
+from fastapi import Request
+from sqlalchemy import func
+from database import SessionLocal, ReplicaSessionLocal, DashboardEvent
+from shared_metrics import shared_metrics
+
+# Retraso máximo de la réplica (segundos); por encima, las lecturas van a la primaria
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+# Cada cuántos segundos se vuelve a medir el retraso
+REPLICA_LAG_CHECK = float(os.getenv("REPLICA_LAG_CHECK", "1"))
+# Segundos tras una escritura propia en los que el cliente lee siempre de la primaria
+REPLICA_STICKY = float(os.getenv("REPLICA_STICKY", "5"))
+
+# Instante de la última escritura del cliente: cookie para navegadores, cabecera para las apps
+LAST_WRITE_COOKIE = "atp_last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+class ReadRouter:
+    """
+    Reparte las sesiones de los endpoints de lectura entre la réplica y la primaria.
+
+    El retraso se mide comparando datos, no relojes de replicación: la réplica contiene
+    todo lo escrito antes del primer dashboard_event de la primaria que todavía le falta (o, si
+    no le falta ninguno, antes del inicio de la medición). Cada alta, borrado o lote importado
+    inserta su evento en la misma transacción, y su created_at es la hora de la escritura (el
+    de los análisis importados puede ser de hace años). Un cliente lee de la primaria si
+    la réplica va retrasada más de max_lag, si no responde, o si su última escritura es
+    más reciente que lo que la réplica ya contiene (read-your-writes).
+    """
+
+    def __init__(self, primary, replica, max_lag: float, check_interval: float, sticky: float):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky = sticky
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._fresh_until = None  # epoch: la réplica tiene todo lo escrito antes de este instante
+        self.healthy = False
+        self.last_error = None
+        self.replica_reads = shared_metrics.counter("replica.reads.replica")
+        self.primary_reads = shared_metrics.counter("replica.reads.primary")
+        self.lag_fallbacks = shared_metrics.counter("replica.fallbacks.lag")
+        self.own_write_fallbacks = shared_metrics.counter("replica.fallbacks.own_write")
+
+    @property
+    def enabled(self):
+        return self.replica is not None
+
+    def lag(self):
+        if self._fresh_until is None:
+            return None
+        return max(0.0, time.time() - self._fresh_until)
+
+    def _refresh(self):
+        """Mide el retraso como mucho cada check_interval segundos; las demás peticiones no esperan"""
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            started = time.time()
+            replica, primary = self.replica(), self.primary()
+            try:
+                replica_max = replica.query(func.max(DashboardEvent.id)).scalar() or 0
+                oldest_missing = primary.query(func.min(DashboardEvent.created_at)) \
+                    .filter(DashboardEvent.id > replica_max).scalar()
+            finally:
+                replica.close()
+                primary.close()
+            # created_at se guarda en UTC sin zona horaria
+            self._fresh_until = started if oldest_missing is None else \
+                min(started, oldest_missing.replace(tzinfo=timezone.utc).timestamp())
+            self.healthy = True
+            self.last_error = None
+        except Exception as e:
+            self.healthy = False
+            self.last_error = str(e)[:300]
+        finally:
+            self._checked_at = time.monotonic()
+            self._lock.release()
+
+    def last_write(self, request: Request):
+        value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+
+    def use_replica(self, request: Request):
+        if not self.enabled:
+            return False
+        self._refresh()
+        lag = self.lag()
+        if not self.healthy or lag is None or lag > self.max_lag:
+            self.lag_fallbacks.add()
+            return False
+        written = self.last_write(request)
+        if written is not None and (time.time() - written < self.sticky or written >= self._fresh_until):
+            self.own_write_fallbacks.add()
+            return False
+        return True
+
+    def session(self, request: Request):
+        if self.use_replica(request):
+            self.replica_reads.add()
+            db = self.replica()
+            db.info["replica"] = True
+            return db
+        self.primary_reads.add()
+        return self.primary()
+
+    @staticmethod
+    def on_replica(db):
+        return db.info.get("replica", False)
+
+    def write_stamp(self):
+        """Instante de una escritura tal como lo espera LAST_WRITE_HEADER (None sin réplica)"""
+        return f"{time.time():.3f}" if self.enabled else None
+
+    def mark_write(self, response):
+        """Anota en la respuesta el instante de la escritura para que el cliente lea lo que escribió"""
+        if not self.enabled:
+            return
+        value = self.write_stamp()
+        response.set_cookie(LAST_WRITE_COOKIE, value, max_age=int(max(self.sticky, self.max_lag)) + 60,
+                            httponly=True, samesite="lax")
+        response.headers[LAST_WRITE_HEADER] = value
+
+    def snapshot(self):
+        lag = self.lag()
+        return {
+            "enabled": self.enabled,
+            "healthy": self.healthy if self.enabled else None,
+            "lag_seconds": round(lag, 3) if lag is not None else None,
+            "max_lag_seconds": self.max_lag,
+            "last_error": self.last_error,
+            "reads": {"replica": int(self.replica_reads.total()), "primary": int(self.primary_reads.total())},
+            "fallbacks": {"lag": int(self.lag_fallbacks.total()), "own_write": int(self.own_write_fallbacks.total())},
+        }
+
+# Instancia global del proceso
+read_router = ReadRouter(SessionLocal, ReplicaSessionLocal, REPLICA_MAX_LAG, REPLICA_LAG_CHECK, REPLICA_STICKY)
+
+def get_read_db(request: Request):
+    """Dependencia de los endpoints de solo lectura: réplica si está al día, primaria si no"""
+    db = read_router.session(request)
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,110 @@
+# backend/report_cache.py
+import os
+import threading
+from collections import OrderedDict
+from shared_metrics import shared_metrics
+
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "report_cache")
+REPORT_CACHE_MAX_MB = float(os.getenv("REPORT_CACHE_MAX_MB", "256"))
+
+class DiskLRUCache:
+    """
+    Caché LRU en disco limitada por tamaño total.
+    El orden de uso se mantiene en memoria y se persiste en el mtime de cada fichero,
+    así sobrevive a reinicios sin necesidad de un índice aparte.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # nombre de fichero -> tamaño, del menos al más reciente
+        self._size = 0
+        self.hits = shared_metrics.counter("report_cache.hits")
+        self.misses = shared_metrics.counter("report_cache.misses")
+        self._load()
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._size += size
+        with self._lock:
+            self._evict()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, name: str):
+        with self._lock:
+            if name not in self._entries and not self._adopt(name):
+                self.misses.add()
+                return None
+            self._entries.move_to_end(name)
+            self.hits.add()
+        try:
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+            os.utime(self._path(name))
+            return data
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._entries.pop(name, 0)
+            return None
+
+    def put(self, name: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        # Escritura atómica: nunca se sirve un fichero a medio escribir
+        tmp = self._path(f"{name}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(name))
+        with self._lock:
+            self._size -= self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._size += len(data)
+            self._evict()
+
+    def _adopt(self, name):
+        """Incorpora al índice un fichero que escribió otro worker del mismo directorio"""
+        try:
+            size = os.path.getsize(self._path(name))
+        except OSError:
+            return False
+        self._entries[name] = size
+        self._size += size
+        return True
+
+    def discard_prefix(self, prefix: str):
+        """Elimina todas las entradas cuyo nombre empieza por prefix (también las de otros workers)"""
+        with self._lock:
+            for name in [name for name in self._entries if name.startswith(prefix)]:
+                self._size -= self._entries.pop(name)
+            for entry in os.scandir(self.directory):
+                if entry.name.startswith(prefix) and not entry.name.endswith(".tmp"):
+                    self._remove_file(entry.name)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                    "hits": int(self.hits.total()), "misses": int(self.misses.total())}
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self._size -= size
+            self._remove_file(name)
+
+    def _remove_file(self, name):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+report_cache = DiskLRUCache(REPORT_CACHE_DIR, int(REPORT_CACHE_MAX_MB * 1024 * 1024))
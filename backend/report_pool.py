@@ -0,0 +1,85 @@
+# backend/report_pool.py
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# Procesos dedicados al renderizado por worker de la API (0 = renderizar en el propio proceso);
+# por defecto los núcleos se reparten entre los WEB_CONCURRENCY workers que fija server.py
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(max(1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1"))))))
+# Informes como máximo en cola o en curso antes de rechazar nuevos
+PDF_QUEUE_SIZE = int(os.getenv("PDF_QUEUE_SIZE", str(max(PDF_WORKERS, 1) * 4)))
+# Segundos que se espera por un hueco en la cola
+PDF_QUEUE_TIMEOUT = float(os.getenv("PDF_QUEUE_TIMEOUT", "30"))
+
+class ReportQueueFull(Exception):
+    pass
+
+def render_pdf_report(sysinfo: dict, result: dict, analysis_id: int) -> bytes:
+    """Punto de entrada de los workers: FPDF se importa con el primer informe, no al arrancar la API"""
+    from pdf_report import render_pdf_report as render
+    return render(sysinfo, result, analysis_id)
+
+class ReportRenderer:
+    """
+    Pool de procesos para FPDF, que es CPU puro y no suelta el GIL.
+    Recibe dicts planos y devuelve los bytes del PDF; cada worker conserva
+    su propia caché de bloques estáticos entre informes.
+    """
+
+    def __init__(self, workers: int, queue_size: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: los workers no heredan hilos ni conexiones del servidor
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def submit(self, sysinfo: dict, result: dict, analysis_id: int):
+        """Encola un informe; lanza ReportQueueFull si no hay hueco en queue_timeout segundos"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise ReportQueueFull("Cola de renderizado de informes llena")
+        try:
+            if self.workers <= 0:
+                future = _completed(render_pdf_report, sysinfo, result, analysis_id)
+            else:
+                future = self._pool().submit(render_pdf_report, sysinfo, result, analysis_id)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def render(self, sysinfo: dict, result: dict, analysis_id: int) -> bytes:
+        return self.submit(sysinfo, result, analysis_id).result()
+
+    def render_many(self, jobs):
+        """Renderiza [(sysinfo, result, analysis_id)] en paralelo, respetando el límite de la cola"""
+        futures = [self.submit(*job) for job in jobs]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+def _completed(fn, *args):
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except BaseException as e:
+        future.set_exception(e)
+    return future
+
+report_renderer = ReportRenderer(PDF_WORKERS, PDF_QUEUE_SIZE, PDF_QUEUE_TIMEOUT)
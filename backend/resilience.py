@@ -0,0 +1,97 @@
+# backend/resilience.py
+import random
+import threading
+import time
+
+class DeadlineExceeded(Exception):
+    pass
+
+class CircuitOpen(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    closed -> open tras failure_threshold fallos seguidos; open -> half-open pasados
+    reset_timeout segundos, donde una única llamada de prueba decide si se vuelve a cerrar.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """True si la llamada puede intentarse; en half-open solo deja pasar una prueba a la vez"""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                # Una prueba fallida vuelve a abrir el circuito con el temporizador reiniciado
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self._state(), "consecutive_failures": self._failures, "rejected": self.rejected}
+
+def backoff_delay(attempt: int, base: float, cap: float):
+    """Backoff exponencial con full jitter: uniforme en [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def call_with_retries(fn, deadline: float, is_retryable, max_attempts: int, base_delay: float, max_delay: float,
+                      retry_after=None):
+    """
+    Llama a fn(timeout) reintentando los errores transitorios sin pasarse de deadline
+    (instante de time.monotonic()). fn recibe los segundos que quedan para acotar su propia llamada.
+    retry_after(exc) puede imponer una espera mínima, p. ej. la que pide un 429.
+    """
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("Plazo agotado")
+        try:
+            return fn(remaining)
+        except Exception as e:
+            attempt += 1
+            if not is_retryable(e) or attempt >= max_attempts:
+                raise
+            delay = backoff_delay(attempt - 1, base_delay, max_delay)
+            if retry_after is not None:
+                delay = max(delay, retry_after(e) or 0)
+            if time.monotonic() + delay >= deadline:
+                # No da tiempo a otro intento: mejor fallar ya que agotar el plazo esperando
+                raise DeadlineExceeded(f"Plazo agotado tras {attempt} intentos: {e}") from e
+            time.sleep(delay)
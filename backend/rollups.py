@@ -0,0 +1,343 @@
+# backend/rollups.py
+import itertools
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, case, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from database import SystemAnalysis, AnalysisRollup, AnalysisRollupProfile
+from archive import analysis_archive
+
+# Columnas que se leen de los meses archivados para reconstruir sus buckets
+ARCHIVED_COLUMNS = ("created_at", "main_profile", "main_score")
+
+GRANULARITIES = ("hour", "day")
+
+def bucket_start(ts: datetime, granularity: str):
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def bucket_end(start: datetime, granularity: str):
+    return start + (timedelta(hours=1) if granularity == "hour" else timedelta(days=1))
+
+def _increment(db, model, filters, values, new_row):
+    """
+    UPDATE atómico del bucket; si aún no existe se inserta dentro de un savepoint.
+    Si otro worker lo crea a la vez, el INSERT falla por la restricción única y se repite el UPDATE.
+    """
+    if db.query(model).filter_by(**filters).update(values, synchronize_session=False):
+        return
+    try:
+        with db.begin_nested():
+            db.add(model(**filters, **new_row))
+    except IntegrityError:
+        db.query(model).filter_by(**filters).update(values, synchronize_session=False)
+
+def record_analysis(db, analysis):
+    """Suma un análisis recién insertado a sus buckets (misma transacción que el INSERT)"""
+    score = analysis.main_score
+    for granularity in GRANULARITIES:
+        start = bucket_start(analysis.created_at, granularity)
+
+        _increment(
+            db, AnalysisRollup,
+            {"granularity": granularity, "bucket_start": start},
+            {
+                AnalysisRollup.count: AnalysisRollup.count + 1,
+                AnalysisRollup.score_sum: AnalysisRollup.score_sum + score,
+                AnalysisRollup.score_min: case((AnalysisRollup.score_min > score, score), else_=AnalysisRollup.score_min),
+                AnalysisRollup.score_max: case((AnalysisRollup.score_max < score, score), else_=AnalysisRollup.score_max),
+            },
+            {"count": 1, "score_sum": score, "score_min": score, "score_max": score}
+        )
+        _increment(
+            db, AnalysisRollupProfile,
+            {"granularity": granularity, "bucket_start": start, "main_profile": analysis.main_profile},
+            {AnalysisRollupProfile.count: AnalysisRollupProfile.count + 1},
+            {"count": 1}
+        )
+
+def record_batch(db, analyses):
+    """
+    Suma un lote de análisis recién insertados (dicts con created_at, main_profile y main_score):
+    se agregan primero en memoria y se aplican con un UPDATE múltiple para los buckets que ya
+    existen y un INSERT múltiple para los nuevos, no una sentencia por análisis
+    """
+    buckets = {}
+    profiles = Counter()
+    for analysis in analyses:
+        score = analysis["main_score"]
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(analysis["created_at"], granularity))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [1, score, score, score]
+            else:
+                bucket[0] += 1
+                bucket[1] += score
+                bucket[2] = min(bucket[2], score)
+                bucket[3] = max(bucket[3], score)
+            profiles[key + (analysis["main_profile"],)] += 1
+    if not buckets:
+        return
+
+    try:
+        with db.begin_nested():
+            _apply_batch(db, buckets, profiles)
+    except IntegrityError:
+        # Otro worker creó a la vez alguno de los buckets: se aplican uno a uno
+        for (granularity, start), (count, total, low, high) in buckets.items():
+            _increment(
+                db, AnalysisRollup,
+                {"granularity": granularity, "bucket_start": start},
+                {
+                    AnalysisRollup.count: AnalysisRollup.count + count,
+                    AnalysisRollup.score_sum: AnalysisRollup.score_sum + total,
+                    AnalysisRollup.score_min: case((AnalysisRollup.score_min > low, low), else_=AnalysisRollup.score_min),
+                    AnalysisRollup.score_max: case((AnalysisRollup.score_max < high, high), else_=AnalysisRollup.score_max),
+                },
+                {"count": count, "score_sum": total, "score_min": low, "score_max": high}
+            )
+        for (granularity, start, profile), count in profiles.items():
+            _increment(
+                db, AnalysisRollupProfile,
+                {"granularity": granularity, "bucket_start": start, "main_profile": profile},
+                {AnalysisRollupProfile.count: AnalysisRollupProfile.count + count},
+                {"count": count}
+            )
+
+def _existing_keys(db, columns, keys):
+    """Claves de la tabla dentro del rango de bucket_start del lote, por granularidad"""
+    existing = set()
+    for granularity in {key[0] for key in keys}:
+        starts = [key[1] for key in keys if key[0] == granularity]
+        existing.update(tuple(row) for row in db.query(*columns).filter(
+            columns[0] == granularity, columns[1] >= min(starts), columns[1] <= max(starts)
+        ))
+    return existing
+
+def _apply_batch(db, buckets, profiles):
+    rollups, rollup_profiles = AnalysisRollup.__table__, AnalysisRollupProfile.__table__
+
+    existing = _existing_keys(db, (AnalysisRollup.granularity, AnalysisRollup.bucket_start), buckets)
+    low, high = bindparam("b_min"), bindparam("b_max")
+    updates = [
+        {"b_granularity": g, "b_start": start, "b_count": c, "b_sum": total, "b_min": lo, "b_max": hi}
+        for (g, start), (c, total, lo, hi) in buckets.items() if (g, start) in existing
+    ]
+    if updates:
+        db.connection().execute(
+            update(rollups)
+            .where(rollups.c.granularity == bindparam("b_granularity"), rollups.c.bucket_start == bindparam("b_start"))
+            .values(
+                count=rollups.c.count + bindparam("b_count"),
+                score_sum=rollups.c.score_sum + bindparam("b_sum"),
+                score_min=case((rollups.c.score_min > low, low), else_=rollups.c.score_min),
+                score_max=case((rollups.c.score_max < high, high), else_=rollups.c.score_max),
+            ),
+            updates
+        )
+    inserts = [
+        {"granularity": g, "bucket_start": start, "count": c, "score_sum": total, "score_min": lo, "score_max": hi}
+        for (g, start), (c, total, lo, hi) in buckets.items() if (g, start) not in existing
+    ]
+    if inserts:
+        db.connection().execute(insert(rollups), inserts)
+
+    existing = _existing_keys(
+        db, (AnalysisRollupProfile.granularity, AnalysisRollupProfile.bucket_start, AnalysisRollupProfile.main_profile),
+        profiles
+    )
+    updates = [
+        {"b_granularity": g, "b_start": start, "b_profile": profile, "b_count": c}
+        for (g, start, profile), c in profiles.items() if (g, start, profile) in existing
+    ]
+    if updates:
+        db.connection().execute(
+            update(rollup_profiles)
+            .where(
+                rollup_profiles.c.granularity == bindparam("b_granularity"),
+                rollup_profiles.c.bucket_start == bindparam("b_start"),
+                rollup_profiles.c.main_profile == bindparam("b_profile"),
+            )
+            .values(count=rollup_profiles.c.count + bindparam("b_count")),
+            updates
+        )
+    inserts = [
+        {"granularity": g, "bucket_start": start, "main_profile": profile, "count": c}
+        for (g, start, profile), c in profiles.items() if (g, start, profile) not in existing
+    ]
+    if inserts:
+        db.connection().execute(insert(rollup_profiles), inserts)
+
+def refresh_buckets(db, created_at: datetime):
+    """
+    Recalcula desde la tabla de análisis (y el archivo) los buckets que contienen created_at.
+    Se usa tras un borrado, donde el mínimo y el máximo no se pueden descontar.
+    """
+    for granularity in GRANULARITIES:
+        start = bucket_start(created_at, granularity)
+        end = bucket_end(start, granularity)
+        in_bucket = (
+            SystemAnalysis.created_at >= start,
+            SystemAnalysis.created_at < end,
+        )
+
+        db.query(AnalysisRollup).filter_by(granularity=granularity, bucket_start=start).delete(synchronize_session=False)
+        db.query(AnalysisRollupProfile).filter_by(granularity=granularity, bucket_start=start).delete(synchronize_session=False)
+
+        count, score_sum, score_min, score_max = db.query(
+            func.count(SystemAnalysis.id), func.sum(SystemAnalysis.main_score),
+            func.min(SystemAnalysis.main_score), func.max(SystemAnalysis.main_score)
+        ).filter(*in_bucket).one()
+        profile_counts = Counter(dict(
+            db.query(SystemAnalysis.main_profile, func.count(SystemAnalysis.id)).filter(*in_bucket).group_by(SystemAnalysis.main_profile).all()
+        ))
+
+        for _, profile, score in analysis_archive.scan(db, ARCHIVED_COLUMNS, start, end):
+            if score is None:
+                continue
+            count += 1
+            score_sum = (score_sum or 0.0) + score
+            score_min = score if score_min is None else min(score_min, score)
+            score_max = score if score_max is None else max(score_max, score)
+            profile_counts[profile] += 1
+        if not count:
+            continue
+
+        db.add(AnalysisRollup(
+            granularity=granularity, bucket_start=start, count=count,
+            score_sum=score_sum, score_min=score_min, score_max=score_max
+        ))
+        for profile, profile_count in profile_counts.items():
+            db.add(AnalysisRollupProfile(granularity=granularity, bucket_start=start, main_profile=profile, count=profile_count))
+    db.commit()
+
+def rebuild_rollups(db, batch_size: int = 10000):
+    """
+    Compactación completa: borra y recalcula todos los buckets recorriendo
+    los análisis en streaming (memoria proporcional al número de buckets, no de filas).
+    Incluye los meses archivados para no perder su histórico.
+    """
+    buckets = {}
+    profiles = {}
+    rows = db.query(SystemAnalysis.created_at, SystemAnalysis.main_profile, SystemAnalysis.main_score) \
+        .filter(SystemAnalysis.created_at.isnot(None), SystemAnalysis.main_score.isnot(None)) \
+        .yield_per(batch_size)
+    archived = (row for row in analysis_archive.scan(db, ARCHIVED_COLUMNS) if row[0] is not None and row[2] is not None)
+
+    for created_at, profile, score in itertools.chain(archived, rows):
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(created_at, granularity))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [1, score, score, score]
+            else:
+                bucket[0] += 1
+                bucket[1] += score
+                bucket[2] = min(bucket[2], score)
+                bucket[3] = max(bucket[3], score)
+            profile_key = key + (profile,)
+            profiles[profile_key] = profiles.get(profile_key, 0) + 1
+
+    db.query(AnalysisRollupProfile).delete(synchronize_session=False)
+    db.query(AnalysisRollup).delete(synchronize_session=False)
+    db.bulk_insert_mappings(AnalysisRollup, [
+        {"granularity": g, "bucket_start": start, "count": c, "score_sum": total, "score_min": lo, "score_max": hi}
+        for (g, start), (c, total, lo, hi) in buckets.items()
+    ])
+    db.bulk_insert_mappings(AnalysisRollupProfile, [
+        {"granularity": g, "bucket_start": start, "main_profile": profile, "count": c}
+        for (g, start, profile), c in profiles.items()
+    ])
+    db.commit()
+    return len(buckets)
+
+def get_timeseries(db, granularity: str, limit: int):
+    """
+    Últimos `limit` buckets. "month" se obtiene sumando los buckets diarios,
+    así el coste depende del número de buckets pedidos y no del histórico.
+    """
+    source = "day" if granularity == "month" else granularity
+    if granularity == "month":
+        today = datetime.utcnow()
+        first = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        for _ in range(limit - 1):
+            first = (first - timedelta(days=1)).replace(day=1)
+        rollups = db.query(AnalysisRollup).filter(
+            AnalysisRollup.granularity == "day", AnalysisRollup.bucket_start >= first
+        ).order_by(AnalysisRollup.bucket_start).all()
+    else:
+        rollups = db.query(AnalysisRollup).filter(AnalysisRollup.granularity == source) \
+            .order_by(AnalysisRollup.bucket_start.desc()).limit(limit).all()[::-1]
+
+    return _points(db, granularity, rollups)
+
+def get_buckets(db, granularity: str, starts):
+    """
+    Puntos (con el formato de get_timeseries) de los buckets indicados; los que ya no
+    tienen análisis se devuelven con count 0 para que quien los pinta pueda quitarlos
+    """
+    starts = sorted(set(starts))
+    if not starts:
+        return []
+    if granularity == "month":
+        rollups = []
+        for first in starts:
+            following = (first + timedelta(days=32)).replace(day=1)
+            rollups += db.query(AnalysisRollup).filter(
+                AnalysisRollup.granularity == "day",
+                AnalysisRollup.bucket_start >= first, AnalysisRollup.bucket_start < following
+            ).order_by(AnalysisRollup.bucket_start).all()
+    else:
+        rollups = db.query(AnalysisRollup).filter(
+            AnalysisRollup.granularity == granularity, AnalysisRollup.bucket_start.in_(starts)
+        ).order_by(AnalysisRollup.bucket_start).all()
+
+    points = {point["bucket_start"]: point for point in _points(db, granularity, rollups)}
+    return [
+        points.get(start.isoformat()) or {
+            "bucket_start": start.isoformat(), "count": 0, "avg_score": 0.0,
+            "min_score": None, "max_score": None, "profiles": {},
+        }
+        for start in starts
+    ]
+
+def _points(db, granularity: str, rollups):
+    """Agrupa filas de rollup ordenadas en puntos de la serie, con su reparto por perfil"""
+    if not rollups:
+        return []
+    source = "day" if granularity == "month" else granularity
+
+    profile_rows = db.query(AnalysisRollupProfile).filter(
+        AnalysisRollupProfile.granularity == source,
+        AnalysisRollupProfile.bucket_start >= rollups[0].bucket_start,
+        AnalysisRollupProfile.bucket_start <= rollups[-1].bucket_start
+    ).all()
+
+    def key_of(ts):
+        return ts.replace(day=1) if granularity == "month" else ts
+
+    series = {}
+    for r in rollups:
+        point = series.setdefault(key_of(r.bucket_start), {"count": 0, "score_sum": 0.0, "score_min": None, "score_max": None, "profiles": {}})
+        point["count"] += r.count
+        point["score_sum"] += r.score_sum
+        point["score_min"] = r.score_min if point["score_min"] is None else min(point["score_min"], r.score_min)
+        point["score_max"] = r.score_max if point["score_max"] is None else max(point["score_max"], r.score_max)
+    for p in profile_rows:
+        point = series.get(key_of(p.bucket_start))
+        if point is not None:
+            point["profiles"][p.main_profile] = point["profiles"].get(p.main_profile, 0) + p.count
+
+    return [
+        {
+            "bucket_start": start.isoformat(),
+            "count": point["count"],
+            "avg_score": round(point["score_sum"] / point["count"], 1) if point["count"] else 0.0,
+            "min_score": point["score_min"],
+            "max_score": point["score_max"],
+            "profiles": point["profiles"],
+        }
+        for start, point in sorted(series.items())
+    ]
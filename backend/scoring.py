@@ -0,0 +1,146 @@
+# backend/scoring.py
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Orden de las columnas de la matriz de pesos
+FEATURES = ("cpu", "ram", "gpu", "disk")
+
+SCORING_CONFIG = os.getenv("SCORING_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_profiles.json"))
+
+# Cada cuánto se comprueba si el fichero de configuración ha cambiado
+RELOAD_INTERVAL = float(os.getenv("SCORING_RELOAD_INTERVAL", "2"))
+
+class ScoringModel:
+    """
+    Configuración de perfiles compilada e inmutable.
+    Cada fila de la matriz guarda sus términos (columna, peso) en el orden del fichero,
+    así la suma en coma flotante coincide exactamente con la fórmula escrita a mano.
+    """
+
+    def __init__(self, config: dict, version: str):
+        self.version = version
+        caps = config["normalization"]
+        self.caps = (float(caps["cpu"]), float(caps["ram"]), float(caps["gpu"]))
+
+        disk = config["disk"]
+        self.disk_exact = {k.lower(): float(v) for k, v in disk.get("exact", {}).items()}
+        self.disk_contains = [(k.lower(), float(v)) for k, v in disk.get("contains", {}).items()]
+        self.disk_default = float(disk["default"])
+
+        self.profiles = list(config["profiles"])
+        if not self.profiles:
+            raise ValueError("La configuración no define ningún perfil")
+        self.matrix = []
+        for name in self.profiles:
+            weights = config["profiles"][name]
+            unknown = set(weights) - set(FEATURES)
+            if unknown:
+                raise ValueError(f"Perfil {name}: variables desconocidas {sorted(unknown)}")
+            self.matrix.append(tuple((FEATURES.index(feature), float(w)) for feature, w in weights.items()))
+
+    def normalize(self, info: dict):
+        """Vector normalizado (cpu, ram, gpu, disco) en el rango 0-1"""
+        cpu = info.get('cpu_speed_ghz', 1.0) * info.get('cores', 1)
+        ram = info.get('ram_gb', 1.0)
+        gpu = info.get('gpu_vram_gb', 0.0)
+
+        disk_type = info.get('disk_type', '').lower()
+        disk = self.disk_exact.get(disk_type)
+        if disk is None:
+            disk = next((v for pattern, v in self.disk_contains if pattern in disk_type), self.disk_default)
+
+        cpu_cap, ram_cap, gpu_cap = self.caps
+        return min(cpu / cpu_cap, 1.0), min(ram / ram_cap, 1.0), min(gpu / gpu_cap, 1.0), disk
+
+    def _rank(self, info: dict):
+        """(puntuaciones por perfil, índice del mejor) de una fila"""
+        vector = self.normalize(info)
+
+        # Producto matriz-vector: una puntuación por perfil.
+        # Acumulación explícita: sum() usa suma compensada desde Python 3.12 y cambiaría el redondeo
+        scores = []
+        for row in self.matrix:
+            total = 0.0
+            for i, w in row:
+                total += w * vector[i]
+            scores.append(total)
+        best = max(range(len(scores)), key=lambda i: (scores[i], -i))
+        return scores, best
+
+    def score(self, info: dict):
+        scores, best = self._rank(info)
+        return {
+            "scores": dict(zip(self.profiles, scores)),
+            "main_profile": self.profiles[best],
+            "main_score": round(scores[best] * 100, 1),
+            "scoring_version": self.version
+        }
+
+    def score_batch(self, infos):
+        """[(perfil principal, puntuación)] de un lote, sin el dict de puntuaciones por perfil de score()"""
+        rank, profiles = self._rank, self.profiles
+        results = []
+        for info in infos:
+            scores, best = rank(info)
+            results.append((profiles[best], round(scores[best] * 100, 1)))
+        return results
+
+class ScoringModels:
+    """Mantiene el modelo vigente y lo recarga en caliente cuando cambia el fichero"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._model = None
+        self._mtime = None
+        self._next_check = 0.0
+
+    def current(self):
+        if self._model is None or time.monotonic() >= self._next_check:
+            self._maybe_reload()
+        return self._model
+
+    def reload(self):
+        """Fuerza la recarga; si el fichero no es válido lanza la excepción y se mantiene el modelo anterior"""
+        with self._lock:
+            self._load(force=True)
+        return self._model
+
+    def _maybe_reload(self):
+        with self._lock:
+            if self._model is not None and time.monotonic() < self._next_check:
+                return
+            self._load(force=False)
+
+    def _load(self, force):
+        self._next_check = time.monotonic() + RELOAD_INTERVAL
+        mtime = None
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if not force and self._model is not None and mtime == self._mtime:
+                return
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            config = json.loads(raw)
+            version = f"{config.get('version', '0')}-{hashlib.sha1(raw).hexdigest()[:8]}"
+            if self._model is not None and self._model.version == version:
+                self._mtime = mtime
+                return
+            model = ScoringModel(config, version)
+        except Exception as e:
+            if self._model is None or force:
+                raise
+            print(f"⚠️ Configuración de scoring no válida, se mantiene {self._model.version}: {e}")
+            # No volver a avisar hasta que el fichero cambie de nuevo
+            self._mtime = mtime
+            return
+
+        # Sustitución atómica: las peticiones en curso siguen con el modelo que ya tenían
+        self._model = model
+        self._mtime = mtime
+        print(f"✅ Perfiles de scoring cargados: versión {version}")
+
+scoring_models = ScoringModels(SCORING_CONFIG)
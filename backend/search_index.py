@@ -0,0 +1,123 @@
+# backend/search_index.py
+import re
+from sqlalchemy import text
+from database import engine
+
+# Tabla virtual FTS5 (SQLite) e índice GIN sobre tsvector (Postgres)
+FTS_TABLE = "system_analyses_fts"
+PG_TSVECTOR = "to_tsvector('simple', coalesce(cpu_model, '') || ' ' || coalesce(gpu_model, ''))"
+
+# Tokens alfanuméricos (incluye acentos); el resto se trata como separador
+TOKEN_RE = re.compile(r"[0-9a-zA-ZÀ-ſ]+")
+
+def _is_sqlite():
+    return engine.dialect.name == "sqlite"
+
+def create_search_index():
+    """
+    Crear el índice de búsqueda sobre cpu_model y gpu_model si no existe
+    """
+    with engine.begin() as conn:
+        if _is_sqlite():
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first()
+
+            # Tabla de contenido externo: el texto vive en system_analyses, FTS5 solo guarda el índice
+            conn.execute(text(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                    cpu_model, gpu_model,
+                    content='system_analyses', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+                )
+            """))
+
+            # Triggers para mantener el índice sincronizado con cada INSERT/UPDATE/DELETE
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS system_analyses_fts_ai AFTER INSERT ON system_analyses BEGIN
+                    INSERT INTO {FTS_TABLE}(rowid, cpu_model, gpu_model) VALUES (new.id, new.cpu_model, new.gpu_model);
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS system_analyses_fts_ad AFTER DELETE ON system_analyses BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, cpu_model, gpu_model) VALUES ('delete', old.id, old.cpu_model, old.gpu_model);
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS system_analyses_fts_au AFTER UPDATE ON system_analyses BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, cpu_model, gpu_model) VALUES ('delete', old.id, old.cpu_model, old.gpu_model);
+                    INSERT INTO {FTS_TABLE}(rowid, cpu_model, gpu_model) VALUES (new.id, new.cpu_model, new.gpu_model);
+                END
+            """))
+
+            # Indexar las filas que ya existían antes de crear la tabla FTS
+            if not existed:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                print("✅ Índice FTS5 construido")
+        else:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_system_analyses_hw_tsv ON system_analyses USING gin ({PG_TSVECTOR})"
+            ))
+
+def parse_query(q: str):
+    """
+    Normaliza la consulta en tokens de prefijo: "RTX 30xx" -> ["rtx", "30"]
+    """
+    tokens = []
+    for token in TOKEN_RE.findall(q.lower()):
+        # "30xx", "40x0"... se interpretan como prefijo numérico
+        if any(c.isdigit() for c in token):
+            token = re.sub(r"x+0*$", "", token) or token
+        tokens.append(token)
+    return tokens
+
+def search_analyses(db, q: str, limit: int = 20, offset: int = 0):
+    """
+    Devuelve [(id interno, rank)] ordenados por relevancia.
+    Se piden limit + 1 filas para saber si hay más páginas sin hacer COUNT(*)
+    """
+    tokens = parse_query(q)
+    if not tokens:
+        return [], False
+
+    if _is_sqlite():
+        match = " ".join(f'"{t}"*' for t in tokens)
+        rows = db.execute(text(f"""
+            SELECT rowid, bm25({FTS_TABLE}) AS rank
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH :match
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        """), {"match": match, "limit": limit + 1, "offset": offset}).all()
+        # bm25 devuelve valores negativos (más negativo = más relevante)
+        results = [(row[0], round(-row[1], 4)) for row in rows]
+    else:
+        tsquery = " & ".join(f"{t}:*" for t in tokens)
+        rows = db.execute(text(f"""
+            SELECT id, ts_rank({PG_TSVECTOR}, to_tsquery('simple', :tsquery)) AS rank
+            FROM system_analyses
+            WHERE {PG_TSVECTOR} @@ to_tsquery('simple', :tsquery)
+            ORDER BY rank DESC, id DESC
+            LIMIT :limit OFFSET :offset
+        """), {"tsquery": tsquery, "limit": limit + 1, "offset": offset}).all()
+        results = [(row[0], round(row[1], 4)) for row in rows]
+
+    return results[:limit], len(results) > limit
+
+def count_analyses(db, q: str):
+    """
+    Número de análisis que encajan con la consulta (para paginar después de los resultados en vivo)
+    """
+    tokens = parse_query(q)
+    if not tokens:
+        return 0
+
+    if _is_sqlite():
+        match = " ".join(f'"{t}"*' for t in tokens)
+        return db.execute(text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"),
+                          {"match": match}).scalar()
+    tsquery = " & ".join(f"{t}:*" for t in tokens)
+    return db.execute(text(f"""
+        SELECT count(*) FROM system_analyses WHERE {PG_TSVECTOR} @@ to_tsquery('simple', :tsquery)
+    """), {"tsquery": tsquery}).scalar()
@@ -0,0 +1,251 @@
+# backend/server.py
+"""
+Lanzador multi-worker (pre-fork) de la API.
+
+El proceso maestro importa la app una sola vez, abre el socket y hace fork de los workers,
+que comparten el código ya cargado y el socket de escucha. Cada worker ejecuta su propio
+uvicorn (con su startup) y se recicla de forma ordenada al servir MAX_REQUESTS peticiones;
+el maestro arranca su sustituto en la misma fila de contadores compartidos.
+
+Señales del maestro: SIGTERM/SIGINT paran todo con apagado ordenado, SIGHUP recicla los
+workers de uno en uno sin dejar de servir. Los sustitutos salen del código precargado en el
+maestro: para desplegar código nuevo hay que reiniciar el maestro.
+
+Uso (desde backend/):
+    python server.py --workers 4 --port 8000
+    WEB_CONCURRENCY=8 MAX_REQUESTS=5000 python server.py
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import sys
+import time
+import uvicorn
+import config  # noqa: F401  (.env antes de leer WEB_CONCURRENCY y compañía)
+
+# Workers por instancia (por defecto, uno por núcleo)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Peticiones que sirve un worker antes de reciclarse (0 = nunca) y variación aleatoria,
+# para que no se reinicien todos a la vez
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+# Segundos que se espera a las peticiones en curso al parar o reciclar un worker
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Un worker que muere antes de estos segundos cuenta como fallo de arranque
+MIN_WORKER_UPTIME = 5
+# Margen para las conexiones recién aceptadas entre dejar de escuchar y cerrar las inactivas
+DRAIN_GRACE = 0.5
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn cierra al apagarse las conexiones que aún no han enviado la petición; con el
+    socket compartido, una recién aceptada justo antes de dejar de escuchar se perdería.
+    Se deja de aceptar primero y se espera DRAIN_GRACE antes del apagado normal; los streams
+    SSE del dashboard se cierran antes (el navegador reconecta con otro worker).
+    """
+
+    async def shutdown(self, sockets=None):
+        from dashboard_events import dashboard_broadcast
+
+        for server in self.servers:
+            server.close()
+        await asyncio.sleep(DRAIN_GRACE)
+        # Los streams SSE no terminan solos: se cierran para no agotar GRACEFUL_TIMEOUT esperándolos
+        dashboard_broadcast.disconnect_all()
+        await super().shutdown(sockets)
+
+class Arbiter:
+    """Proceso maestro: mantiene N workers vivos, los recicla y reenvía las señales"""
+
+    def __init__(self, host: str, port: int, workers: int, max_requests: int,
+                 max_requests_jitter: int, graceful_timeout: float, log_level: str):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.log_level = log_level
+        self.children = {}  # pid -> (fila, instante de arranque)
+        self.stopping = False
+        self.reload_requested = False
+        self._crashes = 0
+
+    # -------------------------
+    #   MAESTRO
+    # -------------------------
+    def run(self):
+        self.socket = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(2048)
+        self.socket.set_inheritable(True)
+
+        # Precarga: la app y sus dependencias se importan antes del fork y se comparten
+        import main
+        from database import engine
+        from shared_metrics import shared_metrics
+        self.app = main.app
+        # Esquema y migraciones una sola vez; los workers heredan database_prepared
+        main.prepare_database()
+        engine.dispose()
+        self.metrics = shared_metrics
+        shared_metrics.enable(self.workers)
+        print(f"✅ Maestro {os.getpid()}: {self.workers} workers en http://{self.host}:{self.port}")
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_restart()
+            self.reap()
+            time.sleep(0.5)
+
+        self.shutdown()
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def spawn(self, slot: int):
+        self.metrics.reset_gauges(slot)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self.serve(slot)
+            except BaseException as e:
+                print(f"❌ Worker {os.getpid()} terminado con error: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self.children[pid] = (slot, time.monotonic())
+        return pid
+
+    def reap(self):
+        """Recoge los workers terminados y arranca sus sustitutos"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot, started = self.children.pop(pid, (None, None))
+            if slot is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0 and time.monotonic() - started < MIN_WORKER_UPTIME:
+                # Fallo de arranque: esperar más cada vez para no entrar en un bucle de forks
+                self._crashes += 1
+                time.sleep(min(30, 0.5 * 2 ** self._crashes))
+            else:
+                self._crashes = 0
+            print(f"🔄 Worker {pid} terminado ({code}); arrancando sustituto")
+            self.spawn(slot)
+
+    def _wait_exit(self, pid: int, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                return True
+            if done:
+                return True
+            time.sleep(0.1)
+        return False
+
+    def rolling_restart(self):
+        """Recicla los workers uno a uno: siempre quedan N-1 sirviendo"""
+        for pid, (slot, _) in list(self.children.items()):
+            if self.stopping:
+                return
+            os.kill(pid, signal.SIGTERM)
+            if not self._wait_exit(pid, self.graceful_timeout):
+                os.kill(pid, signal.SIGKILL)
+                self._wait_exit(pid, 5)
+            self.children.pop(pid, None)
+            self.spawn(slot)
+        print(f"🔄 {len(self.children)} workers reciclados")
+
+    def shutdown(self):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in list(self.children):
+            if not self._wait_exit(pid, max(0.0, deadline - time.monotonic())):
+                os.kill(pid, signal.SIGKILL)
+                self._wait_exit(pid, 5)
+        self.children.clear()
+        self.socket.close()
+        print("✅ Servidor detenido")
+
+    # -------------------------
+    #   WORKER
+    # -------------------------
+    def serve(self, slot: int):
+        from database import engine, replica_engine
+
+        # Señales del maestro fuera: uvicorn instala las suyas para el apagado ordenado
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        self.metrics.bind(slot)
+        # Conexiones del pool heredadas del maestro: se abandonan sin cerrarlas
+        engine.dispose(close=False)
+        if replica_engine is not None:
+            replica_engine.dispose(close=False)
+        random.seed()
+
+        limit = None
+        if self.max_requests > 0:
+            limit = self.max_requests + random.randint(0, max(self.max_requests_jitter, 0))
+        config = uvicorn.Config(
+            self.app,
+            log_level=self.log_level,
+            limit_max_requests=limit,
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+        DrainingServer(config).run(sockets=[self.socket])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # Los módulos de la app reparten sus pools (PDF_WORKERS) entre los workers
+    os.environ["WEB_CONCURRENCY"] = str(args.workers if hasattr(os, "fork") else 1)
+
+    if args.workers <= 1 or not hasattr(os, "fork"):
+        # Un solo proceso (o Windows, sin fork): uvicorn directamente
+        uvicorn.run("main:app", host=args.host, port=args.port, log_level=args.log_level,
+                    limit_max_requests=args.max_requests or None)
+        return
+
+    Arbiter(args.host, args.port, args.workers, args.max_requests, args.max_requests_jitter,
+            args.graceful_timeout, args.log_level).run()
+
+if __name__ == "__main__":
+    main()
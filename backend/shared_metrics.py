@@ -0,0 +1,158 @@
+# backend/shared_metrics.py
+import multiprocessing
+import threading
+import time
+
+class SharedCounter:
+    """Contador (o indicador) con nombre; cada worker escribe solo en su propia fila"""
+    __slots__ = ("_registry", "index", "name")
+
+    def __init__(self, registry, index: int, name: str):
+        self._registry = registry
+        self.index = index
+        self.name = name
+
+    def add(self, amount=1):
+        self._registry._add(self.index, amount)
+
+    def set(self, value):
+        self._registry._set(self.index, value)
+
+    @property
+    def value(self):
+        """Valor de este proceso"""
+        return self._registry._get(self.index)
+
+    def total(self):
+        """Suma de todos los workers de la instancia"""
+        return self._registry._total(self.index)
+
+class SharedRate:
+    """Eventos de los últimos window segundos en toda la instancia, en cubetas de un segundo"""
+
+    def __init__(self, registry, name: str, window: int = 60):
+        self.window = window
+        self._registry = registry
+        self._counts = [registry.gauge(f"{name}.{i}.count") for i in range(window)]
+        self._seconds = [registry.gauge(f"{name}.{i}.second") for i in range(window)]
+        self._lock = threading.Lock()
+
+    def mark(self):
+        now = int(time.time())
+        bucket = now % self.window
+        with self._lock:
+            if self._seconds[bucket].value != now:
+                self._seconds[bucket].set(now)
+                self._counts[bucket].set(0)
+            self._counts[bucket].add()
+
+    def total(self):
+        now = int(time.time())
+        registry = self._registry
+        return int(sum(
+            registry._row_value(slot, count.index)
+            for count, second in zip(self._counts, self._seconds)
+            for slot in registry.rows(count.index)
+            if now - registry._row_value(slot, second.index) < self.window
+        ))
+
+class SharedMetrics:
+    """
+    Registro de contadores agregables entre workers.
+
+    En un solo proceso son números locales. El lanzador multi-worker (server.py) llama a
+    enable() tras precargar la app y antes del fork: los contadores ya registrados pasan a
+    una matriz en memoria compartida con una fila por worker, y total() suma las filas.
+    Las filas de un worker reciclado conservan sus contadores (los totales no retroceden);
+    solo los indicadores (gauge) se ponen a cero al sustituirlo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {}
+        self._gauges = set()
+        self._local = []       # valores de este proceso (y de los nombres registrados tras enable)
+        self._array = None     # RawArray compartido: workers x width
+        self._width = 0
+        self._slot = 0
+        self.workers = 1
+
+    def _register(self, name: str, gauge: bool):
+        with self._lock:
+            index = self._index.get(name)
+            if index is None:
+                index = self._index[name] = len(self._local)
+                self._local.append(0.0)
+            if gauge:
+                self._gauges.add(index)
+            return SharedCounter(self, index, name)
+
+    def counter(self, name: str):
+        return self._register(name, gauge=False)
+
+    def gauge(self, name: str):
+        return self._register(name, gauge=True)
+
+    def rate(self, name: str, window: int = 60):
+        return SharedRate(self, name, window)
+
+    def _shared(self, index):
+        return self._array is not None and index < self._width
+
+    def _add(self, index, amount):
+        with self._lock:
+            if self._shared(index):
+                self._array[self._slot * self._width + index] += amount
+            else:
+                self._local[index] += amount
+
+    def _set(self, index, value):
+        with self._lock:
+            if self._shared(index):
+                self._array[self._slot * self._width + index] = value
+            else:
+                self._local[index] = value
+
+    def _get(self, index):
+        if self._shared(index):
+            return self._array[self._slot * self._width + index]
+        return self._local[index]
+
+    def _total(self, index):
+        return sum(self._row_value(slot, index) for slot in self.rows(index))
+
+    def rows(self, index):
+        """Filas que suman un contador: todas las de los workers, o solo la local si no es compartido"""
+        return range(self.workers) if self._shared(index) else (self._slot,)
+
+    def _row_value(self, slot, index):
+        if not self._shared(index):
+            return self._local[index]
+        return self._array[slot * self._width + index]
+
+    # -------------------------
+    #   CICLO DE VIDA (lanzador)
+    # -------------------------
+    def enable(self, workers: int):
+        """En el proceso maestro, antes del fork"""
+        self._width = len(self._local)
+        self._array = multiprocessing.RawArray("d", max(self._width, 1) * workers)
+        self.workers = workers
+
+    def bind(self, slot: int):
+        """En cada worker, justo después del fork"""
+        self._slot = slot
+        self._lock = threading.Lock()
+
+    def reset_gauges(self, slot: int):
+        """En el maestro, antes de arrancar el sustituto de un worker"""
+        if self._array is not None:
+            for index in self._gauges:
+                if index < self._width:
+                    self._array[slot * self._width + index] = 0.0
+
+    def snapshot(self):
+        return {"workers": self.workers, "worker": self._slot}
+
+# Instancia global del proceso
+shared_metrics = SharedMetrics()
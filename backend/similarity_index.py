@@ -0,0 +1,148 @@
+# backend/similarity_index.py
+import heapq
+import threading
+
+# Máximo de puntos por hoja antes de dividirla
+LEAF_SIZE = 32
+
+class _Node:
+    __slots__ = ("axis", "split", "left", "right", "items")
+
+    def __init__(self, items):
+        self.axis = None
+        self.split = None
+        self.left = None
+        self.right = None
+        self.items = items  # [(analysis_id, vector)] solo en hojas
+
+class HardwareIndex:
+    """
+    KD-tree en memoria sobre los vectores normalizados (cpu, ram, gpu, disco).
+    Las hojas agrupan hasta LEAF_SIZE puntos y se dividen al crecer,
+    así las inserciones incrementales no desequilibran el árbol.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root = _Node([])
+        self._vectors = {}   # analysis_id -> vector
+        self._leaf_of = {}   # analysis_id -> hoja que lo contiene
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def get_vector(self, analysis_id):
+        return self._vectors.get(analysis_id)
+
+    def rebuild(self, items):
+        """Construye un árbol equilibrado desde cero con [(analysis_id, vector)]"""
+        items = [(analysis_id, tuple(vector)) for analysis_id, vector in items]
+        with self._lock:
+            self._vectors = dict(items)
+            self._leaf_of = {}
+            self._root = self._build(list(self._vectors.items()))
+
+    def add(self, analysis_id, vector):
+        vector = tuple(vector)
+        with self._lock:
+            if analysis_id in self._vectors:
+                self._remove(analysis_id)
+            self._vectors[analysis_id] = vector
+
+            node = self._root
+            while node.items is None:
+                node = node.left if vector[node.axis] < node.split else node.right
+            node.items.append((analysis_id, vector))
+            self._leaf_of[analysis_id] = node
+
+            # Una hoja sobredimensionada solo contiene vectores idénticos; no tiene sentido redividirla
+            if len(node.items) > 2 * LEAF_SIZE and node.items[0][1] != vector:
+                self._split(node)
+
+    def remove(self, analysis_id):
+        with self._lock:
+            if analysis_id in self._vectors:
+                self._remove(analysis_id)
+
+    def nearest(self, vector, k=5, exclude=None):
+        """Devuelve [(analysis_id, distancia)] de los k vecinos más cercanos"""
+        vector = tuple(vector)
+        heap = []  # max-heap por distancia: (-dist², analysis_id)
+
+        def visit(node):
+            if node.items is not None:
+                for analysis_id, point in node.items:
+                    if analysis_id == exclude:
+                        continue
+                    dist = sum((a - b) ** 2 for a, b in zip(vector, point))
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-dist, analysis_id))
+                    elif dist < -heap[0][0]:
+                        heapq.heapreplace(heap, (-dist, analysis_id))
+                return
+
+            diff = vector[node.axis] - node.split
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            visit(near)
+            # Solo se explora la otra rama si puede contener un punto más cercano
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        with self._lock:
+            if k > 0:
+                visit(self._root)
+
+        return [(analysis_id, (-neg_dist) ** 0.5) for neg_dist, analysis_id in sorted(heap, reverse=True)]
+
+    def _build(self, items):
+        if len(items) <= LEAF_SIZE:
+            node = _Node(items)
+            for analysis_id, _ in items:
+                self._leaf_of[analysis_id] = node
+            return node
+
+        node = _Node(None)
+        self._partition(node, items)
+        return node
+
+    def _partition(self, node, items):
+        # Dividir por el eje con mayor dispersión, en la mediana
+        dims = len(items[0][1])
+        spreads = [
+            max(v[d] for _, v in items) - min(v[d] for _, v in items)
+            for d in range(dims)
+        ]
+        axis = spreads.index(max(spreads))
+        items.sort(key=lambda item: item[1][axis])
+        mid = len(items) // 2
+
+        # Todos los vectores son idénticos: la hoja no se puede dividir
+        if spreads[axis] == 0:
+            node.items = items
+            for analysis_id, _ in items:
+                self._leaf_of[analysis_id] = node
+            return
+
+        split = items[mid][1][axis]
+        cut = next(i for i, item in enumerate(items) if item[1][axis] >= split)
+        # Con muchos valores repetidos la mediana puede dejar la rama izquierda vacía
+        if cut == 0:
+            cut = next(i for i, item in enumerate(items) if item[1][axis] > split)
+            split = items[cut][1][axis]
+
+        node.axis = axis
+        node.split = split
+        node.items = None
+        node.left = self._build(items[:cut])
+        node.right = self._build(items[cut:])
+
+    def _split(self, node):
+        self._partition(node, node.items)
+
+    def _remove(self, analysis_id):
+        self._vectors.pop(analysis_id)
+        node = self._leaf_of.pop(analysis_id)
+        node.items = [item for item in node.items if item[0] != analysis_id]
+
+# Índice global del proceso, alimentado en el arranque y en cada análisis
+similar_machines = HardwareIndex()
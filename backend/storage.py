@@ -0,0 +1,367 @@
+# backend/storage.py
+import abc
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from resilience import CircuitBreaker, call_with_retries
+from shared_metrics import shared_metrics
+
+# dropbox | local | memory
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "dropbox").lower()
+# Raíz del almacén local direccionado por contenido
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "artifacts")
+DROPBOX_FOLDER = "/AnalizaPC-Reports"
+
+# Segundos máximos de cada llamada HTTP a Dropbox
+DROPBOX_TIMEOUT = float(os.getenv("DROPBOX_TIMEOUT", "10"))
+# Presupuesto total de una subida (put + link), reintentos incluidos
+DROPBOX_DEADLINE = float(os.getenv("DROPBOX_DEADLINE", "20"))
+DROPBOX_MAX_ATTEMPTS = int(os.getenv("DROPBOX_MAX_ATTEMPTS", "4"))
+DROPBOX_BACKOFF_BASE = float(os.getenv("DROPBOX_BACKOFF_BASE", "0.25"))
+DROPBOX_BACKOFF_MAX = float(os.getenv("DROPBOX_BACKOFF_MAX", "4"))
+# Subidas fallidas seguidas que abren el circuito, y segundos hasta volver a probar
+DROPBOX_BREAKER_FAILURES = int(os.getenv("DROPBOX_BREAKER_FAILURES", "5"))
+DROPBOX_BREAKER_RESET = float(os.getenv("DROPBOX_BREAKER_RESET", "30"))
+
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".json": "application/json",
+}
+
+class StorageError(Exception):
+    pass
+
+class StorageUnavailable(StorageError):
+    """El backend está degradado y la subida se aplaza sin intentarla"""
+    pass
+
+class StorageMetrics:
+    """
+    Latencia de las subidas (put + link) de un backend. Los contadores se suman entre los
+    workers de la instancia; los percentiles son de las últimas muestras de este proceso.
+    """
+
+    def __init__(self, prefix: str = "storage", window: int = 1024):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.uploads = shared_metrics.counter(f"{prefix}.uploads")
+        self.errors = shared_metrics.counter(f"{prefix}.errors")
+        self.deferred = shared_metrics.counter(f"{prefix}.deferred")
+        self.bytes = shared_metrics.counter(f"{prefix}.bytes")
+        self.total_seconds = shared_metrics.counter(f"{prefix}.seconds")
+
+    def record(self, seconds: float, size: int, ok: bool):
+        with self._lock:
+            self._recent.append(seconds)
+        self.total_seconds.add(seconds)
+        if ok:
+            self.uploads.add()
+            self.bytes.add(size)
+        else:
+            self.errors.add()
+
+    def record_deferred(self):
+        self.deferred.add()
+
+    def snapshot(self):
+        with self._lock:
+            recent = sorted(self._recent)
+        uploads, errors = int(self.uploads.total()), int(self.errors.total())
+        calls = uploads + errors
+
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 2) if recent else None
+
+        return {
+            "uploads": uploads,
+            "errors": errors,
+            "deferred": int(self.deferred.total()),
+            "bytes": int(self.bytes.total()),
+            "avg_ms": round(self.total_seconds.total() / calls * 1000, 2) if calls else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+        }
+
+class ArtifactStorage(abc.ABC):
+    """
+    Interfaz común de almacenamiento de informes.
+    put devuelve la clave del artefacto, que es lo único que necesitan get, link y delete.
+    """
+    name = "base"
+
+    def __init__(self):
+        self.metrics = StorageMetrics(f"storage.{self.name}")
+        self.setup_state = "pending"
+
+    @property
+    def available(self):
+        return True
+
+    def setup(self):
+        pass
+
+    def setup_in_background(self):
+        """
+        Ejecuta setup en un hilo propio: la preparación remota (carpetas de Dropbox)
+        no retrasa el arranque ni bloquea el event loop. Las subidas no dependen de ella.
+        """
+        def run():
+            try:
+                self.setup()
+                self.setup_state = "ready"
+            except Exception as e:
+                self.setup_state = "error"
+                print(f"⚠️ Preparación del almacenamiento {self.name} fallida: {e}")
+
+        self.setup_state = "running"
+        threading.Thread(target=run, name="storage-setup", daemon=True).start()
+
+    @abc.abstractmethod
+    def put(self, filename: str, data: bytes) -> str:
+        """Guarda el artefacto y devuelve su clave"""
+
+    @abc.abstractmethod
+    def get(self, key: str):
+        """Contenido del artefacto, o None si no existe"""
+
+    @abc.abstractmethod
+    def link(self, key: str) -> str:
+        """Enlace público del artefacto"""
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        """Borra el artefacto (no falla si ya no existe)"""
+
+    def key_for(self, url: str):
+        """Clave de un enlace generado por este backend, o None si no se puede recuperar"""
+        return None
+
+    def snapshot(self):
+        return {"backend": self.name, "available": self.available, "setup": self.setup_state,
+                "uploads": self.metrics.snapshot()}
+
+    def upload(self, filename: str, data: bytes) -> str:
+        """put + link midiendo la latencia; lanza StorageError si falla"""
+        start = time.perf_counter()
+        ok = False
+        try:
+            url = self.link(self.put(filename, data))
+            ok = True
+            return url
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(str(e)) from e
+        finally:
+            self.metrics.record(time.perf_counter() - start, len(data), ok)
+
+def content_key(filename: str, data: bytes):
+    """sha256 del contenido + extensión original, así la clave basta para servirlo con su tipo"""
+    return hashlib.sha256(data).hexdigest() + os.path.splitext(filename)[1].lower()
+
+def content_type(key: str):
+    return CONTENT_TYPES.get(os.path.splitext(key)[1], "application/octet-stream")
+
+def _dropbox_retryable(e):
+    """5xx, 429 y fallos de red se reintentan; errores de la API o de autenticación no"""
+    import dropbox
+    import requests
+    if isinstance(e, dropbox.exceptions.HttpError):
+        return isinstance(e, dropbox.exceptions.RateLimitError) or (e.status_code or 0) >= 500
+    return isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+def _dropbox_retry_after(e):
+    return getattr(e, "backoff", None)
+
+class DropboxStorage(ArtifactStorage):
+    """
+    Dropbox: la clave es la ruta dentro de la app y el enlace, un shared link de descarga directa.
+    Cada llamada tiene su timeout y cada subida un plazo total con reintentos; tras varios
+    fallos seguidos el circuito se abre y las subidas se aplazan al instante.
+    """
+    name = "dropbox"
+
+    def __init__(self, access_token: str, folder: str = DROPBOX_FOLDER):
+        super().__init__()
+        self.access_token = access_token
+        self.folder = folder
+        self.breaker = CircuitBreaker(DROPBOX_BREAKER_FAILURES, DROPBOX_BREAKER_RESET)
+        self._client = None
+        self._local = threading.local()
+
+    @property
+    def available(self):
+        return bool(self.access_token) and self.access_token != "tu_token_de_dropbox_aqui"
+
+    def _dbx(self):
+        if self._client is None:
+            import dropbox
+            # Sin reintentos internos del SDK (por defecto repite los 429 sin límite): los gestiona _call
+            self._client = dropbox.Dropbox(self.access_token, max_retries_on_error=0,
+                                           max_retries_on_rate_limit=0, timeout=DROPBOX_TIMEOUT)
+        return self._client
+
+    def _call(self, fn, *args):
+        """fn(cliente, *args) con timeout por llamada, reintentos con backoff y el plazo de la subida en curso"""
+        deadline = getattr(self._local, "deadline", None) or time.monotonic() + DROPBOX_DEADLINE
+
+        def attempt(remaining):
+            # clone comparte la sesión HTTP; solo cambia el timeout de esta llamada
+            return fn(self._dbx().clone(timeout=min(DROPBOX_TIMEOUT, remaining)), *args)
+
+        return call_with_retries(attempt, deadline, _dropbox_retryable, DROPBOX_MAX_ATTEMPTS,
+                                 DROPBOX_BACKOFF_BASE, DROPBOX_BACKOFF_MAX, _dropbox_retry_after)
+
+    def setup(self):
+        if self.available:
+            from dropbox_upload import create_dropbox_folder_structure
+            create_dropbox_folder_structure(self.access_token, self.folder)
+            print("✅ Dropbox configurado")
+
+    def upload(self, filename, data):
+        if not self.breaker.allow():
+            self.metrics.record_deferred()
+            raise StorageUnavailable("Dropbox no responde: subida aplazada")
+        self._local.deadline = time.monotonic() + DROPBOX_DEADLINE
+        try:
+            url = super().upload(filename, data)
+        except StorageError:
+            self.breaker.failure()
+            raise
+        finally:
+            self._local.deadline = None
+        self.breaker.success()
+        return url
+
+    def put(self, filename, data):
+        import dropbox
+        if not self.available:
+            raise StorageError("Token Dropbox no configurado")
+        path = f"{self.folder}/{filename}"
+        self._call(lambda dbx: dbx.files_upload(data, path, mode=dropbox.files.WriteMode.overwrite))
+        print(f"✅ Archivo subido a Dropbox: {path}")
+        return path
+
+    def get(self, key):
+        import dropbox
+        try:
+            _, response = self._call(lambda dbx: dbx.files_download(key))
+            return response.content
+        except dropbox.exceptions.ApiError:
+            return None
+
+    def link(self, key):
+        from dropbox_upload import shared_link
+        url, error = self._call(shared_link, key)
+        if error:
+            raise StorageError(error)
+        return url
+
+    def delete(self, key):
+        import dropbox
+        try:
+            self._call(lambda dbx: dbx.files_delete_v2(key))
+        except dropbox.exceptions.ApiError:
+            pass
+
+    def snapshot(self):
+        return dict(super().snapshot(), circuit=self.breaker.snapshot())
+
+class LocalStorage(ArtifactStorage):
+    """
+    Sistema de ficheros local direccionado por contenido (root/ab/abcdef….pdf).
+    Los artefactos se sirven desde la propia API en /api/artifacts/{clave}.
+    """
+    name = "local"
+
+    def __init__(self, root: str, base_url: str = "/api/artifacts"):
+        super().__init__()
+        self.root = root
+        self.base_url = base_url
+
+    def setup(self):
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        if os.path.basename(key) != key or key.startswith("."):
+            raise StorageError(f"Clave no válida: {key}")
+        return os.path.join(self.root, key[:2], key)
+
+    def put(self, filename, data):
+        key = content_key(filename, data)
+        path = self._path(key)
+        if os.path.exists(path):
+            # Mismo contenido, misma clave: no hace falta reescribirlo
+            return key
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return key
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except (FileNotFoundError, StorageError):
+            return None
+
+    def link(self, key):
+        return f"{self.base_url}/{key}"
+
+    def key_for(self, url):
+        prefix = f"{self.base_url}/"
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except (FileNotFoundError, StorageError):
+            pass
+
+class MemoryStorage(ArtifactStorage):
+    """Almacén en memoria del proceso, para pruebas de carga sin disco ni red"""
+    name = "memory"
+
+    def __init__(self, base_url: str = "/api/artifacts"):
+        super().__init__()
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._blobs = {}
+
+    def put(self, filename, data):
+        key = content_key(filename, data)
+        with self._lock:
+            self._blobs[key] = bytes(data)
+        return key
+
+    def get(self, key):
+        with self._lock:
+            return self._blobs.get(key)
+
+    def link(self, key):
+        return f"{self.base_url}/{key}"
+
+    def key_for(self, url):
+        prefix = f"{self.base_url}/"
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+    def delete(self, key):
+        with self._lock:
+            self._blobs.pop(key, None)
+
+def create_storage(backend: str):
+    if backend == "dropbox":
+        return DropboxStorage(os.getenv("DROPBOX_ACCESS_TOKEN"))
+    if backend == "local":
+        return LocalStorage(LOCAL_STORAGE_DIR)
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"STORAGE_BACKEND desconocido: {backend}")
+
+# Instancia global del proceso
+artifact_storage = create_storage(STORAGE_BACKEND)
@@ -1,6 +1,10 @@
 const btn = document.getElementById('btn');
 const out = document.getElementById('out');
 
+// Idempotency-Key del análisis en curso: se reutiliza al reintentar tras un error de red
+// para que el backend no cree un análisis nuevo por cada intento
+let pendingRequest = null;
+
 btn.onclick = async () => {
   btn.disabled = true;
   out.innerText = "🔄 Analizando tu PC...";
@@ -16,15 +20,21 @@ btn.onclick = async () => {
     gpu_vram_gb: parseFloat(document.getElementById('gpu_vram_gb').value) || 0
   };
 
+  const body = JSON.stringify(data);
+  if (!pendingRequest || pendingRequest.body !== body) {
+    pendingRequest = { body, key: crypto.randomUUID() };
+  }
+
   try {
     // Llamar al backend FastAPI en OpenShift
     const res = await fetch("https://analiza-tu-pc-analizatupc-dev.apps.rm1.0a51.p1.openshiftapps.com/api/analyze", {
       method: "POST",
-      headers: {"Content-Type": "application/json"},
-      body: JSON.stringify(data)
+      headers: {"Content-Type": "application/json", "Idempotency-Key": pendingRequest.key},
+      body
     });
 
     const result = await res.json();
+    pendingRequest = null;
 
     let text = `✅ Análisis completado!\n\n🎯 Perfil principal: ${result.result.main_profile} (${result.result.main_score}%)\n\n`;
     text += "📈 Adecuación por perfiles:\n";